@@ -9,6 +9,8 @@ Features:
 - Only adds extension to files without an existing extension
 - Leaves files with existing extensions unchanged
 - Reports each file that is renamed
+- Lists the directory once with tree_walker.py instead of checking every entry
+  separately
 
 To use:
 1. Run the script: python AddFileExtensionPDF.py
@@ -18,6 +20,8 @@ To use:
 
 import os
 
+from tree_walker import list_directory
+
 def add_pdf_extension_to_files(directory):
     """
     Add .pdf extension to files in the specified directory if they lack an extension.
@@ -26,19 +30,18 @@ def add_pdf_extension_to_files(directory):
         directory (str): Path to the directory to process.
     """
     try:
-        for filename in os.listdir(directory):
-            file_path = os.path.join(directory, filename)
-
-            # Ensure it's a file, not a directory
-            if os.path.isfile(file_path):
-                # Check if the file has no extension
-                if not os.path.splitext(filename)[1]:
-                    new_filename = f"{filename}.pdf"
-                    new_file_path = os.path.join(directory, new_filename)
-
-                    # Rename the file
-                    os.rename(file_path, new_file_path)
-                    print(f"Renamed: {filename} -> {new_filename}")
+        # Only files are returned, so directories are skipped without an extra check
+        _, files = list_directory(directory, onerror=lambda e: print(f"An error occurred: {e}"))
+        for entry in files:
+            filename = entry.name
+            # Check if the file has no extension
+            if not os.path.splitext(filename)[1]:
+                new_filename = f"{filename}.pdf"
+                new_file_path = os.path.join(directory, new_filename)
+
+                # Rename the file
+                os.rename(entry.path, new_file_path)
+                print(f"Renamed: {filename} -> {new_filename}")
     except Exception as e:
         print(f"An error occurred: {e}")
 
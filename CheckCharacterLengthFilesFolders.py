@@ -9,15 +9,23 @@ Features:
 - Shortens filenames that would cause the full path to exceed 350 characters
 - Preserves file extensions when shortening names
 - Reports each file or directory that was renamed
+- Walks the tree with tree_walker.py (one directory listing per folder)
+- All new names are planned first (rename_engine.py): two names that shorten
+  to the same result get a suffix "(2)" instead of overwriting each other,
+  and the plan is applied in one batch that is rolled back if a rename fails
+- Optional dry run that only lists the planned renames
 
 To use:
 1. Run the script: python CheckCharacterLengthFilesFolders.py
 2. When prompted, enter the path to the directory you want to process
-3. The script will rename files and directories as needed and report all changes
+3. Choose whether to only preview the planned renames
+4. The script will rename files and directories as needed and report all changes
 """
 
 import os
 
+from rename_engine import ask_dry_run, ask_rollback, plan_tree
+
 MAX_PATH_LENGTH = 350
 
 def shorten_name(name, max_length):
@@ -36,26 +44,19 @@ def shorten_path(root, name):
     max_name_length = MAX_PATH_LENGTH - len(root) - 1  # Jätetään tilaa '/'
     return shorten_name(name, max_name_length)
 
-def process_directory(directory):
-    """Käy läpi hakemiston ja sen alihakemistot, lyhentäen nimiä tarvittaessa."""
-    for root, dirs, files in os.walk(directory, topdown=False):
-        # Käsitellään tiedostot
-        for file in files:
-            original_path = os.path.join(root, file)
-            shortened_name = shorten_path(root, file)
-            if shortened_name != file:
-                shortened_path = os.path.join(root, shortened_name)
-                os.rename(original_path, shortened_path)
-                print(f"Renamed file: {original_path} -> {shortened_path}")
-
-        # Käsitellään kansiot
-        for dir in dirs:
-            original_path = os.path.join(root, dir)
-            shortened_name = shorten_path(root, dir)
-            if shortened_name != dir:
-                shortened_path = os.path.join(root, shortened_name)
-                os.rename(original_path, shortened_path)
-                print(f"Renamed directory: {original_path} -> {shortened_path}")
+def process_directory(directory, dry_run=False):
+    """
+    Käy läpi hakemiston ja sen alihakemistot, lyhentäen nimiä tarvittaessa.
+    Kaikki uudet nimet lasketaan ensin; dry_run=True vain tulostaa suunnitelman.
+    """
+    plan = plan_tree(directory, lambda root, entry: shorten_path(root, entry.name))
+    if dry_run:
+        print(plan.format_plan())
+        return plan
+    for operation in plan.apply():
+        kind = "directory" if operation.is_dir else "file"
+        print(f"Renamed {kind}: {operation.old_path} -> {operation.new_path}")
+    return plan
 
 def main():
     base_directory = input("Anna kansion polku: ").strip()
@@ -63,9 +64,12 @@ def main():
     if not os.path.isdir(base_directory):
         print(f"Annettu polku ei ole kelvollinen hakemisto: {base_directory}")
         return
+    if not ask_rollback(base_directory):
+        return
 
+    dry_run = ask_dry_run()
     print(f"Käsitellään kansio: {base_directory}")
-    process_directory(base_directory)
+    process_directory(base_directory, dry_run)
     print("Valmis!")
 
 if __name__ == "__main__":
@@ -6,10 +6,22 @@ with built-in rate limiting and error handling.
 
 Features:
 - Generates 2 tasks per topic with detailed explanations
-- Implements token-based rate limiting to avoid API throttling
+- Runs on the shared assignment engine (assignment_engine.py): WORKERS topics
+  at a time over one pooled HTTP client, with per-topic timing, token usage
+  and a throughput summary (also appended to tehtavatilastot.csv)
+- Shared token-bucket rate limiter (rate_limiter.py): each request reserves
+  its estimated tokens before it is sent and the reservation is corrected with
+  response.usage afterwards, so the run stays under TOKEN_LIMIT tokens and
+  REQUESTS_PER_MINUTE requests per minute without fixed sleeps between topics
 - Handles HTTP timeouts and connection errors
-- Logs failed topic generation for later retry
-- Saves output as Markdown files in a specified directory
+- Durable job queue (job_queue.py) in the output folder: every topic has a
+  state and an attempt count, failed topics are retried with exponential
+  backoff up to MAX_ATTEMPTS times, and a restarted run resumes where the
+  previous one stopped without generating completed topics again
+- Logs topics that failed every attempt to a text file for later retry
+- Streaming mode (STREAM_RESPONSES, streaming_output.py): the answer is written
+  to a temporary .md.part file as it arrives and renamed to .md when complete;
+  a retry of an interrupted topic continues the partial answer
 
 Requirements:
 - OpenAI Python package
@@ -19,150 +31,69 @@ Requirements:
 To use:
 1. Set your DeepSeek API key in the DEEPSEEK_API_KEY variable
 2. Modify the 'topics' list in the main() function to include your desired topics
+   (or use generateAssignments.py with a CSV/YAML topic file)
 3. Update the 'base_directory' in main() to your preferred output location
-4. Run the script: python DPAssignmentGeneratoriLOGO.py
+4. Set TOKEN_LIMIT, REQUESTS_PER_MINUTE and WORKERS to match your API budget
+5. Run the script: python DPAssignmentGeneratoriLOGO.py
 """
 
-import os
-import time
-from datetime import datetime
-from json import JSONDecodeError
-
-import httpx
-from openai import OpenAI
+from api_clients import format_import_timings
+from assignment_engine import AssignmentConfig, AssignmentEngine, make_client
+from rate_limiter import RateLimiter
 
 # Aseta DeepSeek API -yhteyden tiedot
 DEEPSEEK_API_KEY = "YOUR_API_KEY_HERE"  # Replace with your actual API key
 DEEPSEEK_BASE_URL = "https://api.deepseek.com"
-# DEEPSEEK_BASE_URL = "http://localhost:8000/v1"  # For local development
+# DEEPSEEK_BASE_URL = "http://localhost:8000/v1"  # For local development (mockOpenAiServer.py)
 
-# Luo DeepSeek API -asiakas
-client = OpenAI(
-    api_key=DEEPSEEK_API_KEY,
-    base_url=DEEPSEEK_BASE_URL,
-    http_client=httpx.Client(timeout=1200)  # Aseta timeout 1200 sekuntiin (20 minuuttia)
-)
-# Add these global variables
+MODEL = "deepseek-reasoner"
+STREAM_RESPONSES = True  # Kirjoita vastaus tiedostoon sitä mukaa kuin se saapuu
+
+# Rajoitukset: tokeneita ja pyyntöjä TOKEN_RESET_INTERVAL-jakson aikana
 TOKEN_LIMIT = 8000
 TOKEN_RESET_INTERVAL = 60  # seconds
-last_request_time = datetime.now()
-tokens_used = 0
-
-
-def wait_for_token_reset():
-    global last_request_time, tokens_used
-    current_time = datetime.now()
-    time_since_last_request = (current_time - last_request_time).total_seconds()
-
-    if time_since_last_request < TOKEN_RESET_INTERVAL:
-        if tokens_used >= TOKEN_LIMIT:
-            sleep_time = TOKEN_RESET_INTERVAL - time_since_last_request
-            print(f"Rate limit reached. Waiting for {sleep_time:.2f} seconds.")
-            time.sleep(sleep_time)
-            tokens_used = 0
-            last_request_time = datetime.now()
-    else:
-        tokens_used = 0
-        last_request_time = current_time
-
-def generate_tasks_and_examples(topic):
-    global tokens_used
-
-    prompt = (
-        f"Olet tehtävä- ja esimerkkiluoja. Generoi tarkalleen 2 tehtävää ja esimerkkejä liittyen aiheeseen '{topic}'. "
-        "Tehtävien tulisi kattaa aiheen peruskäsitteet ja edistyneemmät näkökohdat. Korosta erityisesti esimerkkien laajuutta ja laatua siten, että "
-        "ne auttavat opiskelijaa ymmärtämään aihetta syvällisesti ja eri näkökulmista. "
-        "Jokaiseen tehtävään tulee sisältyä:\n"
-        "1. Laajempi selitys tehtävän tarkoituksesta: Miksi tehtävää tehdään ja miten se liittyy oppimiseen.\n"
-        "2. Tehtävänanto: Selkeästi ja kattavasti selvitetty ohjeistus, mitä opiskelijan tulee tehdä.\n"
-        "3. Esimerkki mahdollisesta vastauksesta:\n"
-        "   - Käytä Siemens LOGO! -ohjelmaesimerkkejä aina, kun se on mahdollista.\n"
-        "   - Sisällytä logiikkakaavio Graphviz-muodossa (DOT-kieli) tehtävän ratkaisuun.\n"
-        "   - Näytä, kuinka logiikka ohjelmoidaan vaihe vaiheelta LOGO! Soft Comfort -ohjelmistossa:\n"
-        "     1. Lisää lohkot, kuten ajastimet, portit tai kytkimet.\n"
-        "     2. Määritä parametrien arvot, kuten viiveet tai kytkentälogiikka.\n"
-        "     3. Yhdistä lohkot ja testaa logiikka ohjelmiston simulaattorilla.\n"
-        "   - Käytä Graphviz/DOT-kieltä havainnollistamaan logiikkakaavio:\n"
-        "Muista, että sisältösi on tarkoitettu pedagogiseen käyttöön, joten käytä selkeää, tarkkaa ja ystävällistä kieltä. "
-        "Pyri antamaan opiskelijalle kaikki tarvittavat tiedot, jotta hän voi ymmärtää tehtävän ja oppia aiheen perusteellisesti."
-    )
-
-    try:
-        wait_for_token_reset()
-
-        response = client.chat.completions.create(
-            model="deepseek-reasoner",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Olet asiantuntija ja pedagogi, jonka tehtävänä on luoda tehtäviä ja esimerkkejä opiskelijoille. "
-                        "Keskity varmistamaan, että luomasi tehtävät ovat pedagogisesti merkityksellisiä, tarjoavat monipuolisia näkökulmia, "
-                        "ja sisältävät Siemens LOGO! -ohjelmaesimerkkejä sekä logiikkakaavioita Graphviz-muodossa (DOT-kieli). "
-                        "Näytä vaiheittaiset ohjeet, joilla logiikkakaavio muunnetaan ohjelmaksi LOGO! Soft Comfort -ohjelmistossa. "
-                        "Huomioi myös eritasoisten opiskelijoiden tarpeet ja käytä selkeitä selityksiä."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
-            stream=False,
-            max_tokens=8000
-        )
-
-        # Update tokens used
-        tokens_used += response.usage.total_tokens
-        print(f"Tokens used in this request: {response.usage.total_tokens}")
-        print(f"Total tokens used: {tokens_used}")
-
-        # Tarkista ja tulosta raakadata
-        print("Raakavastaus:", response)
-
-        # Tarkista, onko 'choices'-avain vastauksessa ja sisältääkö se sisältöä
-        if not response or not response.choices:
-            raise ValueError("Empty or invalid API response")
-
-        tasks_and_examples = response.choices[0].message.content.strip()
-        if not tasks_and_examples:
-            raise ValueError("Empty content in API response")
-
-        return tasks_and_examples
-
-
-    except JSONDecodeError as e:
-
-        print(f"JSON decoding error for topic '{topic}': {e}")
-
-    except ValueError as e:
-
-        print(f"Value error for topic '{topic}': {e}")
-
-    except Exception as e:
-
-        print(f"Unexpected error for topic '{topic}': {e}")
-
-    return None
-
-
-def sanitize_file_name(name):
-    """Poistaa epäkelvot merkit tiedostonimestä."""
-    return "".join(c for c in name if c.isalnum() or c in "._- ").rstrip()
-
-
-def save_tasks_to_file(directory, topic, content):
-    # Luo hakemisto, jos sitä ei ole
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    # Luo tiedoston nimi ja tallennuspolku
-    file_name = sanitize_file_name(topic[:50].strip().replace(" ", "_")) + ".md"
-    file_path = os.path.join(directory, file_name)
-
-    try:
-        with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(content)
-        print(f"Tehtävät tallennettu tiedostoon: {file_path}")
-    except Exception as e:
-        print(f"Virhe tallentaessa tiedostoa: {e}")
+REQUESTS_PER_MINUTE = 30
+WORKERS = 4  # Rinnakkain käsiteltävien aiheiden määrä
+ESTIMATED_COMPLETION_TOKENS = 4000  # Vastauksen arvioitu pituus ennen todellista usage-tietoa
+
+rate_limiter = RateLimiter(TOKEN_LIMIT, REQUESTS_PER_MINUTE, TOKEN_RESET_INTERVAL)
+
+# Työjono: yritysten enimmäismäärä ja ensimmäisen uusintayrityksen viive (tuplaantuu)
+MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 30  # seconds
+
+SYSTEM_PROMPT = (
+    "Olet asiantuntija ja pedagogi, jonka tehtävänä on luoda tehtäviä ja esimerkkejä opiskelijoille. "
+    "Keskity varmistamaan, että luomasi tehtävät ovat pedagogisesti merkityksellisiä, tarjoavat monipuolisia näkökulmia, "
+    "ja sisältävät Siemens LOGO! -ohjelmaesimerkkejä sekä logiikkakaavioita Graphviz-muodossa (DOT-kieli). "
+    "Näytä vaiheittaiset ohjeet, joilla logiikkakaavio muunnetaan ohjelmaksi LOGO! Soft Comfort -ohjelmistossa. "
+    "Huomioi myös eritasoisten opiskelijoiden tarpeet ja käytä selkeitä selityksiä."
+)
+# {topic} korvataan aiheella
+PROMPT_TEMPLATE = (
+    "Olet tehtävä- ja esimerkkiluoja. Generoi tarkalleen 2 tehtävää ja esimerkkejä liittyen aiheeseen '{topic}'. "
+    "Tehtävien tulisi kattaa aiheen peruskäsitteet ja edistyneemmät näkökohdat. Korosta erityisesti esimerkkien laajuutta ja laatua siten, että "
+    "ne auttavat opiskelijaa ymmärtämään aihetta syvällisesti ja eri näkökulmista. "
+    "Jokaiseen tehtävään tulee sisältyä:\n"
+    "1. Laajempi selitys tehtävän tarkoituksesta: Miksi tehtävää tehdään ja miten se liittyy oppimiseen.\n"
+    "2. Tehtävänanto: Selkeästi ja kattavasti selvitetty ohjeistus, mitä opiskelijan tulee tehdä.\n"
+    "3. Esimerkki mahdollisesta vastauksesta:\n"
+    "   - Käytä Siemens LOGO! -ohjelmaesimerkkejä aina, kun se on mahdollista.\n"
+    "   - Sisällytä logiikkakaavio Graphviz-muodossa (DOT-kieli) tehtävän ratkaisuun.\n"
+    "   - Näytä, kuinka logiikka ohjelmoidaan vaihe vaiheelta LOGO! Soft Comfort -ohjelmistossa:\n"
+    "     1. Lisää lohkot, kuten ajastimet, portit tai kytkimet.\n"
+    "     2. Määritä parametrien arvot, kuten viiveet tai kytkentälogiikka.\n"
+    "     3. Yhdistä lohkot ja testaa logiikka ohjelmiston simulaattorilla.\n"
+    "   - Käytä Graphviz/DOT-kieltä havainnollistamaan logiikkakaavio:\n"
+    "Muista, että sisältösi on tarkoitettu pedagogiseen käyttöön, joten käytä selkeää, tarkkaa ja ystävällistä kieltä. "
+    "Pyri antamaan opiskelijalle kaikki tarvittavat tiedot, jotta hän voi ymmärtää tehtävän ja oppia aiheen perusteellisesti."
+)
+
+ASSIGNMENT_CONFIG = AssignmentConfig(MODEL, PROMPT_TEMPLATE, SYSTEM_PROMPT, max_tokens=8000,
+                                     stream=STREAM_RESPONSES, file_name_length=50)
+
+# Luo DeepSeek API -asiakas (yhteinen yhteysallas, timeout 1200 sekuntia eli 20 minuuttia)
+client = make_client(DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL, timeout=1200)
 
 
 def main():
@@ -259,44 +190,14 @@ def main():
     ]
 
     base_directory = "C:\\Users\\Antti\\tehtavat"
-    delay_between_tasks = 30  # 6 minuuttia
-
-    while topics:
-        current_topic = topics[0]
-        print(f"Generoi tehtäviä ja esimerkkejä aiheesta: {current_topic}...")
-        try:
-            tasks_and_examples = generate_tasks_and_examples(current_topic)
-
-            if tasks_and_examples:
-                content = f"# Aihe: {current_topic}\n\n{tasks_and_examples}\n"
-                save_tasks_to_file(base_directory, current_topic, content)
-                topics.pop(0)  # Poista onnistuneesti käsitelty aihe listasta
-                print(f"Aihe '{current_topic}' käsitelty onnistuneesti.")
-            else:
-                print(f"Tehtävien luominen epäonnistui aiheelle: {current_topic}")
-                # Siirrä epäonnistunut aihe listan loppuun
-                topics.append(topics.pop(0))
-
-        except Exception as e:
-            print(f"Virhe aiheen '{current_topic}' käsittelyssä: {e}")
-            # Siirrä epäonnistunut aihe listan loppuun
-            topics.append(topics.pop(0))
-
-        # Lisää viive ennen seuraavaa yritystä
-        if topics:
-            print(f"Odotetaan {delay_between_tasks} sekuntia ennen seuraavaa yritystä...")
-            time.sleep(delay_between_tasks)
-
-    print("Kaikki aiheet käsitelty onnistuneesti!")
-    print(f"Tehtävät ja esimerkit tallennettu kansioon: {base_directory}")
+
+    engine = AssignmentEngine(client, ASSIGNMENT_CONFIG, base_directory, workers=WORKERS,
+                              rate_limiter=rate_limiter, max_attempts=MAX_ATTEMPTS,
+                              retry_base_delay=RETRY_BASE_DELAY,
+                              estimated_completion_tokens=ESTIMATED_COMPLETION_TOKENS)
+    engine.run(topics)
+    print(format_import_timings())
 
 
 if __name__ == "__main__":
     main()
-
-def log_failed_topics(failed_topics, log_file_path):
-    with open(log_file_path, 'w', encoding='utf-8') as log_file:
-        log_file.write("Aiheet, joita ei saatu käsiteltyä API-virheiden vuoksi:\n\n")
-        for topic in failed_topics:
-            log_file.write(f"- {topic}\n")
-    print(f"Lista epäonnistuneista aiheista tallennettu tiedostoon: {log_file_path}")
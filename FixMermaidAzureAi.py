@@ -10,6 +10,17 @@ Features:
 - Sends Mermaid code to Azure OpenAI for syntax correction
 - Updates files only if corrections are made
 - Reports which files were modified
+- Offline syntax check (mermaid_validator.py): blocks that already parse are
+  not sent; broken blocks are sent together with the parse error
+- Persistent response cache (ai_response_cache.py): identical blocks and
+  repeated runs are answered without an API call
+- Optional asynchronous mode (asyncMermaidFixer.py): all blocks of all files are
+  extracted first and sent concurrently, with a limit on requests in flight
+- API client and heavy imports (openai, tiktoken) are created only when the
+  first block actually needs the API (api_clients.py)
+- Optional batching mode: blocks are counted with tiktoken and packed into as
+  few requests as fit in TOKEN_LIMIT, each block marked with a numbered
+  delimiter; blocks missing from a malformed answer are retried one by one
 
 Requirements:
 - OpenAI Python package (with Azure support)
@@ -20,25 +31,56 @@ To use:
 1. Set your Azure OpenAI endpoint and API key in the variables
 2. Run the script: python FixMermaidAzureAi.py
 3. When prompted, enter the path to the directory containing Markdown files
-4. The script will find and fix Mermaid syntax errors in all Markdown files
+4. Choose batching mode, or enter the number of concurrent requests, or press
+   Enter to process the blocks one at a time
+5. The script will find and fix Mermaid syntax errors in all Markdown files
 """
 
+import functools
 import os
 import re
-from openai import AzureOpenAI
-from tiktoken import get_encoding
+from ai_response_cache import ResponseCache
+from api_clients import (LazyClient, format_import_timings, get_azure_client, get_encoding,
+                         make_async_azure_client)
+from asyncMermaidFixer import MermaidFixConfig, extract_blocks, fix_files, splice_blocks
+from mermaid_validator import VALID, precheck_block
 
 # Aseta Azure OpenAI Service -yhteyden tiedot
 AZURE_OPENAI_ENDPOINT = "YOUR_AZURE_ENDPOINT_HERE"  # Replace with your Azure OpenAI endpoint
 AZURE_OPENAI_API_KEY = "YOUR_API_KEY_HERE"  # Replace with your actual API key
 TOKEN_LIMIT = 128000  # Token-raja (esim. 128000 GPT-4:ssa)
+AZURE_OPENAI_API_VERSION = "2024-02-01"
+TOKEN_ENCODING = "o200k_base"  # gpt-4o-mallien tokenisointi
+BATCH_MAX_OUTPUT_TOKENS = 16000  # Vastauksen enimmäispituus eräajossa
+MAX_BLOCKS_PER_BATCH = 40
 
-# Luodaan Azure OpenAI -client
-client = AzureOpenAI(
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_key=AZURE_OPENAI_API_KEY,
-    api_version="2024-02-01"
+MODEL = "gpt-4o-mini"
+SYSTEM_PROMPT = (
+    "Olet asiantuntija, joka korjaa mermaid-koodilohkojen syntaksivirheet. "
+    "Palauta vain korjattu koodi ilman lisäselvityksiä."
 )
+USER_PROMPT = (
+    "Korjaa seuraava mermaid-koodi mahdollisista syntaksivirheistä. "
+    "Palauta ainoastaan korjattu koodi, älä lisää mitään selityksiä:\n\n"
+)
+BATCH_USER_PROMPT = (
+    "Korjaa seuraavat mermaid-koodilohkot mahdollisista syntaksivirheistä. "
+    "Jokainen lohko on merkitty riveillä ===BLOCK n=== ja ===END n===. "
+    "Palauta jokainen korjattu lohko samoilla merkinnöillä ja samalla numerolla, "
+    "älä lisää mitään selityksiä:\n\n"
+)
+AI_CACHE = ResponseCache()
+MERMAID_FIX_CONFIG = MermaidFixConfig(MODEL, SYSTEM_PROMPT, USER_PROMPT, max_tokens=8000,
+                                      cache=AI_CACHE)
+
+BATCH_BLOCK_PATTERN = re.compile(r"^===BLOCK (\d+)===\n(.*?)\n===END \1===$", re.DOTALL | re.MULTILINE)
+
+# Azure OpenAI -client luodaan vasta ensimmäisellä API-kutsulla (api_clients.py)
+client = LazyClient(lambda: get_azure_client(
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_API_VERSION
+))
 
 def read_md(file_path):
     """Lukee Markdown-tiedoston sisällön."""
@@ -55,25 +97,24 @@ def correct_mermaid_code_with_ai(code):
     Lähettää vain mermaid-koodilohkon sisällön Azure OpenAI:lle,
     jotta mahdolliset syntaksivirheet korjattaisiin.
     Palauttaa ainoastaan korjatun koodin ilman selityksiä.
+    Aiemmin korjattu sama lohko palautetaan välimuistista ilman API-kutsua.
+    Offline-tarkistimen hyväksymää lohkoa ei lähetetä lainkaan, ja virheellisen
+    lohkon mukana lähetetään tarkistimen virheviesti.
     """
-    prompt = (
-        "Korjaa seuraava mermaid-koodi mahdollisista syntaksivirheistä. "
-        "Palauta ainoastaan korjattu koodi, älä lisää mitään selityksiä:\n\n"
-        f"{code}"
-    )
+    original = code
+    code, status, error = precheck_block(code)
+    if status == VALID:
+        print("Lohko on jo kelvollinen, API-kutsu ohitetaan.")
+        return code
+    cache_key = MERMAID_FIX_CONFIG.cache_key(code)
+    cached_code = AI_CACHE.get(cache_key)
+    if cached_code is not None:
+        print("Korjaus löytyi välimuistista.")
+        return cached_code
     try:
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Olet asiantuntija, joka korjaa mermaid-koodilohkojen syntaksivirheet. "
-                        "Palauta vain korjattu koodi ilman lisäselvityksiä."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
+            model=MODEL,
+            messages=MERMAID_FIX_CONFIG.messages(code, error),
             stream=False,
             max_tokens=8000
         )
@@ -81,10 +122,11 @@ def correct_mermaid_code_with_ai(code):
         corrected_code = response.choices[0].message.content.strip()
         if not corrected_code:
             raise ValueError("API-vastaus on tyhjä tai puutteellinen.")
+        AI_CACHE.put(cache_key, corrected_code)
         return corrected_code
     except Exception as e:
         print(f"Virhe API-kutsussa: {e}")
-        return code  # Palautetaan alkuperäinen koodi virheen sattuessa
+        return original  # Palautetaan alkuperäinen koodi virheen sattuessa
 
 def process_file(file_path):
     """
@@ -112,20 +154,190 @@ def process_file(file_path):
     else:
         print(f"Ei muutoksia: {file_path}")
 
+def iter_markdown_files(root_directory):
+    """Palauttaa kaikkien pääkansion ja alikansioiden Markdown-tiedostojen polut."""
+    for subdir, _, files in os.walk(root_directory):
+        for filename in files:
+            if filename.endswith(".md"):
+                yield os.path.join(subdir, filename)
+
 def process_directory(root_directory):
     """
     Käy läpi kaikki pääkansion ja alikansioiden Markdown-tiedostot.
     """
-    for subdir, _, files in os.walk(root_directory):
-        for filename in files:
-            if filename.endswith(".md"):
-                file_path = os.path.join(subdir, filename)
-                print(f"Käsitellään tiedostoa: {file_path}")
-                process_file(file_path)
+    for file_path in iter_markdown_files(root_directory):
+        print(f"Käsitellään tiedostoa: {file_path}")
+        process_file(file_path)
+    print(AI_CACHE.format_stats())
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    """Lataa tiktoken-koodauksen; None, jos sitä ei saada (esim. ilman verkkoyhteyttä)."""
+    try:
+        return get_encoding(TOKEN_ENCODING)
+    except Exception as e:
+        print(f"Tokenisointia ei voitu ladata ({e}), käytetään merkkimäärään perustuvaa arviota.")
+        return None
+
+def count_tokens(text):
+    """Laskee tekstin tokenit; ilman koodausta arvio on varovainen (3 merkkiä / token)."""
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 3 + 1
+    return len(encoding.encode(text))
+
+def batch_token_budget():
+    """
+    Palauttaa lohkojen yhteenlasketun tokenimäärän ylärajan yhdessä erässä.
+    Vastaus on suunnilleen syötteen pituinen, joten syötteen pitää mahtua sekä
+    vastauksen enimmäispituuteen että TOKEN_LIMIT-rajaan yhdessä vastauksen kanssa.
+    """
+    prompt_tokens = count_tokens(SYSTEM_PROMPT) + count_tokens(BATCH_USER_PROMPT)
+    return min(TOKEN_LIMIT - BATCH_MAX_OUTPUT_TOKENS - prompt_tokens,
+               int(BATCH_MAX_OUTPUT_TOKENS / 1.25))
+
+def format_batch_block(block_id, code, error=None):
+    """Muotoilee yhden lohkon eräpyyntöön numeroiduilla erotinriveillä."""
+    note = f"Tarkistimen löytämä virhe lohkossa {block_id}: {error}\n" if error else ""
+    return f"{note}===BLOCK {block_id}===\n{code}\n===END {block_id}==="
+
+def pack_batches(items, budget, max_blocks=None):
+    """
+    Jakaa (tunniste, koodi, virhe) -kolmikot eriin niin, että kunkin erän
+    tokenimäärä pysyy budjetissa. Budjettia suurempi lohko saa oman eränsä.
+    """
+    max_blocks = max_blocks or MAX_BLOCKS_PER_BATCH
+    batches = []
+    current = []
+    current_tokens = 0
+    for item in items:
+        tokens = count_tokens(format_batch_block(*item))
+        if current and (current_tokens + tokens > budget or len(current) >= max_blocks):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def parse_batch_response(text):
+    """Palauttaa eräpyynnön vastauksesta sanakirjan {tunniste: korjattu koodi}."""
+    return {int(block_id): code.strip() for block_id, code in BATCH_BLOCK_PATTERN.findall(text)}
+
+def correct_batch_with_ai(batch):
+    """
+    Lähettää yhden erän lohkoja yhdellä pyynnöllä.
+    Palauttaa sanakirjan {tunniste: korjattu koodi}; puuttuvat lohkot jäävät pois.
+    """
+    content = BATCH_USER_PROMPT + "\n\n".join(format_batch_block(*item) for item in batch)
+    try:
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": content},
+            ],
+            stream=False,
+            max_tokens=BATCH_MAX_OUTPUT_TOKENS
+        )
+        answers = parse_batch_response(response.choices[0].message.content or "")
+    except Exception as e:
+        print(f"Virhe eräpyynnössä: {e}")
+        return {}
+    expected = {block_id for block_id, _, _ in batch}
+    return {block_id: code for block_id, code in answers.items() if block_id in expected and code}
+
+def process_directory_batched(root_directory):
+    """
+    Kerää kaikkien Markdown-tiedostojen mermaid-lohkot ja lähettää virheelliset
+    lohkot mahdollisimman suurina erinä. Jos eräpyynnön vastaus on virheellinen
+    tai siitä puuttuu lohkoja, puuttuvat lohkot korjataan yksitellen.
+    """
+    files = []
+    for file_path in iter_markdown_files(root_directory):
+        content = read_md(file_path)
+        blocks = extract_blocks(content)
+        if blocks:
+            files.append((file_path, content, blocks))
+
+    # Sama lohko käsitellään vain kerran; kelvolliset ja välimuistista löytyvät
+    # lohkot eivät tarvitse API-kutsua
+    results = {}
+    pending = {}
+    for _, _, blocks in files:
+        for _, _, code in blocks:
+            if code in results or code in pending:
+                continue
+            fixed, status, error = precheck_block(code)
+            cached_code = None
+            if status != VALID:
+                cached_code = AI_CACHE.get(MERMAID_FIX_CONFIG.cache_key(fixed))
+            if status == VALID or cached_code is not None:
+                results[code] = cached_code or fixed
+            else:
+                pending[code] = (fixed, error)
+
+    items = [(block_id, fixed, error)
+             for block_id, (fixed, error) in enumerate(pending.values(), start=1)]
+    batches = pack_batches(items, batch_token_budget())
+    print(f"{len(results) + len(pending)} erillistä lohkoa, joista {len(pending)} lähetetään "
+          f"{len(batches)} eräpyynnössä.")
+    originals = {block_id: code for (block_id, _, _), code in zip(items, pending)}
+    corrected_by_id = {}
+    fallbacks = 0
+    for batch in batches:
+        answers = correct_batch_with_ai(batch)
+        for block_id, fixed, error in batch:
+            if block_id in answers:
+                corrected_by_id[block_id] = answers[block_id]
+                AI_CACHE.put(MERMAID_FIX_CONFIG.cache_key(fixed), answers[block_id])
+            else:
+                fallbacks += 1
+                # Yksittäiskorjaus saa alkuperäisen lohkon, jotta virheessä palautetaan se
+                corrected_by_id[block_id] = correct_mermaid_code_with_ai(originals[block_id])
+    for (block_id, _, _), code in zip(items, pending):
+        results[code] = corrected_by_id[block_id]
+    if fallbacks:
+        print(f"{fallbacks} lohkoa puuttui eräpyyntöjen vastauksista ja korjattiin yksitellen.")
+
+    for file_path, content, blocks in files:
+        new_content = splice_blocks(content, blocks, [results[code] for _, _, code in blocks])
+        if new_content != content:
+            write_md(file_path, new_content)
+            print(f"Muokattu: {file_path}")
+        else:
+            print(f"Ei muutoksia: {file_path}")
+    print(AI_CACHE.format_stats())
+
+def process_directory_async(root_directory, max_concurrency=8):
+    """
+    Kerää kaikkien Markdown-tiedostojen mermaid-lohkot ja korjauttaa ne
+    rinnakkain Azure OpenAI:n async-asiakkaalla.
+    """
+    def client_factory():
+        return make_async_azure_client(
+            azure_endpoint=AZURE_OPENAI_ENDPOINT,
+            api_key=AZURE_OPENAI_API_KEY,
+            api_version=AZURE_OPENAI_API_VERSION
+        )
+
+    fix_files(client_factory, list(iter_markdown_files(root_directory)),
+              MERMAID_FIX_CONFIG, max_concurrency)
 
 if __name__ == "__main__":
     root_directory = input("Anna pääkansion polku, jossa Markdown-tiedostot sijaitsevat: ")
     if os.path.isdir(root_directory):
-        process_directory(root_directory)
+        batched = input("Lähetetäänkö lohkot erinä? (k/E): ").strip().lower() == 'k'
+        if batched:
+            process_directory_batched(root_directory)
+        else:
+            concurrency = input("Rinnakkaisten pyyntöjen määrä (Enter = yksi lohko kerrallaan): ").strip()
+            if concurrency.isdigit() and int(concurrency) > 0:
+                process_directory_async(root_directory, int(concurrency))
+            else:
+                process_directory(root_directory)
+        print(format_import_timings())
     else:
         print("Annettu polku ei ole kelvollinen kansio.")
@@ -10,24 +10,51 @@ Features:
 - Sends Mermaid code to OpenAI for syntax correction
 - Updates files only if corrections are made
 - Reports which files were modified
+- Offline syntax check (mermaid_validator.py): blocks that already parse are
+  not sent; broken blocks are sent together with the parse error
+- Persistent response cache (ai_response_cache.py): identical blocks and
+  repeated runs are answered without an API call
+- API client and the openai import are created only when the first block
+  actually needs the API (api_clients.py)
+- Optional asynchronous mode (asyncMermaidFixer.py): all blocks of all files are
+  extracted first and sent concurrently, with a limit on requests in flight
 
 Requirements:
 - OpenAI Python package
 - OpenAI API key
 
 To use:
-1. Set your OpenAI API key in the openai.api_key variable
+1. Set your OpenAI API key in the OPENAI_API_KEY variable
 2. Run the script: python FixMermaidWithOpenAi.py
 3. When prompted, enter the path to the directory containing Markdown files
-4. The script will find and fix Mermaid syntax errors in all Markdown files
+4. Enter the number of concurrent requests, or press Enter to process the
+   blocks one at a time
+5. The script will find and fix Mermaid syntax errors in all Markdown files
 """
 
 import os
 import re
-import openai
+
+from ai_response_cache import ResponseCache
+from api_clients import LazyClient, format_import_timings, get_openai_client, make_async_openai_client
+from asyncMermaidFixer import MermaidFixConfig, fix_files
+from mermaid_validator import VALID, precheck_block
 
 # Aseta OpenAI API -avain
-openai.api_key = "YOUR_API_KEY_HERE"  # Replace with your actual API key
+OPENAI_API_KEY = "YOUR_API_KEY_HERE"  # Replace with your actual API key
+
+# OpenAI-asiakas luodaan vasta ensimmäisellä API-kutsulla (api_clients.py)
+client = LazyClient(lambda: get_openai_client(OPENAI_API_KEY))
+
+MODEL = "gpt-3.5-turbo"  # Voit halutessasi käyttää myös GPT-4:ää, jos se on käytettävissä
+SYSTEM_PROMPT = "Olet asiantuntija, joka korjaa mermaid-koodilohkojen syntaksia."
+USER_PROMPT = (
+    "Korjaa seuraava mermaid-koodilohko mahdollisista syntaksivirheistä. "
+    "Palauta ainoastaan korjattu koodi, älä lisää mitään selityksiä:\n\n"
+)
+AI_CACHE = ResponseCache()
+MERMAID_FIX_CONFIG = MermaidFixConfig(MODEL, SYSTEM_PROMPT, USER_PROMPT, max_tokens=2048,
+                                      temperature=0, cache=AI_CACHE)
 
 
 def read_md(file_path):
@@ -47,27 +74,35 @@ def correct_mermaid_code_with_openai(code):
     Lähettää mermaid-koodilohkon sisällön OpenAI:lle,
     jotta mahdolliset syntaksivirheet korjattaisiin.
     Palauttaa ainoastaan korjatun koodin ilman lisäselityksiä.
+    Aiemmin korjattu sama lohko palautetaan välimuistista ilman API-kutsua.
+    Offline-tarkistimen hyväksymää lohkoa ei lähetetä lainkaan, ja virheellisen
+    lohkon mukana lähetetään tarkistimen virheviesti.
     """
-    prompt = (
-            "Korjaa seuraava mermaid-koodilohko mahdollisista syntaksivirheistä. "
-            "Palauta ainoastaan korjattu koodi, älä lisää mitään selityksiä:\n\n" +
-            code
-    )
+    original = code
+    code, status, error = precheck_block(code)
+    if status == VALID:
+        print("Lohko on jo kelvollinen, API-kutsu ohitetaan.")
+        return code
+    cache_key = MERMAID_FIX_CONFIG.cache_key(code)
+    cached_code = AI_CACHE.get(cache_key)
+    if cached_code is not None:
+        print("Korjaus löytyi välimuistista.")
+        return cached_code
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",  # Voit halutessasi käyttää myös GPT-4:ää, jos se on käytettävissä
-            messages=[
-                {"role": "system", "content": "Olet asiantuntija, joka korjaa mermaid-koodilohkojen syntaksia."},
-                {"role": "user", "content": prompt}
-            ],
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=MERMAID_FIX_CONFIG.messages(code, error),
             temperature=0,
             max_tokens=2048
         )
-        corrected_code = response["choices"][0]["message"]["content"].strip()
+        corrected_code = (response.choices[0].message.content or "").strip()
+        if not corrected_code:
+            raise ValueError("API-vastaus on tyhjä tai puutteellinen.")
+        AI_CACHE.put(cache_key, corrected_code)
         return corrected_code
     except Exception as e:
         print(f"Virhe OpenAI-kutsussa: {e}")
-        return code  # Palautetaan alkuperäinen koodi virheen sattuessa
+        return original  # Palautetaan alkuperäinen koodi virheen sattuessa
 
 
 def process_file(file_path):
@@ -99,21 +134,44 @@ def process_file(file_path):
         print(f"Ei muutoksia tiedostossa: {file_path}")
 
 
+def iter_markdown_files(root_directory):
+    """Palauttaa annetun kansion ja sen alikansioiden Markdown-tiedostojen polut."""
+    for subdir, _, files in os.walk(root_directory):
+        for filename in files:
+            if filename.endswith(".md"):
+                yield os.path.join(subdir, filename)
+
+
 def process_directory(root_directory):
     """
     Käy läpi annetun kansion ja sen alikansiot, ja prosessoi kaikki Markdown-tiedostot.
     """
-    for subdir, _, files in os.walk(root_directory):
-        for filename in files:
-            if filename.endswith(".md"):
-                file_path = os.path.join(subdir, filename)
-                print(f"Käsitellään tiedostoa: {file_path}")
-                process_file(file_path)
+    for file_path in iter_markdown_files(root_directory):
+        print(f"Käsitellään tiedostoa: {file_path}")
+        process_file(file_path)
+    print(AI_CACHE.format_stats())
+
+
+def process_directory_async(root_directory, max_concurrency=8):
+    """
+    Kerää kaikkien Markdown-tiedostojen mermaid-lohkot ja korjauttaa ne
+    rinnakkain OpenAI:n async-asiakkaalla.
+    """
+    def client_factory():
+        return make_async_openai_client(api_key=OPENAI_API_KEY)
+
+    fix_files(client_factory, list(iter_markdown_files(root_directory)),
+              MERMAID_FIX_CONFIG, max_concurrency)
 
 
 if __name__ == "__main__":
     directory = input("Anna kansion polku, jossa Markdown-tiedostot sijaitsevat: ")
     if os.path.isdir(directory):
-        process_directory(directory)
+        concurrency = input("Rinnakkaisten pyyntöjen määrä (Enter = yksi lohko kerrallaan): ").strip()
+        if concurrency.isdigit() and int(concurrency) > 0:
+            process_directory_async(directory, int(concurrency))
+        else:
+            process_directory(directory)
+        print(format_import_timings())
     else:
         print("Annettu polku ei ole kelvollinen kansio.")
@@ -10,19 +10,28 @@ Features:
 - Sorts directories by creation date before numbering
 - Renames all files in each directory to match their parent directory name
 - Preserves file extensions
+- Walks the tree with tree_walker.py: creation dates come from the cached
+  directory listing instead of one getctime call per directory
+- All new names are planned first and applied in one batch (rename_engine.py);
+  files that would get the same name get a suffix "(2)", "(3)", ...; an
+  interrupted run can be rolled back, and a dry run shows the plan only
 
 To use:
 1. Run the script: python add_sequence_number.py
 2. When prompted, enter the path to the base directory to process
-3. The script will rename all directories and files according to the rules
+3. Choose whether to only preview the planned renames
+4. The script will rename all directories and files according to the rules
 
-Note: If multiple files exist in the same directory, they will all get the same name,
-which may cause conflicts. Manual intervention may be needed in such cases.
+Note: If multiple files exist in the same directory, the first keeps the directory
+name and the others are numbered, e.g. "001. Intro (2).md".
 """
 
 import os
 import re
 
+from rename_engine import RenamePlan, ask_dry_run, ask_rollback
+from tree_walker import walk
+
 
 def remove_prefix(name):
     """
@@ -38,53 +47,64 @@ def remove_prefix(name):
     return re.sub(pattern, '', name)
 
 
-def rename_directories(base_directory):
+def plan_renames(base_directory, rename_dirs=True, rename_files=True):
     """
-    Käy läpi kaikki hakemistot (topdown) ja nimeää kansion uudelleen
-    Windowsin luomispäivämäärän (getctime) mukaisesti. Uusi nimi on
+    Laskee kaikki uudet nimet muistiin ennen yhtään muutosta ja palauttaa
+    RenamePlan-olion. Kansiot numeroidaan luomispäivän mukaan muodossa
       "NNN. <perusnimi>"
-    jossa perusnimenä on alkuperäinen nimi, josta mahdolliset
-    numeroprefiksit on poistettu.
+    ja tiedostot saavat (uuden) kansionimensä. Saman kansion tiedostot, jotka
+    saisivat saman nimen, erotellaan numerolisällä "(2)", "(3)", ...
+    """
+    plan = RenamePlan(base_directory)
+    for root, dirs, files in walk(base_directory, topdown=True):
+        # Järjestetään kansiot luomispäivän mukaan (stat-tieto tulee listauksesta)
+        dirs.sort(key=lambda entry: entry.stat().st_ctime)
+        sequence = {entry.path: seq for seq, entry in enumerate(dirs, start=1)}
+        # Kansion nimi suunnitelman jälkeen; vanhempi on jo suunniteltu
+        parent_dir_name = os.path.basename(plan.final_path(root))
+
+        def new_name(entry):
+            if entry.path in sequence:
+                if not rename_dirs:
+                    return None
+                return f"{sequence[entry.path]:03d}. {remove_prefix(entry.name)}"
+            # base_directoryn omia tiedostoja ei nimetä
+            if not rename_files or root == base_directory:
+                return None
+            return f"{parent_dir_name}{os.path.splitext(entry.name)[1]}"
+
+        plan.plan_directory(root, dirs + files, new_name)
+    return plan
+
+
+def rename_directories(base_directory):
+    """
+    Nimeää kaikki kansiot uudelleen Windowsin luomispäivämäärän (ctime)
+    mukaisesti. Uusi nimi on "NNN. <perusnimi>", jossa perusnimenä on
+    alkuperäinen nimi, josta mahdolliset numeroprefiksit on poistettu.
     """
-    for root, dirs, files in os.walk(base_directory, topdown=True):
-        # Järjestetään kansiot luomispäivän mukaan
-        dirs.sort(key=lambda d: os.path.getctime(os.path.join(root, d)))
-        seq = 1
-        for i, d in enumerate(dirs):
-            new_name = f"{seq:03d}. {remove_prefix(d)}"
-            old_path = os.path.join(root, d)
-            new_path = os.path.join(root, new_name)
-            os.rename(old_path, new_path)
-            # Päivitetään dirs-lista, jotta os.walk löytää alihakemistot oikein
-            dirs[i] = new_name
-            seq += 1
+    return plan_renames(base_directory, rename_files=False).apply()
 
 
 def rename_files_to_match_parent(base_directory):
     """
-    Käy läpi kaikki hakemistot ja nimeää kunkin kansion tiedostot uudelleen niin,
-    että niiden nimi on täsmälleen sama kuin kansion nimi (lisäten alkuperäinen tiedostopääte).
-    Jos tiedostoja on useampi samassa kansiossa, kaikista tiedostojen nimi tulee täsmälleen sama,
-    mikä ei ole sallittua – tällöin joudut erottelemaan tiedostot erillisillä lisänumeroilla.
+    Nimeää kunkin kansion tiedostot uudelleen niin, että niiden nimi on sama
+    kuin kansion nimi (lisäten alkuperäinen tiedostopääte). Jos tiedostoja on
+    useampi, ne erotellaan numerolisällä.
     """
-    for root, dirs, files in os.walk(base_directory, topdown=True):
-        # Jos kyseessä on base_directory itsessään, ohitetaan
-        if root == base_directory:
-            continue
-        parent_dir_name = os.path.basename(root)
-        for f in files:
-            ext = os.path.splitext(f)[1]
-            new_name = f"{parent_dir_name}{ext}"
-            old_path = os.path.join(root, f)
-            new_path = os.path.join(root, new_name)
-            os.rename(old_path, new_path)
+    return plan_renames(base_directory, rename_dirs=False).apply()
 
 
 if __name__ == "__main__":
     base_directory = input("Anna kansion polku: ").strip()
-    if os.path.isdir(base_directory):
-        rename_directories(base_directory)
-        rename_files_to_match_parent(base_directory)
-        print("Kansiot on nimetty uudelleen ja tiedostojen nimet päivitetty vastaamaan kansion nimeä.")
-    else:
+    if not os.path.isdir(base_directory):
         print("Annettu polku ei ole kelvollinen hakemisto.")
+    elif ask_rollback(base_directory):
+        dry_run = ask_dry_run()
+        plan = plan_renames(base_directory)
+        if dry_run:
+            print(plan.format_plan())
+        else:
+            print(plan.format_summary())
+            plan.apply()
+            print("Kansiot on nimetty uudelleen ja tiedostojen nimet päivitetty vastaamaan kansion nimeä.")
@@ -0,0 +1,158 @@
+"""
+Usage: ai_response_cache.py
+---------------------------
+Helper module with a persistent, content-addressed cache for AI corrections of
+Mermaid blocks. It is imported by FixMermaidAzureAi.py, fixMermaidWithDeepSeek.py,
+FixMermaidWithOpenAi.py and asyncMermaidFixer.py and is not run directly.
+
+Features:
+- SQLite database (default ~/.mermaid_ai_cache.sqlite) shared by all fixers
+- Key = SHA-256 of the normalized Mermaid block, the model and both prompts,
+  so the same diagram in another file or on another run is answered from the
+  cache, while a change of model or prompt triggers a new request
+- Normalization ignores line-ending style, trailing whitespace on each line
+  and leading/trailing blank lines
+- Size-based LRU eviction: when the stored responses exceed max_bytes, the
+  least recently used entries are removed
+- Hit/miss statistics for the current run and per-entry hit counts
+- The database is opened on first use, so a module-level ResponseCache()
+  in the fixers creates no file when the script is merely imported
+
+Example:
+    from ai_response_cache import ResponseCache
+
+    cache = ResponseCache()
+    key = cache.make_key(code, model, system_prompt, user_prompt)
+    corrected = cache.get(key)
+    if corrected is None:
+        corrected = call_the_api(code)
+        cache.put(key, corrected)
+    print(cache.format_stats())
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".mermaid_ai_cache.sqlite")
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def normalize_block(code):
+    """Normalisoi mermaid-lohkon välimuistiavainta varten."""
+    lines = code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+
+class ResponseCache:
+    """SQLite-pohjainen välimuisti AI-korjauksille, LRU-poisto koon mukaan."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connection = None
+
+    def _db(self):
+        """
+        Avaa tietokannan ensimmäisellä käyttökerralla, jotta pelkkä olion luonti
+        (esim. korjausskriptin tuonti) ei luo tiedostoa eikä aja DDL:ää.
+        """
+        if self._connection is not None:
+            return self._connection
+        self._connection = sqlite3.connect(self.path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+        )
+        self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def make_key(code, model, system_prompt="", user_prompt=""):
+        """Laskee avaimen normalisoidusta lohkosta, mallista ja kehotteista."""
+        digest = hashlib.sha256()
+        for part in (model, system_prompt, user_prompt, normalize_block(code)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Palauttaa tallennetun vastauksen tai None, ja päivittää LRU-aikaleiman."""
+        connection = self._db()
+        row = connection.execute(
+            "SELECT response FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        connection.execute(
+            "UPDATE responses SET last_access = ?, hits = hits + 1 WHERE key = ?",
+            (time.time(), key)
+        )
+        connection.commit()
+        return row[0]
+
+    def put(self, key, response):
+        """Tallentaa vastauksen ja poistaa tarvittaessa vanhimmat merkinnät."""
+        now = time.time()
+        connection = self._db()
+        connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, created, last_access, hits)"
+            " VALUES (?, ?, ?, ?, ?, 0)",
+            (key, response, len(response.encode('utf-8')), now, now)
+        )
+        self._evict()
+        connection.commit()
+
+    def _evict(self):
+        """Poistaa vähiten käytetyt merkinnät, kunnes koko on alle max_bytes."""
+        cursor = self._db().execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, SUM(size) OVER (ORDER BY last_access DESC, created DESC) AS running"
+            "  FROM responses)"
+            " WHERE running > ?)",
+            (self.max_bytes,)
+        )
+        self.evictions += cursor.rowcount
+
+    def stats(self):
+        """Palauttaa tämän ajon ja tietokannan tilastot sanakirjana."""
+        entries, total_bytes, stored_hits = self._db().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total_bytes,
+            "stored_hits": stored_hits,
+        }
+
+    def format_stats(self):
+        """Muotoilee tilastot yhdelle riville."""
+        s = self.stats()
+        return (f"Välimuisti: {s['hits']} osumaa, {s['misses']} ohitusta "
+                f"({s['hit_rate']:.0%}), {s['evictions']} poistettu, "
+                f"{s['entries']} merkintää / {s['bytes'] / 1024:.0f} KiB")
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
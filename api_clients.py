@@ -0,0 +1,133 @@
+"""
+Usage: api_clients.py
+---------------------
+Helper module with a shared, lazy factory for the API clients used by the AI
+scripts (FixMermaidAzureAi.py, fixMermaidWithDeepSeek.py,
+FixMermaidWithOpenAi.py and the assignment generators). It is imported by
+those scripts and is not run directly.
+
+Importing openai alone takes the better part of a second, and every script
+used to build its client at import time. This module:
+- Defers the heavy imports (openai, httpx, tiktoken) until a client or an
+  encoding is actually used; runs that are answered entirely from the offline
+  checker or the response cache never import them
+- LazyClient: a stand-in that builds the real client on first attribute
+  access, so scripts can keep a module-level "client" variable
+- One pooled keep-alive httpx connection pool per process, shared by every
+  synchronous client, and one client per (type, endpoint, key) combination
+- Records how long each deferred import took; format_import_timings()
+  prints them
+
+Example:
+    from api_clients import LazyClient, get_openai_client, format_import_timings
+
+    client = LazyClient(lambda: get_openai_client(api_key, base_url))
+    ...  # openai is imported only when client.chat is first used
+    print(format_import_timings())
+"""
+
+import importlib
+import os
+import threading
+import time
+
+DEFAULT_TIMEOUT = 1200  # sekuntia; generaattorien vastaukset voivat kestää minuutteja
+DEFAULT_MAX_CONNECTIONS = 64
+
+IMPORT_TIMINGS = {}
+_lock = threading.RLock()
+_http_clients = {}
+_clients = {}
+
+
+def timed_import(module_name):
+    """Tuo moduulin ja kirjaa ensimmäisen tuonnin keston."""
+    with _lock:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if module_name not in IMPORT_TIMINGS:
+            IMPORT_TIMINGS[module_name] = time.perf_counter() - started
+        return module
+
+
+def format_import_timings():
+    """Muotoilee viivästettyjen tuontien kestot yhdelle riville."""
+    if not IMPORT_TIMINGS:
+        return "Raskaita kirjastoja ei tuotu."
+    parts = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in IMPORT_TIMINGS.items())
+    return f"Kirjastojen tuonti: {parts}"
+
+
+def shared_http_client():
+    """Palauttaa prosessin yhteisen httpx-yhteysaltaan (keep-alive)."""
+    pid = os.getpid()
+    with _lock:
+        # Haarautettu prosessi ei saa käyttää vanhemman yhteyksiä
+        if pid not in _http_clients:
+            httpx = timed_import("httpx")
+            _http_clients[pid] = httpx.Client(
+                timeout=DEFAULT_TIMEOUT,
+                limits=httpx.Limits(max_connections=DEFAULT_MAX_CONNECTIONS,
+                                    max_keepalive_connections=DEFAULT_MAX_CONNECTIONS)
+            )
+        return _http_clients[pid]
+
+
+def _cached_client(key, factory):
+    """Palauttaa avaimen asiakkaan tai luo sen (yksi asiakas per prosessi ja avain)."""
+    key = (os.getpid(),) + key
+    with _lock:
+        if key not in _clients:
+            _clients[key] = factory()
+        return _clients[key]
+
+
+def get_openai_client(api_key, base_url=None, timeout=DEFAULT_TIMEOUT):
+    """Palauttaa jaetun OpenAI-yhteensopivan (synkronisen) asiakkaan."""
+    def factory():
+        openai = timed_import("openai")
+        return openai.OpenAI(api_key=api_key, base_url=base_url, timeout=timeout,
+                             http_client=shared_http_client())
+    return _cached_client(("openai", api_key, base_url, timeout), factory)
+
+
+def get_azure_client(azure_endpoint, api_key, api_version, timeout=DEFAULT_TIMEOUT):
+    """Palauttaa jaetun Azure OpenAI -asiakkaan."""
+    def factory():
+        openai = timed_import("openai")
+        return openai.AzureOpenAI(azure_endpoint=azure_endpoint, api_key=api_key,
+                                  api_version=api_version, timeout=timeout,
+                                  http_client=shared_http_client())
+    return _cached_client(("azure", azure_endpoint, api_key, api_version, timeout), factory)
+
+
+def make_async_openai_client(**kwargs):
+    """
+    Luo AsyncOpenAI-asiakkaan. Async-asiakas sidotaan tapahtumasilmukkaan,
+    joten sitä ei jaeta; vain openai-tuonti viivästetään.
+    """
+    return timed_import("openai").AsyncOpenAI(**kwargs)
+
+
+def make_async_azure_client(**kwargs):
+    """Luo AsyncAzureOpenAI-asiakkaan (openai tuodaan vasta nyt)."""
+    return timed_import("openai").AsyncAzureOpenAI(**kwargs)
+
+
+def get_encoding(name):
+    """Palauttaa tiktoken-koodauksen; tiktoken tuodaan vasta ensimmäisellä kutsulla."""
+    return timed_import("tiktoken").get_encoding(name)
+
+
+class LazyClient:
+    """Luo varsinaisen asiakkaan vasta, kun sen attribuuttia käytetään ensimmäisen kerran."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+
+    def __getattr__(self, name):
+        # __getattr__ kutsutaan vain puuttuville attribuuteille, eli asiakkaan omille
+        if self._client is None:
+            self._client = self._factory()
+        return getattr(self._client, name)
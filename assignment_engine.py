@@ -0,0 +1,356 @@
+"""
+Usage: assignment_engine.py
+---------------------------
+Helper module with the shared engine behind the assignment generators
+(DPAssignmentGeneratori.py, DPAssignmentGeneratoriLOGO.py and
+generateAssignments.py). It is imported by those scripts and is not run
+directly.
+
+Features:
+- Topics from a list, or from a CSV or YAML manifest (load_manifest); a YAML
+  manifest can also set the model, prompts and other options
+- Prompt template, system prompt and model are parameters (AssignmentConfig);
+  "{topic}" in the template is replaced with the topic
+- N topics in flight at once over one pooled keep-alive HTTP client, created
+  lazily on the first request (api_clients.py)
+- Optional shared rate limiter (rate_limiter.py)
+- Durable job queue (job_queue.py) in the output folder: retries with
+  backoff, a restarted run skips topics that are already done, and topics
+  that failed every attempt in an earlier run are tried again
+- Streaming (streaming_output.py) or buffered responses; both write the file
+  atomically
+- Per-topic timing, time to first byte and token usage printed and appended
+  to a CSV file in the output folder, plus a run summary with throughput
+  (topics per minute, tokens per second) and latency percentiles
+
+Example:
+    from assignment_engine import AssignmentConfig, AssignmentEngine, make_client
+
+    config = AssignmentConfig("deepseek-chat", "Generoi 2 tehtävää aiheesta '{topic}'.")
+    engine = AssignmentEngine(make_client(api_key, base_url), config,
+                              "tehtavat", workers=8)
+    engine.run(["Ohm's law", "Diode"])
+"""
+
+import csv
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api_clients import LazyClient, get_openai_client
+from job_queue import JobQueue
+from streaming_output import stream_completion_to_file
+
+JOB_QUEUE_FILE = ".tehtavajono.sqlite"
+FAILED_TOPICS_FILE = "epaonnistuneet_aiheet.txt"
+STATS_FILE = "tehtavatilastot.csv"
+WORKER_POLL_SECONDS = 0.5  # kuinka usein vapaa säie tarkistaa, palasiko käsittelyssä ollut työ jonoon
+STATS_FIELDS = ["topic", "file_path", "seconds", "first_byte_seconds",
+                "prompt_tokens", "completion_tokens", "total_tokens", "error"]
+
+
+def make_client(api_key, base_url, timeout=1200):
+    """
+    Palauttaa OpenAI-yhteensopivan asiakkaan, joka luodaan vasta ensimmäisellä
+    kutsulla ja käyttää prosessin yhteistä keep-alive-yhteysallasta (api_clients.py).
+    """
+    return LazyClient(lambda: get_openai_client(api_key, base_url, timeout))
+
+
+def load_manifest(path):
+    """
+    Lukee aiheet CSV- tai YAML-tiedostosta ja palauttaa sanakirjan, jossa on
+    vähintään avain "topics".
+    - CSV: sarake "topic" (tai "aihe"), muuten ensimmäinen sarake
+    - YAML: lista aiheita, tai sanakirja, jossa on "topics" ja valinnaiset
+      asetukset (model, prompt_template, system_prompt, max_tokens, ...)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        if not rows:
+            return {"topics": []}
+        header = [column.strip().lower() for column in rows[0]]
+        if "topic" in header or "aihe" in header:
+            column = header.index("topic") if "topic" in header else header.index("aihe")
+            rows = rows[1:]
+        else:
+            column = 0
+        topics = [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+        return {"topics": topics}
+    if extension in (".yaml", ".yml"):
+        import yaml
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        if isinstance(data, list):
+            data = {"topics": data}
+        if not isinstance(data, dict) or not isinstance(data.get("topics"), list):
+            raise ValueError(f"YAML-tiedostosta puuttuu topics-lista: {path}")
+        data["topics"] = [str(topic).strip() for topic in data["topics"] if str(topic).strip()]
+        return data
+    raise ValueError(f"Tuntematon aihetiedoston muoto (käytä .csv, .yaml tai .yml): {path}")
+
+
+def sanitize_file_name(name):
+    """Poistaa epäkelvot merkit tiedostonimestä."""
+    return "".join(c for c in name if c.isalnum() or c in "._- ").rstrip()
+
+
+class AssignmentConfig:
+    """Generoinnin asetukset: malli, kehotteet ja vastauksen käsittely."""
+
+    def __init__(self, model, prompt_template, system_prompt="", max_tokens=8000,
+                 temperature=None, stream=True, file_name_length=150):
+        self.model = model
+        # "{topic}" korvataan aiheella
+        self.prompt_template = prompt_template
+        self.system_prompt = system_prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stream = stream
+        self.file_name_length = file_name_length
+
+    def messages(self, topic):
+        """Muodostaa aiheen chat-viestit."""
+        messages = []
+        if self.system_prompt:
+            messages.append({"role": "system", "content": self.system_prompt})
+        messages.append({"role": "user", "content": self.prompt_template.replace("{topic}", topic)})
+        return messages
+
+    def create_kwargs(self):
+        """Palauttaa API-kutsun lisäparametrit."""
+        kwargs = {"max_tokens": self.max_tokens}
+        if self.temperature is not None:
+            kwargs["temperature"] = self.temperature
+        return kwargs
+
+
+class TopicResult:
+    """Yhden aiheen yrityksen tulos ja tilastot."""
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.file_path = None
+        self.seconds = 0.0
+        self.first_byte_seconds = None
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.total_tokens = None
+        self.error = None
+
+    @property
+    def ok(self):
+        return self.file_path is not None
+
+    def format_stats(self):
+        """Muotoilee aiheen tilastot yhdelle riville."""
+        first_byte = (f"{self.first_byte_seconds:.1f} s" if self.first_byte_seconds is not None
+                      else "-")
+        return (f"{self.seconds:.1f} s, ensimmäinen tavu {first_byte}, tokenit "
+                f"{self.prompt_tokens or '?'} + {self.completion_tokens or '?'} = "
+                f"{self.total_tokens or '?'}")
+
+    def as_row(self):
+        """Palauttaa tilastorivin CSV-tiedostoon (ajat millisekunnin tarkkuudella)."""
+        values = [getattr(self, field) for field in STATS_FIELDS]
+        return [round(value, 3) if isinstance(value, float) else value for value in values]
+
+
+class AssignmentEngine:
+    """Ajaa aiheita rinnakkain jaetulla asiakkaalla, rajoittimella ja työjonolla."""
+
+    def __init__(self, client, config, output_directory, workers=4, rate_limiter=None,
+                 max_attempts=5, retry_base_delay=30, estimated_completion_tokens=4000):
+        self.client = client
+        self.config = config
+        self.output_directory = output_directory
+        self.workers = workers
+        self.rate_limiter = rate_limiter
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.estimated_completion_tokens = estimated_completion_tokens
+        self.results = []
+        self._lock = threading.Lock()
+
+    def task_file_path(self, topic):
+        """Palauttaa aiheen tallennuspolun."""
+        length = self.config.file_name_length
+        file_name = sanitize_file_name(topic[:length].strip().replace(" ", "_")) + ".md"
+        return os.path.join(self.output_directory, file_name)
+
+    def estimate_tokens(self, messages):
+        """Arvioi pyynnön tokenit: noin 3 merkkiä / token kehotteille + arvioitu vastaus."""
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 3
+        return prompt_tokens + self.estimated_completion_tokens
+
+    def _generate_buffered(self, topic, messages, file_path, result):
+        """Hakee koko vastauksen kerralla ja kirjoittaa sen atomisesti."""
+        response = self.client.chat.completions.create(
+            model=self.config.model,
+            messages=messages,
+            stream=False,
+            **self.config.create_kwargs()
+        )
+        if not response or not response.choices:
+            raise ValueError("API-vastaus ei sisällä 'choices'-osaa tai se on tyhjä.")
+        usage = getattr(response, "usage", None)
+        if usage:
+            result.prompt_tokens = usage.prompt_tokens
+            result.completion_tokens = usage.completion_tokens
+            result.total_tokens = usage.total_tokens
+        tasks_and_examples = (response.choices[0].message.content or "").strip()
+        if not tasks_and_examples:
+            raise ValueError("API-vastaus on tyhjä tai puutteellinen.")
+        temporary_path = file_path + ".part"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            f.write(f"# Aihe: {topic}\n\n{tasks_and_examples}\n")
+        os.replace(temporary_path, file_path)
+
+    def generate(self, topic):
+        """Generoi yhden aiheen tehtävät tiedostoon ja palauttaa TopicResult-olion."""
+        result = TopicResult(topic)
+        file_path = self.task_file_path(topic)
+        messages = self.config.messages(topic)
+        reserved_tokens = None
+        if self.rate_limiter is not None:
+            reserved_tokens = self.rate_limiter.acquire(self.estimate_tokens(messages))
+        started = time.perf_counter()
+        try:
+            if self.config.stream:
+                streamed = stream_completion_to_file(
+                    self.client, file_path, f"# Aihe: {topic}\n\n",
+                    model=self.config.model, messages=messages, **self.config.create_kwargs()
+                )
+                result.first_byte_seconds = streamed.first_byte_seconds
+                result.prompt_tokens = streamed.prompt_tokens
+                result.completion_tokens = streamed.completion_tokens
+                result.total_tokens = streamed.total_tokens
+            else:
+                self._generate_buffered(topic, messages, file_path, result)
+            result.file_path = file_path
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+        finally:
+            result.seconds = time.perf_counter() - started
+            if reserved_tokens is not None:
+                # Ilman usage-tietoa oletetaan, että varaus kului kokonaan
+                used_tokens = result.total_tokens if result.total_tokens is not None else reserved_tokens
+                self.rate_limiter.reconcile(reserved_tokens, used_tokens)
+        return result
+
+    def _record(self, result):
+        """Tallentaa tuloksen muistiin ja tilastotiedostoon."""
+        stats_path = os.path.join(self.output_directory, STATS_FILE)
+        with self._lock:
+            self.results.append(result)
+            new_file = not os.path.exists(stats_path)
+            with open(stats_path, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(STATS_FIELDS)
+                writer.writerow(result.as_row())
+
+    def _worker(self, jobs):
+        """
+        Työsäie: ottaa erääntyneitä aiheita jonosta, kunnes odottavia tai muiden
+        säikeiden käsittelemiä töitä ei ole. Käsittelyssä olevat työt voivat palata
+        jonoon uusintayritykseen, joten säie odottaa niitä, jotta uusinnat
+        ajetaan edelleen rinnakkain.
+        """
+        while True:
+            topic = jobs.claim()
+            if topic is None:
+                wait = jobs.seconds_until_next()
+                if wait is None:
+                    if not jobs.has_unfinished():
+                        return
+                    wait = WORKER_POLL_SECONDS
+                time.sleep(min(wait, 5.0))
+                continue
+            print(f"Generoi tehtäviä ja esimerkkejä aiheesta: {topic}...")
+            try:
+                result = self.generate(topic)
+                self._record(result)
+            except Exception as e:
+                # Aihe palautetaan jonoon, jotta muut säikeet eivät jää odottamaan sitä
+                jobs.fail(topic, f"{type(e).__name__}: {e}")
+                raise
+            if result.ok:
+                jobs.complete(topic, result.file_path)
+                print(f"Aihe '{topic}' valmis: {result.format_stats()}")
+            else:
+                state = jobs.fail(topic, result.error)
+                print(f"Virhe aiheen '{topic}' käsittelyssä: {result.error} (tila: {state})")
+
+    def run(self, topics, retry_failed=True):
+        """
+        Ajaa kaikki aiheet. Jo valmiit aiheet (edellisistä ajoista) ohitetaan;
+        aiemmissa ajoissa lopullisesti epäonnistuneet palautetaan jonoon, ellei
+        retry_failed ole False.
+        Palauttaa tämän ajon TopicResult-oliot. Jos jokin työsäie kaatuu,
+        sen poikkeus nostetaan yhteenvedon jälkeen.
+        """
+        os.makedirs(self.output_directory, exist_ok=True)
+        jobs = JobQueue(os.path.join(self.output_directory, JOB_QUEUE_FILE),
+                        self.max_attempts, self.retry_base_delay)
+        jobs.add(topics)
+        if retry_failed:
+            retried = jobs.retry_failed()
+            if retried:
+                print(f"Palautettu jonoon {retried} aiemmin epäonnistunutta aihetta.")
+        print(jobs.format_counts())
+        self.results = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._worker, jobs) for _ in range(self.workers)]
+        # Kaatuneen työsäikeen virhe tulostetaan ja nostetaan lopuksi uudelleen;
+        # sen kesken jäänyt aihe on jo palautettu jonoon muille säikeille.
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        for error in errors:
+            print(f"Työsäie kaatui: {type(error).__name__}: {error}")
+        print(self.format_summary(time.perf_counter() - started))
+        if self.rate_limiter is not None:
+            print(self.rate_limiter.format_stats())
+        print(jobs.format_counts())
+        failed_topics = [topic for topic, _ in jobs.failed_topics()]
+        if failed_topics:
+            log_failed_topics(failed_topics, os.path.join(self.output_directory, FAILED_TOPICS_FILE))
+        elif not errors:
+            print("Kaikki aiheet käsitelty onnistuneesti!")
+        print(f"Tehtävät ja esimerkit tallennettu kansioon: {self.output_directory}")
+        jobs.close()
+        if errors:
+            raise errors[0]
+        return self.results
+
+    def format_summary(self, wall_seconds):
+        """Muotoilee ajon yhteenvedon: läpäisy, tokenit ja viiveet."""
+        done = [r for r in self.results if r.ok]
+        tokens = sum(r.total_tokens or 0 for r in done)
+        lines = [
+            f"Yrityksiä {len(self.results)}, onnistui {len(done)} aihetta "
+            f"{wall_seconds:.1f} sekunnissa ({len(done) / wall_seconds * 60 if wall_seconds else 0:.1f} aihetta/min).",
+            f"Tokeneita {tokens} ({tokens / wall_seconds if wall_seconds else 0:.0f} tokenia/s).",
+        ]
+        durations = sorted(r.seconds for r in done)
+        if len(durations) >= 2:
+            percentiles = statistics.quantiles(durations, n=20, method="inclusive")
+            lines.append(f"Kesto: mediaani {statistics.median(durations):.1f} s, "
+                         f"p95 {percentiles[18]:.1f} s, pisin {durations[-1]:.1f} s.")
+        first_bytes = [r.first_byte_seconds for r in done if r.first_byte_seconds is not None]
+        if first_bytes:
+            lines.append(f"Ensimmäinen tavu: mediaani {statistics.median(first_bytes):.1f} s.")
+        return "\n".join(lines)
+
+
+def log_failed_topics(failed_topics, log_file_path):
+    with open(log_file_path, 'w', encoding='utf-8') as log_file:
+        log_file.write("Aiheet, joita ei saatu käsiteltyä API-virheiden vuoksi:\n\n")
+        for topic in failed_topics:
+            log_file.write(f"- {topic}\n")
+    print(f"Lista epäonnistuneista aiheista tallennettu tiedostoon: {log_file_path}")
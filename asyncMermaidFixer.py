@@ -0,0 +1,218 @@
+"""
+Usage: asyncMermaidFixer.py
+---------------------------
+Helper module with an asyncio engine for the AI Mermaid fixers
+(FixMermaidAzureAi.py, fixMermaidWithDeepSeek.py and FixMermaidWithOpenAi.py).
+It is imported by those scripts and is not run directly.
+
+The synchronous scripts call the API inside re.sub(), so every Mermaid block
+waits for a full round trip before the next one is sent. This engine:
+1. Reads every file and extracts all ```mermaid blocks first
+2. Sends all blocks concurrently through an async OpenAI-compatible client
+   (AsyncOpenAI / AsyncAzureOpenAI); an asyncio.Semaphore bounds the number
+   of requests in flight
+3. Splices the corrected blocks back into each file and writes only the
+   files that changed
+
+Before anything is sent, every block goes through mermaid_validator.py: the
+deterministic fixMermaid rules are applied and the result is parsed offline.
+Blocks that parse are written back without an API call; only blocks that fail
+are sent, with the parse error attached to the prompt.
+
+Identical blocks (after normalization) are sent only once per run, and if the
+config has a ResponseCache (ai_response_cache.py), blocks answered on earlier
+runs cost no API call at all.
+
+Any OpenAI-compatible server works, including a local stub server: pass a
+client whose base_url points to it.
+
+Example:
+    from openai import AsyncOpenAI
+    from asyncMermaidFixer import MermaidFixConfig, fix_files
+
+    config = MermaidFixConfig(model="deepseek-chat", system_prompt=..., user_prompt=...)
+    fix_files(lambda: AsyncOpenAI(api_key=..., base_url=...), file_paths, config,
+              max_concurrency=16)
+"""
+
+import asyncio
+import re
+import time
+
+from ai_response_cache import ResponseCache
+from mermaid_validator import VALID, precheck_block
+
+# Sama lohkolauseke kuin synkronisissa skripteissä
+MERMAID_BLOCK_PATTERN = re.compile(r"```mermaid\s*\n(.*?)\n```", re.DOTALL)
+
+
+class MermaidFixConfig:
+    """Yhden palveluntarjoajan asetukset: malli, kehotteet ja vastauksen jälkikäsittely."""
+
+    def __init__(self, model, system_prompt, user_prompt, max_tokens=8000,
+                 temperature=None, postprocess=None, cache=None):
+        self.model = model
+        self.system_prompt = system_prompt
+        # user_prompt on teksti, jonka perään mermaid-koodi liitetään
+        self.user_prompt = user_prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.postprocess = postprocess
+        # Valinnainen ai_response_cache.ResponseCache
+        self.cache = cache
+
+    def cache_key(self, code):
+        """Palauttaa lohkon välimuistiavaimen (normalisoitu koodi + malli + kehotteet)."""
+        return ResponseCache.make_key(code, self.model, self.system_prompt, self.user_prompt)
+
+    def messages(self, code, error=None):
+        """
+        Muodostaa chat-viestit yhdelle mermaid-lohkolle.
+        Jos tarkistin löysi virheen, se liitetään kehotteen loppuun.
+        """
+        content = f"{self.user_prompt}{code}"
+        if error:
+            content += f"\n\nTarkistimen löytämä virhe: {error}"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": content},
+        ]
+
+
+def extract_blocks(content):
+    """Palauttaa tiedoston mermaid-lohkot listana (alku, loppu, koodi)."""
+    return [(m.start(), m.end(), m.group(1)) for m in MERMAID_BLOCK_PATTERN.finditer(content)]
+
+
+def splice_blocks(content, blocks, corrected_codes):
+    """
+    Korvaa lohkot korjatuilla versioilla. Lohko, jonka korjaus on tyhjä tai
+    sama kuin alkuperäinen, jätetään koskemattomaksi.
+    """
+    pieces = []
+    position = 0
+    for (start, end, original), corrected in zip(blocks, corrected_codes):
+        pieces.append(content[position:start])
+        if corrected and corrected != original:
+            pieces.append(f"```mermaid\n{corrected}\n```")
+        else:
+            pieces.append(content[start:end])
+        position = end
+    pieces.append(content[position:])
+    return "".join(pieces)
+
+
+async def correct_block(client, semaphore, config, code, error=None, original=None):
+    """
+    Lähettää yhden lohkon korjattavaksi; virheen sattuessa palauttaa alkuperäisen
+    lohkon (original, oletuksena code), ei tarkistimen esikorjaamaa versiota.
+    error on mermaid_validator-tarkistimen virheviesti, joka liitetään kehotteeseen.
+    Onnistunut korjaus tallennetaan välimuistiin, jos sellainen on määritetty.
+    """
+    if config.cache is not None:
+        key = config.cache_key(code)
+        cached = config.cache.get(key)
+        if cached is not None:
+            return cached
+    kwargs = {
+        "model": config.model,
+        "messages": config.messages(code, error),
+        "stream": False,
+        "max_tokens": config.max_tokens,
+    }
+    if config.temperature is not None:
+        kwargs["temperature"] = config.temperature
+    async with semaphore:
+        try:
+            response = await client.chat.completions.create(**kwargs)
+            if not response or not response.choices:
+                raise ValueError("API-vastaus ei sisällä 'choices'-osaa tai se on tyhjä.")
+            corrected_code = (response.choices[0].message.content or "").strip()
+            if not corrected_code:
+                raise ValueError("API-vastaus on tyhjä tai puutteellinen.")
+            if config.postprocess:
+                corrected_code = config.postprocess(corrected_code)
+            if config.cache is not None:
+                config.cache.put(key, corrected_code)
+            return corrected_code
+        except Exception as e:
+            print(f"Virhe API-kutsussa: {e}")
+            return code if original is None else original
+
+
+async def fix_files_async(client, file_paths, config, max_concurrency=8):
+    """
+    Korjaa kaikkien tiedostojen mermaid-lohkot rinnakkain.
+    Palauttaa muokattujen tiedostojen polut.
+    """
+    files = []
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        blocks = extract_blocks(content)
+        if blocks:
+            files.append((file_path, content, blocks))
+        else:
+            print(f"Ei mermaid-lohkoja: {file_path}")
+
+    block_count = sum(len(blocks) for _, _, blocks in files)
+    print(f"Löydetty {block_count} mermaid-lohkoa {len(files)} tiedostosta, "
+          f"lähetetään korjattavaksi (enintään {max_concurrency} pyyntöä kerrallaan)...")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    started = time.perf_counter()
+    # Sama (normalisoitu) lohko lähetetään vain kerran, vaikka se esiintyisi monessa tiedostossa.
+    # Tarkistimen hyväksymät lohkot eivät tarvitse API-kutsua lainkaan.
+    results = {}
+    tasks = {}
+    for _, _, blocks in files:
+        for _, _, code in blocks:
+            key = config.cache_key(code)
+            if key in results or key in tasks:
+                continue
+            fixed, status, error = precheck_block(code)
+            if status == VALID:
+                results[key] = fixed
+            else:
+                tasks[key] = asyncio.ensure_future(
+                    correct_block(client, semaphore, config, fixed, error, original=code)
+                )
+    await asyncio.gather(*tasks.values())
+    results.update((key, task.result()) for key, task in tasks.items())
+    per_file_results = [
+        [results[config.cache_key(code)] for _, _, code in blocks]
+        for _, _, blocks in files
+    ]
+    print(f"{len(results)} erillistä lohkoa käsitelty {time.perf_counter() - started:.1f} sekunnissa, "
+          f"{len(results) - len(tasks)} oli jo kelvollisia ja ohitettiin.")
+    if config.cache is not None:
+        print(config.cache.format_stats())
+
+    modified = []
+    for (file_path, content, blocks), corrected_codes in zip(files, per_file_results):
+        new_content = splice_blocks(content, blocks, corrected_codes)
+        if new_content != content:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+            print(f"Muokattu: {file_path}")
+            modified.append(file_path)
+        else:
+            print(f"Ei muutoksia: {file_path}")
+    return modified
+
+
+def fix_files(client_factory, file_paths, config, max_concurrency=8):
+    """
+    Synkroninen sisäänkäynti: luo async-asiakkaan tapahtumasilmukan sisällä,
+    ajaa fix_files_async-funktion ja sulkee asiakkaan.
+    """
+    async def runner():
+        client = client_factory()
+        try:
+            return await fix_files_async(client, file_paths, config, max_concurrency)
+        finally:
+            close = getattr(client, "close", None)
+            if close is not None:
+                await close()
+
+    return asyncio.run(runner())
@@ -0,0 +1,187 @@
+"""
+Usage: batchPdfRenderer.py
+--------------------------
+This script converts a whole folder of HTML files (for example the output of the
+Markdown scripts) to PDF with generate-pdf.js. Instead of starting a new headless
+Chromium for every file, it starts generate-pdf.js once in batch mode: one
+long-lived browser with a pool of pages renders the files from a shared queue in
+parallel, so the browser startup is paid once per run instead of once per file.
+
+Features:
+- Finds all .html files in the folder and its subfolders (tree_walker.py)
+- Writes each PDF next to its HTML file, or to the same relative path under a
+  separate output folder
+- Skips HTML files whose PDF is already newer than the HTML. Each PDF is
+  written to <name>.pdf.part and renamed into place only when it is complete,
+  so a failed or interrupted render never leaves a truncated PDF to be skipped
+- Configurable number of browser pages rendering in parallel (default: 4)
+- Optional debug screenshot (.png next to each PDF)
+- Optional offline mode: network requests are blocked and Mermaid diagrams are
+  rendered with the local bundle (vendor/mermaid.min.js, see generate-pdf.js)
+- Reports the render time of each file and a summary at the end, and warns
+  about files whose Mermaid diagrams were not all drawn within the time limit
+- PdfRenderer can also be used from other scripts:
+
+      from batchPdfRenderer import PdfRenderer
+
+      with PdfRenderer(pages=4) as renderer:
+          for result in renderer.render([("a.html", "a.pdf"), ("b.html", "b.pdf")]):
+              print(result)
+
+Requirements:
+- Node.js and Puppeteer (see generate-pdf.js)
+
+To use:
+1. Run the script: python batchPdfRenderer.py
+2. When prompted, enter the path to the folder containing the HTML files
+3. Enter the output folder, or press Enter to write the PDFs next to the HTML files
+4. Enter the number of browser pages, whether to save debug screenshots and
+   whether to render offline
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+
+from tree_walker import iter_files
+
+GENERATE_PDF_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "generate-pdf.js")
+DEFAULT_PAGES = 4
+
+
+class PdfRenderer:
+    """
+    Pitkäikäinen generate-pdf.js --batch -prosessi. Työt kirjoitetaan sen stdiniin
+    JSON-riveinä ja tulokset luetaan stdoutista; selain pysyy käynnissä, kunnes
+    renderöijä suljetaan.
+    """
+
+    def __init__(self, pages=DEFAULT_PAGES, offline=False, mermaid_bundle=None,
+                 node="node", script=GENERATE_PDF_SCRIPT):
+        self.pages = pages
+        self.command = [node, script, "--batch", "--pages", str(pages)]
+        if offline:
+            self.command.append("--offline")
+        if mermaid_bundle:
+            self.command += ["--mermaid", mermaid_bundle]
+        self.process = None
+        self._next_id = 0
+
+    def start(self):
+        # Lokiviestit (stderr) näkyvät suoraan konsolissa
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, encoding='utf-8', bufsize=1)
+        return self
+
+    def close(self):
+        """Sulkee stdinin, jolloin selain suljetaan, kun jono on käsitelty."""
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write_jobs(self, jobs):
+        """Kirjoittaa työt omassa säikeessään, jotta tulosten lukeminen ei jumitu täyteen putkeen."""
+        try:
+            for job in jobs:
+                self.process.stdin.write(json.dumps(job, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass  # Prosessi päättyi; lukija huomaa sen
+
+    def render(self, pairs, screenshots=False):
+        """
+        Renderöi parit (html-polku, pdf-polku). Palauttaa tulokset sitä mukaa kuin
+        ne valmistuvat: sanakirjat, joissa input, output, ok, error, warning ja ms.
+        warning kertoo piirtämättä jääneistä Mermaid-kaavioista.
+        """
+        jobs = {}
+        for input_path, output_path in pairs:
+            self._next_id += 1
+            job = {"id": self._next_id, "input": os.path.abspath(input_path),
+                   "output": os.path.abspath(output_path)}
+            if screenshots:
+                job["screenshot"] = os.path.splitext(job["output"])[0] + ".png"
+            jobs[job["id"]] = job
+        writer = threading.Thread(target=self._write_jobs, args=(list(jobs.values()),), daemon=True)
+        writer.start()
+        while jobs:
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError(f"generate-pdf.js päättyi kesken, {len(jobs)} tiedostoa jäi tekemättä.")
+            result = json.loads(line)
+            job = jobs.pop(result["id"], None)
+            if job is None:
+                continue
+            yield dict(result, input=job["input"], output=job["output"])
+        writer.join()
+
+
+def find_html_jobs(input_folder, output_folder=None, skip_current=True):
+    """
+    Etsii HTML-tiedostot ja palauttaa parit (html-polku, pdf-polku) sekä
+    ohitettujen määrän. Ohitetaan tiedostot, joiden PDF on HTML:ää uudempi.
+    """
+    pairs = []
+    skipped = 0
+    for entry in iter_files(input_folder, extensions=[".html"]):
+        relative = os.path.relpath(entry.path, input_folder)
+        output_path = os.path.splitext(os.path.join(output_folder or input_folder, relative))[0] + ".pdf"
+        if skip_current and os.path.exists(output_path) and \
+                os.path.getmtime(output_path) >= entry.stat().st_mtime:
+            skipped += 1
+            continue
+        pairs.append((entry.path, output_path))
+    return pairs, skipped
+
+
+def render_folder(input_folder, output_folder=None, pages=DEFAULT_PAGES, screenshots=False, offline=False):
+    """Renderöi kansion HTML-tiedostot PDF:ksi yhdellä selaimella. Palauttaa epäonnistuneiden määrän."""
+    pairs, skipped = find_html_jobs(input_folder, output_folder)
+    print(f"{len(pairs)} HTML-tiedostoa renderöitävänä, {skipped} ajan tasalla olevaa ohitettu.")
+    if not pairs:
+        return 0
+    for _, output_path in pairs:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    started = time.perf_counter()
+    failed = 0
+    warned = 0
+    render_ms = 0
+    with PdfRenderer(pages, offline) as renderer:
+        for result in renderer.render(pairs, screenshots):
+            render_ms += result["ms"]
+            if result["ok"]:
+                print(f"PDF luotu: {result['output']} ({result['ms']} ms)")
+                if result.get("warning"):
+                    warned += 1
+                    print(f"Varoitus tiedostossa {result['input']}: {result['warning']}")
+            else:
+                failed += 1
+                print(f"Virhe tiedostossa {result['input']}: {result['error']}")
+    elapsed = time.perf_counter() - started
+    print(f"Valmis: {len(pairs) - failed}/{len(pairs)} PDF:ää {elapsed:.1f} sekunnissa, "
+          f"keskimäärin {render_ms / len(pairs):.0f} ms renderöintiä tiedostoa kohden.")
+    if warned:
+        print(f"{warned} PDF:ään jäi piirtämättömiä Mermaid-kaavioita.")
+    return failed
+
+
+if __name__ == "__main__":
+    input_folder = input("Anna polku kansioon, jossa HTML-tiedostot ovat: ").strip()
+    if not os.path.isdir(input_folder):
+        print(f"Virhe: Polku '{input_folder}' ei ole kelvollinen kansio.")
+    else:
+        output_folder = input("Anna PDF-tiedostojen kansio (Enter = HTML-tiedostojen viereen): ").strip() or None
+        pages = input(f"Montako selainsivua rinnakkain? (Enter = {DEFAULT_PAGES}): ").strip()
+        screenshots = input("Tallennetaanko debug-kuvakaappaukset? (k/E): ").strip().lower() == 'k'
+        offline = input("Renderöidäänkö ilman verkkoa paikallisella Mermaid-paketilla? (k/E): ").strip().lower() == 'k'
+        render_folder(input_folder, output_folder, int(pages) if pages else DEFAULT_PAGES, screenshots, offline)
@@ -0,0 +1,317 @@
+"""
+Usage: benchmarkAiScripts.py
+----------------------------
+This script benchmarks the AI scripts against the local stub server
+(mockOpenAiServer.py): the assignment generators and the Mermaid fixers run
+with their real prompts and settings, but every request goes to the stub, so
+no network access or API key is needed and no tokens are spent.
+
+Features:
+- Each scenario starts from an empty output folder and an empty response
+  cache in a temporary directory, and resets the server counters
+- Reports wall time, throughput, server-side latency (median, p95), requests
+  in flight at most, status codes and token usage per scenario
+- Every scenario also checks the behaviour it exercises and reports OK/VIRHE;
+  the script exits with status 1 if any check fails
+- Reproducible: the stub's faults are seeded, so the same settings give the
+  same 429/500 responses and cut-off streams
+
+Scenarios:
+- Generator (DPAssignmentGeneratori.py settings) with 1 and 8 workers:
+  concurrency and throughput
+- Generator (DPAssignmentGeneratoriLOGO.py settings) with a RateLimiter against
+  a server that answers 429 above its request rate: no 429 responses expected
+- Generator without a limiter against random 429 and 500 responses and cut-off
+  streams: every topic must still finish (retries and resumed .part files)
+- fixMermaidWithDeepSeek.py one block at a time and asynchronously: only the
+  distinct broken blocks are sent, the async mode keeps several in flight
+- A repeated async run: everything is answered from the response cache
+- FixMermaidAzureAi.py batching mode: the broken blocks go in a few batch
+  requests
+
+Requirements:
+- OpenAI Python package
+- The scripts and shared modules of this repository
+
+To use:
+1. Run the script: python benchmarkAiScripts.py
+2. When prompted, enter the number of topics and Markdown files per scenario,
+   whether to show the scripts' own output, and optionally a CSV file for the
+   results
+"""
+
+import contextlib
+import csv
+import io
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from ai_response_cache import ResponseCache
+from assignment_engine import AssignmentEngine, make_client
+from mockOpenAiServer import MockOpenAiServer, MockSettings
+from rate_limiter import RateLimiter
+
+DEFAULT_SCALE = 24
+MOCK_API_KEY = "mock"
+SEED = 1
+RESULT_FIELDS = ["scenario", "seconds", "items", "items_per_minute", "requests", "status_counts",
+                 "max_in_flight", "p50_seconds", "p95_seconds", "prompt_tokens",
+                 "completion_tokens", "checks_passed"]
+
+VALID_BLOCK = "flowchart TD\n  A[Alku] --> B{Valinta}\n  B -->|Kyllä| C[Loppu]"
+SHARED_BROKEN_BLOCK = "sequenceDiagram\n  Alice->>Bob Hei"
+
+
+def base_settings(**overrides):
+    """Palvelimen perusasetukset: lyhyet viiveet, jotta skenaariot valmistuvat nopeasti."""
+    settings = MockSettings(latency=0.05, jitter=0.05, tokens_per_second=2000,
+                            completion_tokens=200, seed=SEED)
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return settings
+
+
+class ScenarioResult:
+    """Yhden skenaarion mittaukset ja tarkistukset."""
+
+    def __init__(self, name, seconds, items, server_stats):
+        self.name = name
+        self.seconds = seconds
+        self.items = items
+        self.server_stats = server_stats
+        self.checks = []
+
+    def check(self, description, passed):
+        self.checks.append((description, bool(passed)))
+
+    @property
+    def ok(self):
+        return all(passed for _, passed in self.checks)
+
+    def format_report(self):
+        """Muotoilee skenaarion tuloksen ja tarkistukset."""
+        stats = self.server_stats
+        codes = ", ".join(f"{code}: {count}" for code, count in stats["status_counts"].items()) or "-"
+        latency = (f"mediaani {stats['p50_seconds']:.2f} s, p95 {stats['p95_seconds']:.2f} s"
+                   if stats["p95_seconds"] is not None else "-")
+        lines = [
+            f"== {self.name} ==",
+            f"{self.items} kohdetta {self.seconds:.2f} sekunnissa "
+            f"({self.items / self.seconds * 60 if self.seconds else 0:.0f} / min)",
+            f"Pyyntöjä {stats['requests']} ({codes}), enintään {stats['max_in_flight']} kerrallaan, "
+            f"kesto {latency}, tokenit {stats['prompt_tokens']} + {stats['completion_tokens']}",
+        ]
+        lines += [f"  [{'OK' if passed else 'VIRHE'}] {description}" for description, passed in self.checks]
+        return "\n".join(lines)
+
+    def as_row(self):
+        stats = self.server_stats
+        return [self.name, round(self.seconds, 3), self.items,
+                round(self.items / self.seconds * 60, 1) if self.seconds else 0,
+                stats["requests"], " ".join(f"{c}:{n}" for c, n in stats["status_counts"].items()),
+                stats["max_in_flight"], stats["p50_seconds"], stats["p95_seconds"],
+                stats["prompt_tokens"], stats["completion_tokens"],
+                sum(passed for _, passed in self.checks)]
+
+
+def run_scenario(server, name, settings, work, items, verbose):
+    """
+    Nollaa palvelimen, ajaa work()-funktion ja palauttaa ScenarioResult-olion.
+    work() palauttaa arvon, joka annetaan skenaarion tarkistuksille.
+    """
+    server.reset(settings)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    started = time.perf_counter()
+    with output:
+        value = work()
+    seconds = time.perf_counter() - started
+    result = ScenarioResult(name, seconds, items, server.stats.as_dict())
+    return result, value
+
+
+def topics_for(count, prefix):
+    return [f"{prefix} {index:03d}" for index in range(count)]
+
+
+def generator_scenarios(server, scale, work_dir, verbose):
+    """Tehtävägeneraattorien skenaariot (jaettu assignment_engine)."""
+    import DPAssignmentGeneratori
+    import DPAssignmentGeneratoriLOGO
+
+    client = make_client(MOCK_API_KEY, server.base_url)
+    results = []
+    durations = {}
+    for workers in (1, 8):
+        output_directory = os.path.join(work_dir, f"generaattori_{workers}")
+        engine = AssignmentEngine(client, DPAssignmentGeneratori.ASSIGNMENT_CONFIG,
+                                  output_directory, workers=workers)
+        topics = topics_for(scale, "Aihe")
+        result, runs = run_scenario(server, f"Generaattori, {workers} säiettä", base_settings(),
+                                    lambda: engine.run(topics), scale, verbose)
+        result.check("kaikki aiheet valmiita", sum(r.ok for r in runs) == scale)
+        result.check(f"enintään {workers} pyyntöä kerrallaan",
+                     1 <= result.server_stats["max_in_flight"] <= workers)
+        if workers > 1:
+            result.check("rinnakkaisuus käytössä", result.server_stats["max_in_flight"] > 1)
+            result.check("nopeampi kuin yksi säie", result.seconds < durations[1])
+        durations[workers] = result.seconds
+        results.append(result)
+
+    # Palvelin sallii 6 pyyntöä 2 sekunnissa; rajoitin pysyy hieman sen alla
+    requests_per_interval = 6
+    limiter = RateLimiter(10 ** 9, requests_per_minute=requests_per_interval, interval=2.2)
+    output_directory = os.path.join(work_dir, "generaattori_rajoitin")
+    engine = AssignmentEngine(client, DPAssignmentGeneratoriLOGO.ASSIGNMENT_CONFIG, output_directory,
+                              workers=8, rate_limiter=limiter, retry_base_delay=0.1)
+    topics = topics_for(scale, "Rajoitettu aihe")
+    result, runs = run_scenario(
+        server, "Generaattori, rajoitin vs. palvelimen 429-raja",
+        base_settings(requests_per_interval=requests_per_interval, interval=2.0, retry_after=0.1),
+        lambda: engine.run(topics), scale, verbose)
+    result.check("kaikki aiheet valmiita", sum(r.ok for r in runs) == scale)
+    result.check("ei yhtään 429-vastausta", "429" not in result.server_stats["status_counts"])
+    results.append(result)
+
+    output_directory = os.path.join(work_dir, "generaattori_virheet")
+    engine = AssignmentEngine(client, DPAssignmentGeneratori.ASSIGNMENT_CONFIG, output_directory,
+                              workers=8, max_attempts=10, retry_base_delay=0.05)
+    topics = topics_for(scale, "Virheaihe")
+    result, runs = run_scenario(
+        server, "Generaattori, satunnaiset 429/500 ja katkenneet vastaukset",
+        base_settings(rate_limit_rate=0.2, error_rate=0.1, drop_rate=0.2, retry_after=0.05),
+        lambda: engine.run(topics), scale, verbose)
+    stats = result.server_stats
+    faults = (stats["status_counts"].get("429", 0) + stats["status_counts"].get("500", 0)
+              + stats["dropped_streams"])
+    result.check("palvelin tuotti virheitä", faults > 0)
+    result.check("kaikki aiheet valmiita virheistä huolimatta",
+                 len({r.topic for r in runs if r.ok}) == scale)
+    result.check("ei jäänyt .part-tiedostoja",
+                 not any(name.endswith(".part") for name in os.listdir(output_directory)))
+    results.append(result)
+    return results
+
+
+def write_mermaid_files(root_directory, count):
+    """
+    Luo count kansiota, joissa kussakin kansion niminen .md-tiedosto: yksi kelvollinen
+    lohko, kaksi vain tälle tiedostolle kuuluvaa virheellistä lohkoa ja yksi kaikille
+    yhteinen virheellinen lohko. Palauttaa erillisten virheellisten lohkojen määrän.
+    """
+    if os.path.exists(root_directory):
+        shutil.rmtree(root_directory)
+    for index in range(count):
+        folder = os.path.join(root_directory, f"aihe_{index:03d}")
+        os.makedirs(folder)
+        blocks = [
+            VALID_BLOCK,
+            f"flowchart TD\n  A{index}[Alku --> B{index}",
+            f"flowchart LR\n  X{index} -=> Y{index}",
+            SHARED_BROKEN_BLOCK,
+        ]
+        body = "\n\n".join(f"Kaavio {number}:\n\n```mermaid\n{code}\n```"
+                           for number, code in enumerate(blocks, start=1))
+        with open(os.path.join(folder, f"aihe_{index:03d}.md"), 'w', encoding='utf-8') as f:
+            f.write(f"# Aihe {index}\n\n{body}\n")
+    return 2 * count + 1
+
+
+def use_cache(module, cache):
+    """Vaihtaa korjausskriptin välimuistin (sekä synkroninen että async-polku)."""
+    module.AI_CACHE = cache
+    module.MERMAID_FIX_CONFIG.cache = cache
+
+
+def mermaid_scenarios(server, scale, work_dir, verbose):
+    """Mermaid-korjaajien skenaariot: yksi kerrallaan, async, välimuisti ja erät."""
+    import FixMermaidAzureAi
+    import fixMermaidWithDeepSeek
+
+    # Asiakkaat luetaan moduulien vakioista vasta ensimmäisellä kutsulla
+    fixMermaidWithDeepSeek.DEEPSEEK_API_KEY = MOCK_API_KEY
+    fixMermaidWithDeepSeek.DEEPSEEK_BASE_URL = server.base_url
+    FixMermaidAzureAi.AZURE_OPENAI_API_KEY = MOCK_API_KEY
+    FixMermaidAzureAi.AZURE_OPENAI_ENDPOINT = server.root_url
+
+    results = []
+    root_directory = os.path.join(work_dir, "mermaid")
+    file_count = max(1, scale // 2)
+
+    broken = write_mermaid_files(root_directory, file_count)
+    use_cache(fixMermaidWithDeepSeek, ResponseCache(os.path.join(work_dir, "cache_sync.sqlite")))
+    result, _ = run_scenario(server, "Mermaid (DeepSeek), yksi lohko kerrallaan", base_settings(),
+                             lambda: fixMermaidWithDeepSeek.process_directory(root_directory),
+                             4 * file_count, verbose)
+    result.check(f"vain {broken} erillistä virheellistä lohkoa lähetetty",
+                 result.server_stats["requests"] == broken)
+    results.append(result)
+
+    broken = write_mermaid_files(root_directory, file_count)
+    use_cache(fixMermaidWithDeepSeek, ResponseCache(os.path.join(work_dir, "cache_async.sqlite")))
+    result, _ = run_scenario(server, "Mermaid (DeepSeek), async 16 rinnakkain", base_settings(),
+                             lambda: fixMermaidWithDeepSeek.process_directory_async(root_directory, 16),
+                             4 * file_count, verbose)
+    result.check(f"vain {broken} erillistä virheellistä lohkoa lähetetty",
+                 result.server_stats["requests"] == broken)
+    result.check("enintään 16 pyyntöä kerrallaan", result.server_stats["max_in_flight"] <= 16)
+    result.check("rinnakkaisuus käytössä", broken < 2 or result.server_stats["max_in_flight"] > 1)
+    results.append(result)
+
+    result, _ = run_scenario(server, "Mermaid (DeepSeek), uudelleenajo välimuistista", base_settings(),
+                             lambda: fixMermaidWithDeepSeek.process_directory_async(root_directory, 16),
+                             4 * file_count, verbose)
+    result.check("ei yhtään API-kutsua", result.server_stats["requests"] == 0)
+    results.append(result)
+
+    broken = write_mermaid_files(root_directory, file_count)
+    use_cache(FixMermaidAzureAi, ResponseCache(os.path.join(work_dir, "cache_batch.sqlite")))
+    expected_batches = math.ceil(broken / FixMermaidAzureAi.MAX_BLOCKS_PER_BATCH)
+    result, _ = run_scenario(server, "Mermaid (Azure), erät", base_settings(),
+                             lambda: FixMermaidAzureAi.process_directory_batched(root_directory),
+                             4 * file_count, verbose)
+    result.check(f"{broken} lohkoa {expected_batches} eräpyynnössä",
+                 result.server_stats["requests"] == expected_batches)
+    results.append(result)
+    return results
+
+
+def run_benchmark(scale=DEFAULT_SCALE, verbose=False, csv_path=None):
+    """Ajaa kaikki skenaariot ja palauttaa ScenarioResult-oliot."""
+    work_dir = tempfile.mkdtemp(prefix="ai_benchmark_")
+    server = MockOpenAiServer(base_settings()).start()
+    print(f"Testipalvelin: {server.base_url}, työkansio: {work_dir}")
+    try:
+        results = []
+        for scenarios in (generator_scenarios, mermaid_scenarios):
+            for result in scenarios(server, scale, work_dir, verbose):
+                print(result.format_report())
+                results.append(result)
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if csv_path:
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(RESULT_FIELDS)
+            writer.writerows(result.as_row() for result in results)
+        print(f"Tulokset tallennettu tiedostoon: {csv_path}")
+    failed = [result.name for result in results if not result.ok]
+    if failed:
+        print(f"Epäonnistuneet skenaariot: {', '.join(failed)}")
+    else:
+        print(f"Kaikki {len(results)} skenaariota läpäisivät tarkistukset.")
+    return results
+
+
+if __name__ == "__main__":
+    scale = input(f"Aiheiden määrä skenaariota kohden (Enter = {DEFAULT_SCALE}): ").strip()
+    scale = int(scale) if scale.isdigit() and int(scale) > 0 else DEFAULT_SCALE
+    verbose = input("Näytetäänkö skriptien omat tulosteet? (k/E): ").strip().lower() == 'k'
+    csv_path = input("Tulosten CSV-tiedosto (Enter = ei tallenneta): ").strip() or None
+    results = run_benchmark(scale, verbose, csv_path)
+    sys.exit(0 if all(result.ok for result in results) else 1)
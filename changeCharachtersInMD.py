@@ -9,46 +9,66 @@ Features:
 - Replaces \[ and \] with $$ for block math equations
 - Reports each file that has been updated
 - Preserves all other content in the files
+- Optional manifest (incremental_cache.py) so files unchanged since the last
+  run are skipped
 
 To use:
 1. Run the script: python changeCharachtersInMD.py
 2. When prompted, enter the path to the directory containing Markdown files
-3. The script will process all files and report the changes made
+3. Choose whether to skip files that are unchanged since the previous run
+4. The script will process all files and report the changes made
 """
 
 import os
 
+from incremental_cache import TransformManifest
+
+TRANSFORM_NAME = "changeCharachtersInMD"
+
+def replace_brackets(content):
+    """Replaces \[ and \] with $$ in Markdown text."""
+    return content.replace('\\[', '$$').replace('\\]', '$$')
+
 def replace_brackets_in_file(file_path):
-    """Replaces \[ \], \( and \) with $$ in a given file."""
+    """Replaces \[ \], \( and \) with $$ in a given file. Returns True on success."""
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        updated_lines = []
-        for line in lines:
-            # Replace \[ and \], \( and \) with $$
-            updated_lines.append(line.replace('\\[', '$$').replace('\\]', '$$'))
+            content = file.read()
 
         with open(file_path, 'w', encoding='utf-8') as file:
-            file.write(''.join(updated_lines))
+            file.write(replace_brackets(content))
 
         print(f"Updated: {file_path}")
+        return True
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
+        return False
 
-def process_directory(directory):
-    """Walks through the directory and processes all markdown files."""
+def process_directory(directory, use_manifest=False):
+    """
+    Walks through the directory and processes all markdown files.
+    With use_manifest, files unchanged since the previous run are skipped.
+    """
+    manifest = TransformManifest(directory) if use_manifest else None
     for root, _, files in os.walk(directory):
         for file in files:
             if file.endswith('.md'):
                 file_path = os.path.join(root, file)
-                replace_brackets_in_file(file_path)
+                if manifest and manifest.is_current(file_path, TRANSFORM_NAME):
+                    continue
+                # A file that failed is not recorded, so it is retried on the next run
+                if replace_brackets_in_file(file_path) and manifest:
+                    manifest.record(file_path, TRANSFORM_NAME)
+    if manifest:
+        manifest.save()
+        print(f"Skipped {manifest.skipped} unchanged files.")
 
 if __name__ == "__main__":
     directory = input("Enter the path to the directory: ").strip()
 
     if os.path.isdir(directory):
-        process_directory(directory)
+        use_manifest = input("Skip files unchanged since the previous run? (Y/n): ").strip().lower() != 'n'
+        process_directory(directory, use_manifest)
         print("All markdown files have been processed.")
     else:
         print("The provided path is not a valid directory.")
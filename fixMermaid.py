@@ -11,16 +11,23 @@ Features:
 - Cleans up whitespace around Mermaid code fence markers
 - Works completely offline with no API dependencies
 - Reports each file that is processed and updated
+- Optional manifest (incremental_cache.py) so files unchanged since the last
+  run are skipped
 
 To use:
 1. Run the script: python fixMermaid.py
 2. When prompted, enter the path to the directory containing Markdown files
-3. The script will fix Mermaid syntax issues in all files and report progress
+3. Choose whether to skip files that are unchanged since the previous run
+4. The script will fix Mermaid syntax issues in all files and report progress
 """
 
 import os
 import re
 
+from incremental_cache import TransformManifest
+
+TRANSFORM_NAME = "fixMermaid"
+
 # Funktio lukemaan Markdown-tiedosto
 def read_md(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -47,27 +54,42 @@ def fix_mermaid_syntax(content):
     return content
 
 # Funktio käsittelemään Markdown-tiedostot ja korjaamaan Mermaid-kaaviot
-def process_markdown_files(directory):
+# Jos use_manifest on True, edellisen ajon jälkeen muuttumattomat tiedostot ohitetaan
+def process_markdown_files(directory, use_manifest=False):
+    manifest = TransformManifest(directory) if use_manifest else None
     for root, _, files in os.walk(directory):  # Käy läpi myös alikansiot
         for filename in files:
             if filename.endswith(".md"):  # Etsi Markdown-tiedostoja
                 file_path = os.path.join(root, filename)
+                if manifest and manifest.is_current(file_path, TRANSFORM_NAME):
+                    continue
                 print(f"Tutkitaan tiedostoa: {file_path}")
 
-                # Lue tiedosto
-                content = read_md(file_path)
+                try:
+                    # Lue tiedosto
+                    content = read_md(file_path)
 
-                # Korjaa Mermaid-kaavioiden syntaksin
-                updated_content = fix_mermaid_syntax(content)
+                    # Korjaa Mermaid-kaavioiden syntaksin
+                    updated_content = fix_mermaid_syntax(content)
 
-                # Tallenna korjattu tiedosto
-                write_md(file_path, updated_content)
+                    # Tallenna korjattu tiedosto
+                    write_md(file_path, updated_content)
+                except (OSError, UnicodeError) as e:
+                    # Epäonnistunutta tiedostoa ei kirjata, joten se yritetään uudelleen seuraavalla ajolla
+                    print(f"Virhe käsiteltäessä tiedostoa {file_path}: {e}")
+                    continue
                 print(f"Korjattu tiedosto tallennettu: {file_path}")
+                if manifest:
+                    manifest.record(file_path, TRANSFORM_NAME)
+    if manifest:
+        manifest.save()
+        print(f"Ohitettu {manifest.skipped} muuttumatonta tiedostoa.")
 
 # Suorita skripti määritetyssä kansiossa
 if __name__ == "__main__":
     directory = input("Anna kansion polku, jossa Markdown-tiedostot sijaitsevat: ")
     if os.path.isdir(directory):
-        process_markdown_files(directory)
+        use_manifest = input("Ohitetaanko edellisen ajon jälkeen muuttumattomat tiedostot? (K/e): ").strip().lower() != 'e'
+        process_markdown_files(directory, use_manifest)
     else:
         print("Annettu polku ei ole kelvollinen kansio.")
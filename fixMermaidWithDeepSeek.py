@@ -10,6 +10,14 @@ Features:
 - Sends Mermaid code to DeepSeek AI for syntax correction
 - Updates the file only if corrections are made
 - Reports which files were modified
+- Offline syntax check (mermaid_validator.py): blocks that already parse are
+  not sent; broken blocks are sent together with the parse error
+- Persistent response cache (ai_response_cache.py): identical blocks and
+  repeated runs are answered without an API call
+- API client and the openai import are created only when the first block
+  actually needs the API (api_clients.py)
+- Optional asynchronous mode (asyncMermaidFixer.py): all blocks of all files are
+  extracted first and sent concurrently, with a limit on requests in flight
 
 Requirements:
 - OpenAI Python package
@@ -19,19 +27,35 @@ To use:
 1. Set your DeepSeek API key in the DEEPSEEK_API_KEY variable
 2. Run the script: python fixMermaidWithDeepSeek.py
 3. When prompted, enter the path to the root directory to process
-4. The script will find and fix Mermaid syntax errors in matching Markdown files
+4. Enter the number of concurrent requests, or press Enter to process the
+   blocks one at a time
+5. The script will find and fix Mermaid syntax errors in matching Markdown files
 """
 
 import os
 import re
-from openai import OpenAI
+
+from ai_response_cache import ResponseCache
+from api_clients import LazyClient, format_import_timings, get_openai_client, make_async_openai_client
+from asyncMermaidFixer import MermaidFixConfig, fix_files
+from mermaid_validator import VALID, precheck_block
 
 # Aseta DeepSeek API -yhteyden tiedot
 DEEPSEEK_API_KEY = "YOUR_API_KEY_HERE"  # Replace with your actual API key
 DEEPSEEK_BASE_URL = "https://api.deepseek.com"
 
-# Luo DeepSeek API -asiakas
-client = OpenAI(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
+MODEL = "deepseek-chat"
+SYSTEM_PROMPT = (
+    "Olet asiantuntija, joka korjaa mermaid-koodilohkojen syntaksia. "
+    "Käytä selkeää ja ytimekästä kieltä."
+)
+USER_PROMPT = (
+    "Korjaa seuraava mermaid-koodi mahdollisista syntaksivirheistä. "
+    "Vastaa ainoastaan korjatulla koodilla, älä muuta muuta sisältöä:\n\n"
+)
+
+# DeepSeek API -asiakas luodaan vasta ensimmäisellä API-kutsulla (api_clients.py)
+client = LazyClient(lambda: get_openai_client(DEEPSEEK_API_KEY, DEEPSEEK_BASE_URL))
 
 def strip_code_fence(code):
     """
@@ -44,30 +68,32 @@ def strip_code_fence(code):
         return match.group(1).strip()
     return code.strip()
 
+AI_CACHE = ResponseCache()
+MERMAID_FIX_CONFIG = MermaidFixConfig(MODEL, SYSTEM_PROMPT, USER_PROMPT, max_tokens=8000,
+                                      postprocess=strip_code_fence, cache=AI_CACHE)
+
 def correct_mermaid_code_with_ai(code):
     """
     Lähettää vain mermaid-koodilohkon sisällön tekoälylle,
     jotta se korjaisi mahdolliset syntaksivirheet.
+    Aiemmin korjattu sama lohko palautetaan välimuistista ilman API-kutsua.
+    Offline-tarkistimen hyväksymää lohkoa ei lähetetä lainkaan, ja virheellisen
+    lohkon mukana lähetetään tarkistimen virheviesti.
     """
-    prompt = (
-        "Korjaa seuraava mermaid-koodi mahdollisista syntaksivirheistä. "
-        "Vastaa ainoastaan korjatulla koodilla, älä muuta muuta sisältöä:\n\n"
-        f"{code}"
-    )
-
+    original = code
+    code, status, error = precheck_block(code)
+    if status == VALID:
+        print("Lohko on jo kelvollinen, API-kutsu ohitetaan.")
+        return code
+    cache_key = MERMAID_FIX_CONFIG.cache_key(code)
+    cached_code = AI_CACHE.get(cache_key)
+    if cached_code is not None:
+        print("Korjaus löytyi välimuistista.")
+        return cached_code
     try:
         response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "Olet asiantuntija, joka korjaa mermaid-koodilohkojen syntaksia. "
-                        "Käytä selkeää ja ytimekästä kieltä."
-                    )
-                },
-                {"role": "user", "content": prompt}
-            ],
+            model=MODEL,
+            messages=MERMAID_FIX_CONFIG.messages(code, error),
             stream=False,
             max_tokens=8000
         )
@@ -83,10 +109,11 @@ def correct_mermaid_code_with_ai(code):
 
         # Poistetaan mahdolliset ylimääräiset koodilohkomerkit
         corrected_code = strip_code_fence(corrected_code)
+        AI_CACHE.put(cache_key, corrected_code)
         return corrected_code
     except Exception as e:
         print(f"Virhe API-kutsussa: {e}")
-        return code  # Palautetaan alkuperäinen koodi virheen sattuessa
+        return original  # Palautetaan alkuperäinen koodi virheen sattuessa
 
 def process_file(file_path):
     """
@@ -118,22 +145,46 @@ def process_file(file_path):
     else:
         print(f"Ei muutoksia: {file_path}")
 
-def process_directory(root_dir):
+def iter_folder_named_files(root_dir):
     """
-    Käy läpi annetun kansion ja sen alikansiot.
-    Jokaisessa kansiossa etsitään .md-tiedosto, jonka nimi vastaa kansion nimeä.
+    Käy läpi annetun kansion ja sen alikansiot ja palauttaa niiden .md-tiedostojen
+    polut, joiden nimi vastaa kansion nimeä.
     """
     for dirpath, dirs, files in os.walk(root_dir):
         current_folder_name = os.path.basename(dirpath)
         expected_file_name = current_folder_name + ".md"
 
         if expected_file_name in files:
-            file_path = os.path.join(dirpath, expected_file_name)
-            print(f"Käsitellään tiedostoa: {file_path}")
-            process_file(file_path)
+            yield os.path.join(dirpath, expected_file_name)
         else:
             print(f"Tiedostoa '{expected_file_name}' ei löytynyt kansiosta: {dirpath}")
 
+def process_directory(root_dir):
+    """
+    Käy läpi annetun kansion ja sen alikansiot.
+    Jokaisessa kansiossa etsitään .md-tiedosto, jonka nimi vastaa kansion nimeä.
+    """
+    for file_path in iter_folder_named_files(root_dir):
+        print(f"Käsitellään tiedostoa: {file_path}")
+        process_file(file_path)
+    print(AI_CACHE.format_stats())
+
+def process_directory_async(root_dir, max_concurrency=8):
+    """
+    Kerää kansion nimisten .md-tiedostojen mermaid-lohkot ja korjauttaa ne
+    rinnakkain DeepSeekin async-asiakkaalla.
+    """
+    def client_factory():
+        return make_async_openai_client(api_key=DEEPSEEK_API_KEY, base_url=DEEPSEEK_BASE_URL)
+
+    fix_files(client_factory, list(iter_folder_named_files(root_dir)),
+              MERMAID_FIX_CONFIG, max_concurrency)
+
 if __name__ == "__main__":
     directory = input("Anna kansion polku: ")  # Esim. /polku/kansioon
-    process_directory(directory)
+    concurrency = input("Rinnakkaisten pyyntöjen määrä (Enter = yksi lohko kerrallaan): ").strip()
+    if concurrency.isdigit() and int(concurrency) > 0:
+        process_directory_async(directory, int(concurrency))
+    else:
+        process_directory(directory)
+    print(format_import_timings())
@@ -1,62 +1,295 @@
 const puppeteer = require('puppeteer');
 const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
 
-// Komentoriviltä saadut tiedostopolut
-const args = process.argv.slice(2);
-if (args.length < 2) {
-    console.error("Usage: node generate-pdf.js <input.html> <output.pdf>");
-    process.exit(1);
+const USAGE = [
+    "Usage: node generate-pdf.js <input.html> <output.pdf> [--screenshot <kuva.png>] [--offline] [--mermaid <mermaid.min.js>]",
+    "       node generate-pdf.js --batch [--pages <sivujen määrä>] [--offline] [--mermaid <mermaid.min.js>]",
+].join("\n");
+
+// Paikallinen Mermaid-paketti: vendor/mermaid.min.js tai npm-paketti mermaid
+const VENDORED_MERMAID = path.join(__dirname, 'vendor', 'mermaid.min.js');
+const MERMAID_SELECTOR = '.mermaid, code.language-mermaid';
+const MERMAID_TIMEOUT = 15000;
+
+const PDF_OPTIONS = {
+    format: 'A4',
+    printBackground: true,
+    margin: {
+        top: '40px',
+        right: '20px',
+        bottom: '40px',
+        left: '20px',
+    },
+};
+
+// Komentorivin valitsimet: --nimi arvo -parit ja loput sijaintiargumentteina
+function parseArgs(argv) {
+    const options = { positional: [] };
+    for (let i = 0; i < argv.length; i++) {
+        if (argv[i] === '--batch' || argv[i] === '--offline') {
+            options[argv[i].slice(2)] = true;
+        } else if (argv[i] === '--pages' || argv[i] === '--screenshot' || argv[i] === '--mermaid') {
+            options[argv[i].slice(2)] = argv[++i];
+        } else {
+            options.positional.push(argv[i]);
+        }
+    }
+    return options;
 }
 
-const inputFilePath = args[0];
-const outputFilePath = args[1];
+function launchBrowser() {
+    return puppeteer.launch({
+        headless: true,
+        args: ['--no-sandbox', '--disable-setuid-sandbox'],
+    });
+}
 
-(async () => {
-    try {
-        const browser = await puppeteer.launch({
-            headless: true,
-            args: ['--no-sandbox', '--disable-setuid-sandbox'],
+// Etsii paikallisen Mermaid-paketin ja lukee sen kerran; palauttaa null, jos pakettia ei ole
+function loadMermaidBundle(bundlePath) {
+    const candidates = bundlePath ? [bundlePath] : [VENDORED_MERMAID];
+    if (!bundlePath) {
+        try {
+            candidates.push(require.resolve('mermaid/dist/mermaid.min.js'));
+        } catch (error) {
+            // npm-pakettia ei ole asennettu
+        }
+    }
+    const found = candidates.find((candidate) => fs.existsSync(candidate));
+    return found ? { path: found, content: fs.readFileSync(found, 'utf8') } : null;
+}
+
+// Valmistelee sivun kerran: offline-tilassa verkkopyynnöt estetään, jotta mikään ei jää odottamaan verkkoa
+async function preparePage(page, options = {}) {
+    if (options.offline) {
+        await page.setRequestInterception(true);
+        page.on('request', (request) => {
+            if (/^https?:/i.test(request.url())) {
+                request.abort();
+            } else {
+                request.continue();
+            }
         });
+    }
+    return page;
+}
+
+// Renderöi sivun Mermaid-kaaviot ja odottaa, että ne ovat valmiita. Kaavioitta sivulla ei odoteta lainkaan.
+// Palauttaa varoituksen, jos kaikkia kaavioita ei saatu piirrettyä aikarajassa, muuten null.
+async function renderMermaid(page, options = {}) {
+    const log = options.log || console.log;
+    const diagrams = await page.$$eval(MERMAID_SELECTOR, (elements) => elements.length);
+    if (diagrams === 0) {
+        return null;
+    }
+    const started = Date.now();
+    const hasOwnMermaid = await page.evaluate(() => typeof window.mermaid !== 'undefined');
+    if (!hasOwnMermaid) {
+        if (!options.mermaidBundle) {
+            const warning = `Mermaid-pakettia ei löydy (${VENDORED_MERMAID}), kaaviot jäävät tekstiksi.`;
+            log(warning);
+            return warning;
+        }
+        await page.addScriptTag({ content: options.mermaidBundle.content });
+    }
+    // Kaaviot renderöidään suoraan API:lla ja odotetaan sen palauttamaa lupausta.
+    // Sivun oma startOnLoad-renderöinti voi olla jo käynnissä: sen merkitsemiä
+    // (data-processed) mutta vielä piirtämättömiä kaavioita odotetaan samassa aikarajassa.
+    const result = await page.evaluate(async (selector, timeout) => {
+        const nodes = [];
+        const drawing = [];
+        document.querySelectorAll(selector).forEach((element) => {
+            if (element.matches('code.language-mermaid')) {
+                // Markdown-muunnoksen koodilohko: <pre><code class="language-mermaid"> -> <div class="mermaid">
+                const container = document.createElement('div');
+                container.className = 'mermaid';
+                container.textContent = element.textContent;
+                const block = element.parentElement && element.parentElement.tagName === 'PRE' ? element.parentElement : element;
+                block.replaceWith(container);
+                nodes.push(container);
+            } else if (!element.querySelector('svg')) {
+                (element.getAttribute('data-processed') ? drawing : nodes).push(element);
+            }
+        });
+        const mermaid = window.mermaid;
+        mermaid.initialize({ startOnLoad: false });
+        const rendering = nodes.length === 0 ? Promise.resolve()
+            : typeof mermaid.run === 'function'
+                ? mermaid.run({ nodes, suppressErrors: true })  // Mermaid 10+
+                : Promise.resolve(mermaid.init(undefined, nodes));  // Mermaid 9
+        const deadline = Date.now() + timeout;
+        const drawn = new Promise((resolve) => {
+            const check = () => {
+                if (drawing.every((element) => element.querySelector('svg')) || Date.now() >= deadline) {
+                    resolve();
+                } else {
+                    setTimeout(check, 50);
+                }
+            };
+            check();
+        });
+        await Promise.race([
+            Promise.all([rendering.catch(() => {}), drawn]),
+            new Promise((resolve) => setTimeout(resolve, timeout)),
+        ]);
+        const all = Array.from(document.querySelectorAll('.mermaid'));
+        return { total: all.length, rendered: all.filter((element) => element.querySelector('svg')).length };
+    }, MERMAID_SELECTOR, MERMAID_TIMEOUT);
+    log(`Mermaid-kaaviot renderöity: ${result.rendered}/${result.total} (${Date.now() - started} ms)`);
+    if (result.rendered < result.total) {
+        const warning = `${result.total - result.rendered}/${result.total} Mermaid-kaaviota jäi piirtämättä`;
+        log(`Varoitus: ${warning}`);
+        return warning;
+    }
+    return null;
+}
 
-        const page = await browser.newPage();
+// Renderöi yhden HTML-tiedoston PDF:ksi annetulla sivulla. Sivu voidaan käyttää uudelleen.
+// Palauttaa varoituksen, jos Mermaid-kaavioita jäi piirtämättä, muuten null.
+async function renderPdf(page, inputFilePath, outputFilePath, options = {}) {
+    const log = options.log || console.log;
 
-        // Lataa HTML-tiedosto
-        const htmlContent = fs.readFileSync(inputFilePath, 'utf8');
-        await page.setContent(htmlContent, { waitUntil: 'networkidle2' });
+    // Lataa HTML-tiedosto; offline-tilassa verkkoa ei odoteta
+    const htmlContent = fs.readFileSync(inputFilePath, 'utf8');
+    await page.setContent(htmlContent, { waitUntil: options.offline ? 'load' : 'networkidle2' });
 
-        // Lisää Mermaid-tyylit ja scriptit
+    // Lisää Mermaid-tyylit (offline-tilassa tyylit tulevat paketin SVG-kuvista)
+    if (!options.offline) {
         await page.addStyleTag({
             url: 'https://cdnjs.cloudflare.com/ajax/libs/mermaid/9.3.0/mermaid.min.css',
         });
+    }
+
+    const warning = await renderMermaid(page, options);
 
-        // Mermaid-renderöinti
+    // Debug-kuvakaappaus vain pyydettäessä
+    if (options.screenshot) {
+        await page.screenshot({ path: options.screenshot, fullPage: true });
+        log(`Debug-kuvakaappaus tallennettu tiedostoon ${options.screenshot}`);
+    }
+
+    // Luo PDF-tiedosto väliaikaiseen tiedostoon ja siirrä se paikalleen vasta valmiina,
+    // jotta keskeytynyt renderöinti ei jätä katkennutta PDF:ää "ajan tasalla" olevaksi
+    const temporaryPath = outputFilePath + '.part';
+    try {
+        await page.pdf({ path: temporaryPath, ...PDF_OPTIONS });
+        fs.renameSync(temporaryPath, outputFilePath);
+    } finally {
+        fs.rmSync(temporaryPath, { force: true });
+    }
+    return warning;
+}
+
+// Yksi tiedosto komentoriviltä: oma selain, joka suljetaan lopuksi
+async function renderSingle(inputFilePath, outputFilePath, options) {
+    const browser = await launchBrowser();
+    try {
+        const page = await preparePage(await browser.newPage(), options);
+        await renderPdf(page, inputFilePath, outputFilePath, options);
+    } finally {
+        await browser.close();
+    }
+    console.log(`PDF luotu onnistuneesti: ${outputFilePath}`);
+}
+
+// Eräajo: yksi selain ja pageCount sivua, jotka hakevat töitä yhteisestä jonosta.
+// Työt luetaan stdinistä JSON-riveinä {"id", "input", "output", "screenshot"}
+// ja tulokset kirjoitetaan stdoutiin JSON-riveinä {"id", "ok", "error", "warning", "ms"}.
+// Lokiviestit menevät stderriin, jotta stdout sisältää vain tuloksia.
+async function runBatch(pageCount, renderOptions) {
+    const log = (message) => console.error(message);
+    const send = (result) => process.stdout.write(JSON.stringify(result) + "\n");
+    const browser = await launchBrowser();
+    log(`Selain käynnistetty, ${pageCount} sivua käytössä.`);
+
+    const queue = [];
+    const waiting = [];
+    let inputClosed = false;
+
+    function nextJob() {
+        if (queue.length > 0) {
+            return Promise.resolve(queue.shift());
+        }
+        if (inputClosed) {
+            return Promise.resolve(null);
+        }
+        return new Promise((resolve) => waiting.push(resolve));
+    }
+
+    const lines = readline.createInterface({ input: process.stdin });
+    lines.on('line', (line) => {
+        if (!line.trim()) {
+            return;
+        }
+        let job;
         try {
-            // Odota 15 sekuntia ja tarkista, löytyykö .mermaid-elementtejä
-            await page.waitForSelector('.mermaid', { timeout: 15000 });
-            console.log("Mermaid-kaaviot löydetty ja renderöity.");
+            job = JSON.parse(line);
         } catch (error) {
-            console.warn('Mermaid-kaavioita ei löydetty. Jatketaan ilman niitä.');
+            send({ id: null, ok: false, error: `Virheellinen työrivi: ${line}`, warning: null, ms: 0 });
+            return;
+        }
+        const resolve = waiting.shift();
+        if (resolve) {
+            resolve(job);
+        } else {
+            queue.push(job);
         }
+    });
+    lines.on('close', () => {
+        inputClosed = true;
+        waiting.splice(0).forEach((resolve) => resolve(null));
+    });
 
-        // Debug: Tallenna kuvakaappaus
-        await page.screenshot({ path: 'debug-screenshot.png', fullPage: true });
-        console.log("Debug-kuvakaappaus tallennettu tiedostoon debug-screenshot.png");
-
-        // Luo PDF-tiedosto
-        await page.pdf({
-            path: outputFilePath,
-            format: 'A4',
-            printBackground: true,
-            margin: {
-                top: '40px',
-                right: '20px',
-                bottom: '40px',
-                left: '20px',
-            },
-        });
+    async function worker() {
+        let page = await preparePage(await browser.newPage(), renderOptions);
+        for (let job = await nextJob(); job !== null; job = await nextJob()) {
+            const started = Date.now();
+            try {
+                const warning = await renderPdf(page, job.input, job.output,
+                    { ...renderOptions, screenshot: job.screenshot, log });
+                send({ id: job.id, ok: true, error: null, warning, ms: Date.now() - started });
+            } catch (error) {
+                send({ id: job.id, ok: false, error: String((error && error.message) || error), warning: null,
+                       ms: Date.now() - started });
+                // Virheen jälkeen sivun tila on epävarma: tilalle uusi sivu
+                await page.close().catch(() => {});
+                page = await preparePage(await browser.newPage(), renderOptions);
+            }
+        }
+        await page.close();
+    }
 
+    try {
+        await Promise.all(Array.from({ length: pageCount }, worker));
+    } finally {
         await browser.close();
-        console.log(`PDF luotu onnistuneesti: ${outputFilePath}`);
+    }
+}
+
+(async () => {
+    const options = parseArgs(process.argv.slice(2));
+    const renderOptions = { offline: options.offline, mermaidBundle: loadMermaidBundle(options.mermaid) };
+    if (options.mermaid && !renderOptions.mermaidBundle) {
+        console.error(`Mermaid-pakettia ei löydy: ${options.mermaid}`);
+        process.exit(1);
+    }
+    try {
+        if (options.batch) {
+            const pageCount = parseInt(options.pages || '4', 10);
+            if (!(pageCount > 0)) {
+                console.error(USAGE);
+                process.exit(1);
+            }
+            await runBatch(pageCount, renderOptions);
+        } else {
+            if (options.positional.length < 2) {
+                console.error(USAGE);
+                process.exit(1);
+            }
+            const [inputFilePath, outputFilePath] = options.positional;
+            await renderSingle(inputFilePath, outputFilePath, { ...renderOptions, screenshot: options.screenshot });
+        }
     } catch (error) {
         console.error("Virhe PDF:n luomisessa:", error);
         process.exit(1);
@@ -0,0 +1,116 @@
+"""
+Usage: generateAssignments.py
+-----------------------------
+This script generates educational tasks and examples for every topic in a CSV
+or YAML topic file, using any OpenAI-compatible API (DeepSeek by default).
+It runs on the shared assignment engine (assignment_engine.py).
+
+Features:
+- Topics from a CSV file (column "topic" or "aihe", otherwise the first column)
+  or a YAML file (a list of topics, or a mapping with "topics" and settings)
+- The model, prompt template and other settings can be given in the YAML file;
+  "{topic}" in prompt_template is replaced with each topic
+- Several topics at a time over one pooled HTTP client
+- Optional token and request limits (tokens_per_minute, requests_per_minute)
+- Resumable: a job queue in the output folder skips topics that are already
+  done and retries failed ones with backoff
+- Per-topic timing and token usage (tehtavatilastot.csv in the output folder)
+  and a run summary with topics per minute, tokens per second and latency
+
+Example YAML file:
+    model: deepseek-chat
+    output_directory: tehtavat
+    workers: 8
+    tokens_per_minute: 200000
+    prompt_template: "Generoi 2 tehtävää ja esimerkkiä aiheesta '{topic}'."
+    topics:
+      - Ohm's law
+      - Diode
+
+Requirements:
+- OpenAI Python package
+- PyYAML package (only for YAML topic files)
+- API key in the DEEPSEEK_API_KEY environment variable or in the variable below
+
+To use:
+1. Run the script: python generateAssignments.py
+2. When prompted, enter the path to the CSV or YAML topic file
+3. Enter the output folder and the number of concurrent topics, or press Enter
+   to use the values from the topic file
+"""
+
+import os
+
+from api_clients import format_import_timings
+from assignment_engine import AssignmentConfig, AssignmentEngine, load_manifest, make_client
+from rate_limiter import RateLimiter
+
+# Oletusasetukset; YAML-tiedoston asetukset ohittavat nämä
+DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY", "YOUR_API_KEY_HERE")
+DEFAULT_SETTINGS = {
+    "model": "deepseek-chat",
+    "base_url": "https://api.deepseek.com",
+    "output_directory": "tehtavat",
+    "workers": 4,
+    "max_tokens": 8000,
+    "temperature": None,
+    "stream": True,
+    "file_name_length": 150,
+    "max_attempts": 5,
+    "retry_base_delay": 30,
+    "tokens_per_minute": None,
+    "requests_per_minute": None,
+    "system_prompt": (
+        "Olet asiantuntija ja pedagogi, jonka tehtävänä on luoda tehtäviä ja esimerkkejä opiskelijoille. "
+        "Keskity varmistamaan, että luomasi tehtävät ovat pedagogisesti merkityksellisiä ja tarjoavat "
+        "monipuolisia näkökulmia. Huomioi myös eritasoisten opiskelijoiden tarpeet."
+    ),
+    "prompt_template": (
+        "Olet tehtävä- ja esimerkkiluoja. Generoi tarkalleen 2 tehtävää ja esimerkkejä liittyen aiheeseen '{topic}'. "
+        "Jokaiseen tehtävään tulee sisältyä:\n"
+        "1. Laajempi selitys tehtävän tarkoituksesta: Miksi tehtävää tehdään ja miten se liittyy oppimiseen.\n"
+        "2. Tehtävänanto: Selkeästi ja kattavasti selvitetty ohjeistus, mitä opiskelijan tulee tehdä.\n"
+        "3. Esimerkki mahdollisesta vastauksesta.\n"
+        "Käytä selkeää, tarkkaa ja ystävällistä kieltä."
+    ),
+}
+
+
+def run_manifest(manifest_path, output_directory=None, workers=None):
+    """Lukee aihetiedoston ja ajaa sen aiheet. Palauttaa ajon tulokset."""
+    settings = dict(DEFAULT_SETTINGS)
+    manifest = load_manifest(manifest_path)
+    settings.update((key, value) for key, value in manifest.items() if key != "topics")
+    if output_directory:
+        settings["output_directory"] = output_directory
+    if workers:
+        settings["workers"] = workers
+
+    topics = manifest["topics"]
+    print(f"Luettu {len(topics)} aihetta tiedostosta {manifest_path}.")
+    config = AssignmentConfig(settings["model"], settings["prompt_template"],
+                              settings["system_prompt"], max_tokens=settings["max_tokens"],
+                              temperature=settings["temperature"], stream=settings["stream"],
+                              file_name_length=settings["file_name_length"])
+    rate_limiter = None
+    if settings["tokens_per_minute"]:
+        rate_limiter = RateLimiter(settings["tokens_per_minute"], settings["requests_per_minute"])
+    client = make_client(DEEPSEEK_API_KEY, settings["base_url"])
+    engine = AssignmentEngine(client, config, settings["output_directory"],
+                              workers=settings["workers"], rate_limiter=rate_limiter,
+                              max_attempts=settings["max_attempts"],
+                              retry_base_delay=settings["retry_base_delay"])
+    results = engine.run(topics)
+    print(format_import_timings())
+    return results
+
+
+if __name__ == "__main__":
+    manifest_path = input("Anna aihetiedoston polku (.csv, .yaml tai .yml): ").strip()
+    if os.path.isfile(manifest_path):
+        output_directory = input("Tulostekansio (Enter = aihetiedoston asetus): ").strip()
+        workers = input("Rinnakkaisten aiheiden määrä (Enter = aihetiedoston asetus): ").strip()
+        run_manifest(manifest_path, output_directory or None,
+                     int(workers) if workers.isdigit() and int(workers) > 0 else None)
+    else:
+        print("Annettua tiedostoa ei löytynyt.")
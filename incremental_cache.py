@@ -0,0 +1,129 @@
+"""
+Usage: incremental_cache.py
+---------------------------
+Helper module that lets the Markdown scripts skip files they have already
+processed. It is imported by fixMermaid.py, replateDOT.py,
+changeCharachtersInMD.py, removeDupilcateMermaidTags.py,
+removeDuplicateHeaders.py and removeSameSentencesByThreshold.py and is not
+run directly.
+
+Features:
+- One shared manifest file (.md_manifest.json) in the processed root folder
+- Each entry is keyed by the file path relative to that folder and stores the
+  size, modification time (ns), a BLAKE2 content hash and the names of the
+  transforms already applied to that exact content
+- An unchanged file is recognised from a single os.stat() call; the content
+  hash is only computed when the size matches but the mtime differs
+- When a transform changes the content, the transforms recorded earlier are
+  dropped, because they were applied to the old content
+- The manifest is written atomically (temporary file + os.replace)
+
+Example:
+    from incremental_cache import TransformManifest
+
+    manifest = TransformManifest(folder_path)
+    for path in markdown_files:
+        if manifest.is_current(path, "fixMermaid"):
+            continue
+        ...  # process and write the file
+        manifest.record(path, "fixMermaid")
+    manifest.save()
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+MANIFEST_NAME = ".md_manifest.json"
+
+
+def file_hash(path):
+    """Laskee tiedoston sisällön BLAKE2b-tiivisteen."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TransformManifest:
+    """Levylle tallennettava kirjanpito tiedostoihin jo ajetuista muunnoksista."""
+
+    def __init__(self, root_directory, manifest_name=MANIFEST_NAME):
+        self.root_directory = os.path.abspath(root_directory)
+        self.manifest_path = os.path.join(self.root_directory, manifest_name)
+        self.entries = {}
+        self.skipped = 0
+        self._dirty = False
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('files', {})
+            except (OSError, ValueError) as e:
+                print(f"Manifestia ei voitu lukea ({e}), aloitetaan tyhjästä.")
+                self.entries = {}
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root_directory).replace(os.sep, '/')
+
+    def is_current(self, path, transform):
+        """
+        Palauttaa True, jos muunnos on jo ajettu tiedoston nykyiselle sisällölle.
+        Laskee skipped-laskuria, kun tiedosto voidaan ohittaa.
+        """
+        entry = self.entries.get(self._key(path))
+        if entry is None or transform not in entry['transforms']:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != entry['size']:
+            return False
+        if st.st_mtime_ns != entry['mtime_ns']:
+            # Sama koko mutta eri aikaleima: varmistetaan sisältö tiivisteellä
+            if file_hash(path) != entry['hash']:
+                return False
+            entry['mtime_ns'] = st.st_mtime_ns
+            self._dirty = True
+        self.skipped += 1
+        return True
+
+    def record(self, path, transform):
+        """Kirjaa, että muunnos on ajettu tiedoston nykyiselle sisällölle."""
+        key = self._key(path)
+        try:
+            st = os.stat(path)
+            content_hash = file_hash(path)
+        except OSError:
+            self.entries.pop(key, None)
+            self._dirty = True
+            return
+        entry = self.entries.get(key)
+        if entry is not None and entry['hash'] == content_hash:
+            transforms = set(entry['transforms'])
+            transforms.add(transform)
+        else:
+            transforms = {transform}
+        self.entries[key] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'hash': content_hash,
+            'transforms': sorted(transforms),
+        }
+        self._dirty = True
+
+    def save(self):
+        """Tallentaa manifestin atomisesti, jos siihen on tehty muutoksia."""
+        if not self._dirty:
+            return
+        fd, tmp_path = tempfile.mkstemp(prefix='.md_manifest.', dir=self.root_directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': 1, 'files': self.entries}, f)
+            os.replace(tmp_path, self.manifest_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        self._dirty = False
@@ -0,0 +1,188 @@
+"""
+Usage: job_queue.py
+-------------------
+Helper module with a durable, resumable job queue for the assignment
+generators. It is imported by DPAssignmentGeneratoriLOGO.py and is not run
+directly.
+
+Features:
+- SQLite journal (one row per topic) with state, attempt count, next allowed
+  attempt time and the last error
+- States: pending -> running -> done, or back to pending with exponential
+  backoff after a failure, and failed once max_attempts is reached
+- Safe for several worker threads: claim() hands each pending job to exactly
+  one worker
+- Resume: jobs left "running" by a crashed run are returned to pending on
+  start-up, and completed topics are never sent to the API again
+- retry_failed() returns jobs that failed every attempt to pending with a
+  fresh attempt count (AssignmentEngine.run does this at start-up)
+
+Example:
+    from job_queue import JobQueue
+
+    jobs = JobQueue("jobs.sqlite", max_attempts=5)
+    jobs.add(topics)
+    while (topic := jobs.claim()) is not None:
+        try:
+            ...
+            jobs.complete(topic, output_path)
+        except Exception as e:
+            jobs.fail(topic, str(e))
+"""
+
+import random
+import sqlite3
+import threading
+import time
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """SQLite-pohjainen työjono: tila, yritykset ja eksponentiaalinen odotus aiheittain."""
+
+    def __init__(self, path, max_attempts=5, base_delay=30.0, max_delay=1800.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " topic TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " output_path TEXT,"
+            " updated REAL NOT NULL)"
+        )
+        # Edellisen ajon keskeytyneet työt palautetaan jonoon
+        recovered = self._connection.execute(
+            "UPDATE jobs SET state = ?, updated = ? WHERE state = ?",
+            (PENDING, time.time(), RUNNING)
+        ).rowcount
+        self._connection.commit()
+        if recovered:
+            print(f"Palautettu jonoon {recovered} keskeytynyttä työtä edellisestä ajosta.")
+
+    def add(self, topics):
+        """Lisää uudet aiheet jonoon; jo olemassa olevien tila säilyy."""
+        now = time.time()
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO jobs (topic, state, updated) VALUES (?, ?, ?)",
+                [(topic, PENDING, now) for topic in topics]
+            )
+            self._connection.commit()
+
+    def claim(self):
+        """Ottaa seuraavan erääntyneen työn käsittelyyn ja palauttaa aiheen, tai None."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT topic FROM jobs WHERE state = ? AND next_attempt <= ?"
+                " ORDER BY next_attempt, rowid LIMIT 1",
+                (PENDING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated = ? WHERE topic = ?",
+                (RUNNING, now, row[0])
+            )
+            self._connection.commit()
+            return row[0]
+
+    def complete(self, topic, output_path=None):
+        """Merkitsee työn valmiiksi."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET state = ?, output_path = ?, last_error = NULL, updated = ?"
+                " WHERE topic = ?",
+                (DONE, output_path, time.time(), topic)
+            )
+            self._connection.commit()
+
+    def fail(self, topic, error):
+        """
+        Kirjaa epäonnistumisen. Työ palaa jonoon eksponentiaalisesti kasvavan
+        odotuksen jälkeen, tai merkitään lopullisesti epäonnistuneeksi, kun
+        max_attempts täyttyy. Palauttaa uuden tilan.
+        """
+        now = time.time()
+        with self._lock:
+            attempts = self._connection.execute(
+                "SELECT attempts FROM jobs WHERE topic = ?", (topic,)
+            ).fetchone()[0]
+            if attempts >= self.max_attempts:
+                state, next_attempt = FAILED, now
+            else:
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                state, next_attempt = PENDING, now + delay * random.uniform(0.9, 1.1)
+            self._connection.execute(
+                "UPDATE jobs SET state = ?, next_attempt = ?, last_error = ?, updated = ?"
+                " WHERE topic = ?",
+                (state, next_attempt, error, now, topic)
+            )
+            self._connection.commit()
+        return state
+
+    def seconds_until_next(self):
+        """Palauttaa sekunnit seuraavan odottavan työn erääntymiseen, tai None jos jono on tyhjä."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT MIN(next_attempt) FROM jobs WHERE state = ?", (PENDING,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def has_unfinished(self):
+        """Onko jonossa vielä odottavia tai käynnissä olevia töitä."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (PENDING, RUNNING)
+            ).fetchone()
+        return row[0] > 0
+
+    def failed_topics(self):
+        """Palauttaa lopullisesti epäonnistuneet aiheet ja niiden viimeisimmät virheet."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT topic, last_error FROM jobs WHERE state = ? ORDER BY rowid", (FAILED,)
+            ).fetchall()
+
+    def retry_failed(self):
+        """Palauttaa epäonnistuneet työt jonoon nollatuin yrityksin."""
+        with self._lock:
+            count = self._connection.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, next_attempt = 0, updated = ?"
+                " WHERE state = ?",
+                (PENDING, time.time(), FAILED)
+            ).rowcount
+            self._connection.commit()
+        return count
+
+    def counts(self):
+        """Palauttaa töiden määrät tiloittain."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ).fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def format_counts(self):
+        """Muotoilee tilanteen yhdelle riville."""
+        c = self.counts()
+        return (f"Valmiina {c[DONE]}, odottamassa {c[PENDING]}, käynnissä {c[RUNNING]}, "
+                f"epäonnistunut {c[FAILED]}")
+
+    def close(self):
+        self._connection.close()
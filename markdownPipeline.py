@@ -0,0 +1,193 @@
+"""
+Usage: markdownPipeline.py
+--------------------------
+This script runs several Markdown cleanup transforms in a single pass. Instead of
+running replateDOT.py, changeCharachtersInMD.py, fixMermaid.py,
+removeDupilcateMermaidTags.py, removeDuplicateHeaders.py and
+removeSameSentencesByThreshold.py one after another (each walking the tree and
+reading and writing every file), the pipeline walks the tree once, reads each
+file once, applies the selected stages in memory and writes the file once.
+
+Features:
+- Reuses the transform functions of the individual scripts as stages:
+  replateDOT        - replace_dot_in_content (```dot -> ```graphviz)
+  latex             - replace_brackets (\\[ \\] -> $$)
+  fixMermaid        - fix_mermaid_syntax
+  fenceDuplicates   - remove_duplicate_fence_lines
+  headers           - remove_duplicate_headers
+  sentences         - remove_duplicate_sentences
+- Stages run in the order given; new stages can be registered with add_stage()
+- Writes a file only if some stage changed it and reports which stages did
+- Optional manifest (incremental_cache.py) so unchanged files are skipped
+- Optional parallel processing of files in a process pool (parallel_runner.py)
+
+To use:
+1. Run the script: python markdownPipeline.py
+2. When prompted, enter the path to the directory containing Markdown files
+3. Enter the stages to run (comma separated) or press Enter to run all of them
+4. Enter the similarity thresholds for the header and sentence stages
+5. Choose the number of worker processes and whether to skip unchanged files
+"""
+
+import os
+from functools import partial
+
+from changeCharachtersInMD import replace_brackets
+from fixMermaid import fix_mermaid_syntax
+from incremental_cache import TransformManifest
+from parallel_runner import is_failure, run_parallel
+from removeDupilcateMermaidTags import remove_duplicate_fence_lines
+from removeDuplicateHeaders import remove_duplicate_headers
+from removeSameSentencesByThreshold import remove_duplicate_sentences
+from replateDOT import replace_dot_in_content
+
+DEFAULT_STAGES = ["replateDOT", "latex", "fixMermaid", "fenceDuplicates", "headers", "sentences"]
+
+
+def _remove_sentences(content, threshold, use_lsh=False):
+    """Sovittaa remove_duplicate_sentences-funktion (teksti, poistetut) muotoon content -> content."""
+    return remove_duplicate_sentences(content, threshold, use_lsh)[0]
+
+
+def build_stage(name, header_threshold=0.85, sentence_threshold=0.8, use_lsh=False):
+    """Palauttaa nimettyä vaihetta vastaavan funktion content -> content."""
+    stages = {
+        "replateDOT": replace_dot_in_content,
+        "latex": replace_brackets,
+        "fixMermaid": fix_mermaid_syntax,
+        "fenceDuplicates": remove_duplicate_fence_lines,
+        "headers": partial(remove_duplicate_headers, similarity_threshold=header_threshold),
+        "sentences": partial(_remove_sentences, threshold=sentence_threshold, use_lsh=use_lsh),
+    }
+    if name not in stages:
+        raise ValueError(f"Tuntematon vaihe: {name}. Sallitut: {', '.join(stages)}")
+    return stages[name]
+
+
+class MarkdownPipeline:
+    """
+    Ajaa rekisteröidyt vaiheet järjestyksessä jokaiselle Markdown-tiedostolle.
+
+    Vaihe on funktio, joka saa tiedoston sisällön merkkijonona ja palauttaa
+    muunnetun sisällön. Funktioiden tulee olla moduulitason funktioita (tai
+    functools.partial-olioita), jotta putki voidaan ajaa myös prosessipoolissa.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    def add_stage(self, name, func):
+        """Lisää vaiheen putken loppuun."""
+        self.stages.append((name, func))
+        return self
+
+    @property
+    def transform_name(self):
+        """Manifestiin kirjattava nimi, joka muuttuu, jos vaiheet tai niiden parametrit muuttuvat."""
+        parts = []
+        for name, func in self.stages:
+            if isinstance(func, partial) and func.keywords:
+                name += "(" + ",".join(f"{k}={v}" for k, v in sorted(func.keywords.items())) + ")"
+            parts.append(name)
+        return "pipeline:" + ",".join(parts)
+
+    def apply(self, content):
+        """Ajaa kaikki vaiheet sisällölle ja palauttaa (uusi sisältö, muuttaneet vaiheet)."""
+        changed_by = []
+        for name, func in self.stages:
+            updated = func(content)
+            if updated != content:
+                changed_by.append(name)
+                content = updated
+        return content, changed_by
+
+    def process_file(self, file_path):
+        """
+        Lukee tiedoston kerran, ajaa vaiheet ja kirjoittaa tiedoston kerran, jos se
+        muuttui. Palauttaa (onnistuiko, muuttaneet vaiheet).
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except Exception as e:
+            print(f"Virhe luettaessa tiedostoa {file_path}: {e}")
+            return False, []
+
+        new_content, changed_by = self.apply(content)
+        if changed_by:
+            try:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(new_content)
+                print(f"Muokattu: {file_path} ({', '.join(changed_by)})")
+            except Exception as e:
+                print(f"Virhe kirjoitettaessa tiedostoon {file_path}: {e}")
+                return False, []
+        return True, changed_by
+
+    def run(self, directory, workers=1, use_manifest=False):
+        """Käy hakemistopuun läpi kerran ja käsittelee kaikki .md-tiedostot."""
+        manifest = TransformManifest(directory) if use_manifest else None
+        file_paths = []
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith('.md'):
+                    file_path = os.path.join(root, file)
+                    if manifest and manifest.is_current(file_path, self.transform_name):
+                        continue
+                    file_paths.append(file_path)
+
+        if workers > 1:
+            results = run_parallel(_process_with_pipeline, file_paths, self, workers=workers)
+        else:
+            results = [self.process_file(file_path) for file_path in file_paths]
+        # Poikkeuksen nostanut työprosessi palauttaa TaskFailure-olion
+        results = [(False, []) if is_failure(result) else result for result in results]
+
+        changed_files = sum(1 for _, changed_by in results if changed_by)
+        failed = [file_path for file_path, (ok, _) in zip(file_paths, results) if not ok]
+        print(f"Käsitelty {len(file_paths)} tiedostoa, muokattu {changed_files}, epäonnistui {len(failed)}.")
+        for name, _ in self.stages:
+            count = sum(1 for _, changed_by in results if name in changed_by)
+            print(f"  {name}: muutti {count} tiedostoa")
+
+        if manifest:
+            # Epäonnistuneita tiedostoja ei kirjata, joten ne yritetään uudelleen seuraavalla ajolla
+            for file_path, (ok, _) in zip(file_paths, results):
+                if ok:
+                    manifest.record(file_path, self.transform_name)
+            manifest.save()
+            print(f"Ohitettu {manifest.skipped} muuttumatonta tiedostoa.")
+
+
+def _process_with_pipeline(file_path, pipeline):
+    """Prosessipoolin työfunktio: parametrien järjestys sopii run_parallel-funktiolle."""
+    return pipeline.process_file(file_path)
+
+
+def main():
+    directory = input("Anna kansion polku: ").strip()
+    if not os.path.isdir(directory):
+        print("Annettu polku ei ole kelvollinen kansio.")
+        return
+
+    stage_input = input(f"Anna vaiheet pilkulla eroteltuna (oletus {','.join(DEFAULT_STAGES)}): ").strip()
+    stage_names = [name.strip() for name in stage_input.split(',') if name.strip()] or DEFAULT_STAGES
+    header_threshold = float(input("Otsikoiden threshold-arvo (oletus 0.85): ") or "0.85")
+    sentence_threshold = float(input("Lauseiden threshold-arvo (oletus 0.8): ") or "0.8")
+    workers = int(input("Rinnakkaisten prosessien määrä (oletus 1): ") or "1")
+    use_manifest = input("Ohitetaanko edellisen ajon jälkeen muuttumattomat tiedostot? (K/e): ").strip().lower() != 'e'
+
+    pipeline = MarkdownPipeline()
+    try:
+        for name in stage_names:
+            pipeline.add_stage(name, build_stage(name, header_threshold, sentence_threshold))
+    except ValueError as e:
+        print(e)
+        return
+
+    pipeline.run(directory, workers, use_manifest)
+
+
+if __name__ == "__main__":
+    main()
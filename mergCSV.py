@@ -9,22 +9,78 @@ Features:
 - Preserves the original data without modifying column values
 - Ignores index numbers from the original files
 - Outputs a single consolidated CSV file
+- Streaming mode (default): each file is read in chunks of CHUNK_ROWS rows
+  and appended to the output, so peak memory does not depend on the total
+  input size. The column set is the union of all headers, computed up front
+  from the header rows only; columns missing from a file are left empty, and
+  values are copied as text without reformatting
+- Columnar output: Parquet (one file, or a Hive-partitioned directory such as
+  symbol=BTC/part-0.parquet) or Arrow IPC (Feather v2, can be memory-mapped)
+  with typed columns. Column types are inferred by pyarrow from the first
+  block of each file and unified across files (int + float -> float, other
+  conflicts -> text); a column whose later values do not fit is re-read as text
+- The input files are parsed in parallel worker processes (parallel_runner.py),
+  which write their record batches straight to intermediate Arrow files; the
+  main process assembles them into Parquet row groups of up to ROW_GROUP_ROWS
+  rows (zstd compressed) or into the Arrow file
+- Key-based merge (CSV output): for inputs that are each sorted by a key such
+  as symbol,date, the files are interleaved with a streaming k-way heap merge
+  (heapq.merge) and rows with the same key are deduplicated on the fly, keeping
+  either the last (later file wins) or the first one. The result is globally
+  sorted and duplicate-free without loading the files or a separate sort and
+  drop_duplicates pass. Keys are compared as text, so dates should be in ISO
+  format; an input that is not sorted by the key stops the merge with an error
+- Incremental mode (CSV output): a manifest next to the output
+  (<output>.manifest.json) records each source file's size, mtime, row count
+  and read position. On the next run only new files and the new rows of grown
+  files are parsed and appended; the already read part of a grown file is only
+  hashed. A last line without a newline is left for the next run while the
+  file may still be written, and is read as a complete row once the file is
+  unchanged between two runs, or when the output is built from scratch. If an
+  already read part of a source has changed (a hash of the whole read part),
+  a last line read without its newline has since been continued, or a new
+  file brings new columns, the output is rebuilt once in full. Rows appended
+  by an interrupted run are truncated away and re-read
+- The output path and format are asked at startup; the old hardcoded path is
+  the default
 
 Requirements:
 - pandas library
+- pyarrow library (for Parquet and Arrow output)
 
 To use:
 1. Run the script: python mergCSV.py
 2. When prompted, enter the path to the directory containing CSV files
-3. The script will create a combined CSV file at the hardcoded output path
-   (/home/antti/MetaGPT/data/cryptocurrency_historical_prices.csv)
-
-Note: To change the output location, modify the 'output_file' variable in the main section.
+3. Choose the output format (csv, parquet or arrow) and the output path; press
+   Enter for the default path
+   (/home/antti/MetaGPT/data/cryptocurrency_historical_prices.<format>)
+4. For Parquet, optionally give a column to partition the output by
+5. For CSV, choose the merge mode: streaming (Enter), in-memory, by key
+   (give the key columns, e.g. symbol,date, and whether the last or the first
+   row of a key is kept) or incremental (append only new rows)
 """
 
+import csv
+import hashlib
+import heapq
+import json
 import os
+import shutil
+from itertools import groupby
+from operator import itemgetter
+
 import pandas as pd
 
+from parallel_runner import is_failure, run_parallel
+
+CHUNK_ROWS = 100000  # Rivejä kerrallaan muistissa suoratoistotilassa
+ROW_GROUP_ROWS = 1000000  # Parquet-riviryhmän enimmäiskoko
+PARQUET_COMPRESSION = "zstd"
+DEFAULT_OUTPUT_FILE = "/home/antti/MetaGPT/data/cryptocurrency_historical_prices.csv"
+OUTPUT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+MANIFEST_SUFFIX = ".manifest.json"  # Lisäystilan lähdeluettelo tulostiedoston vieressä
+READ_BLOCK = 65536
+
 def merge_csv_files(input_folder, output_file):
     """
     Yhdistää kaikki CSV-tiedostot kansiossa yhdeksi tiedostoksi.
@@ -56,8 +112,558 @@ def merge_csv_files(input_folder, output_file):
     combined_df.to_csv(output_file, index=False)
     print(f"CSV-tiedostot yhdistetty ja tallennettu tiedostoon: {output_file}")
 
+def list_csv_files(input_folder):
+    """Palauttaa kansion CSV-tiedostojen polut nimen mukaan järjestettynä."""
+    return [os.path.join(input_folder, f) for f in sorted(os.listdir(input_folder)) if f.endswith('.csv')]
+
+def read_header(file_path):
+    """Lukee tiedostosta vain otsikkorivin ja palauttaa sarakkeiden nimet."""
+    return list(pd.read_csv(file_path, nrows=0).columns)
+
+def union_columns(csv_paths):
+    """
+    Laskee kaikkien tiedostojen sarakkeiden yhdisteen pelkistä otsikoista.
+    Sarakkeet ovat siinä järjestyksessä, jossa ne ensimmäisen kerran esiintyvät.
+    """
+    columns = []
+    seen = set()
+    for file_path in csv_paths:
+        for column in read_header(file_path):
+            if column not in seen:
+                seen.add(column)
+                columns.append(column)
+    return columns
+
+def iter_chunks(file_path, columns, chunksize=CHUNK_ROWS):
+    """
+    Lukee tiedoston chunksize rivin paloina tekstinä (arvoja ei muunneta) ja
+    järjestää sarakkeet yhteisen sarakelistan mukaan; puuttuvat jäävät tyhjiksi.
+    """
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, dtype=str, keep_default_na=False):
+        yield chunk.reindex(columns=columns, fill_value="")
+
+def merge_csv_files_streaming(input_folder, output_file, chunksize=CHUNK_ROWS):
+    """
+    Yhdistää kansion CSV-tiedostot paloittain: muistissa on kerrallaan vain
+    yksi pala, otsikko kirjoitetaan kerran ja tulos nimetään valmiiksi vasta,
+    kun kaikki tiedostot on kirjoitettu. Palauttaa kirjoitettujen rivien määrän.
+    """
+    csv_paths = list_csv_files(input_folder)
+    if not csv_paths:
+        print("Ei CSV-tiedostoja annetussa kansiossa.")
+        return 0
+
+    columns = union_columns(csv_paths)
+    print(f"{len(csv_paths)} tiedostoa, yhteensä {len(columns)} saraketta.")
+    temporary_file = output_file + ".part"
+    rows = 0
+    with open(temporary_file, 'w', encoding='utf-8', newline='') as f:
+        # Otsikko kirjoitetaan kerran, palat ilman otsikkoa
+        pd.DataFrame(columns=columns).to_csv(f, index=False)
+        for file_path in csv_paths:
+            print(f"Luetaan tiedosto: {file_path}")
+            for chunk in iter_chunks(file_path, columns, chunksize):
+                chunk.to_csv(f, header=False, index=False)
+                rows += len(chunk)
+    os.replace(temporary_file, output_file)
+    print(f"CSV-tiedostot yhdistetty ({rows} riviä) ja tallennettu tiedostoon: {output_file}")
+    return rows
+
+def iter_keyed_rows(file_path, columns, key_columns, chunksize=CHUNK_ROWS):
+    """
+    Lukee tiedoston rivit tekstinä yhteisessä sarakejärjestyksessä ja palauttaa
+    pareja (avain, rivi). Nostaa ValueError-poikkeuksen, jos tiedosto ei ole
+    avaimen mukaan järjestyksessä, koska lomitus edellyttää järjestettyjä syötteitä.
+    """
+    key_of = itemgetter(*[columns.index(column) for column in key_columns])
+    previous = None
+    for chunk in iter_chunks(file_path, columns, chunksize):
+        for row in chunk.itertuples(index=False, name=None):
+            key = key_of(row)
+            if previous is not None and key < previous:
+                raise ValueError(f"Tiedosto {file_path} ei ole järjestyksessä avaimen mukaan: {key} < {previous}")
+            previous = key
+            yield key, row
+
+def merge_csv_files_by_key(input_folder, output_file, key_columns, keep="last", chunksize=CHUNK_ROWS):
+    """
+    Lomittaa avaimen mukaan järjestetyt CSV-tiedostot kekolomituksella yhdeksi
+    järjestetyksi tiedostoksi ja poistaa saman avaimen toistot: keep="last"
+    säilyttää viimeisen (myöhempi tiedosto voittaa), keep="first" ensimmäisen.
+    Muistissa on kerrallaan vain yksi pala kustakin tiedostosta.
+    Palauttaa (kirjoitetut rivit, poistetut toistot).
+    """
+    csv_paths = list_csv_files(input_folder)
+    if not csv_paths:
+        print("Ei CSV-tiedostoja annetussa kansiossa.")
+        return 0, 0
+
+    columns = union_columns(csv_paths)
+    for file_path in csv_paths:
+        missing = [column for column in key_columns if column not in read_header(file_path)]
+        if missing:
+            print(f"Tiedostosta {file_path} puuttuvat avainsarakkeet: {', '.join(missing)}")
+            return 0, 0
+    print(f"{len(csv_paths)} tiedostoa, yhteensä {len(columns)} saraketta, avain: {', '.join(key_columns)}.")
+
+    # Pala per tiedosto pienenee tiedostojen määrän mukaan, jotta muistin käyttö pysyy rajattuna
+    file_chunksize = max(1000, chunksize // len(csv_paths))
+    # heapq.merge on vakaa: samalla avaimella aiemman tiedoston rivi tulee ensin
+    merged = heapq.merge(*[iter_keyed_rows(file_path, columns, key_columns, file_chunksize)
+                           for file_path in csv_paths], key=itemgetter(0))
+
+    temporary_file = output_file + ".part"
+    rows = 0
+    duplicates = 0
+    try:
+        with open(temporary_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(columns)
+            buffer = []
+            for _, group in groupby(merged, key=itemgetter(0)):
+                kept = None
+                for count, (_, row) in enumerate(group):
+                    if count == 0 or keep == "last":
+                        kept = row
+                duplicates += count
+                buffer.append(kept)
+                if len(buffer) >= chunksize:
+                    writer.writerows(buffer)
+                    rows += len(buffer)
+                    buffer = []
+            writer.writerows(buffer)
+            rows += len(buffer)
+    except BaseException:
+        # Keskeytynyt lomitus ei jätä puolikasta tiedostoa
+        os.remove(temporary_file)
+        raise
+    os.replace(temporary_file, output_file)
+    print(f"CSV-tiedostot lomitettu ({rows} riviä, {duplicates} toistoa poistettu) "
+          f"ja tallennettu tiedostoon: {output_file}")
+    return rows, duplicates
+
+def ask_key_columns():
+    """Kysyy avainsarakkeet ja sen, kumpi saman avaimen riveistä säilytetään."""
+    answer = input("Avainsarakkeet pilkulla erotettuina, esim. symbol,date: ")
+    key_columns = [column.strip() for column in answer.split(",") if column.strip()]
+    if not key_columns:
+        return None, None
+    first = input("Säilytetäänkö saman avaimen riveistä viimeinen vai ensimmäinen? (V/e): ").strip().lower() == 'e'
+    return key_columns, "first" if first else "last"
+
+def manifest_path(output_file):
+    """Lähdeluettelon polku: tulostiedoston vieressä."""
+    return output_file + MANIFEST_SUFFIX
+
+def load_manifest(output_file):
+    """Lukee lähdeluettelon, tai palauttaa None, jos sitä ei ole tai tulostiedosto puuttuu."""
+    path = manifest_path(output_file)
+    if not os.path.exists(path) or not os.path.exists(output_file):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(output_file, manifest):
+    """Tallentaa lähdeluettelon atomisesti (väliaikainen tiedosto + os.replace)."""
+    path = manifest_path(output_file)
+    with open(path + ".part", 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".part", path)
+
+def hash_range(file_path, start, end, hasher=None):
+    """
+    Päivittää tiivisteen tiedoston tavuilla start..end ja palauttaa sen. Luetun
+    osan tiiviste lasketaan koko osasta, joten mikä tahansa muutos paljastuu.
+    """
+    if hasher is None:
+        hasher = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            block = f.read(min(READ_BLOCK, end - position))
+            if not block:
+                break
+            hasher.update(block)
+            position += len(block)
+    return hasher
+
+def continues_last_line(file_path, offset):
+    """
+    Onko luetun osan rivinvaihdotonta viimeistä riviä jatkettu: kohdan offset
+    edellinen tavu ei ole rivinvaihto, eikä seuraavakaan ole.
+    """
+    if offset == 0:
+        return False
+    with open(file_path, 'rb') as f:
+        f.seek(offset - 1)
+        edge = f.read(2)
+    return edge[:1] != b"\n" and edge[1:2] not in (b"", b"\n", b"\r")
+
+def complete_length(file_path, size):
+    """
+    Palauttaa kohdan viimeisen rivinvaihdon jälkeen, jotta kesken kirjoitettua
+    viimeistä riviä ei lueta. Se luetaan seuraavalla ajolla.
+    """
+    with open(file_path, 'rb') as f:
+        position = size
+        while position > 0:
+            start = max(0, position - READ_BLOCK)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            position = start
+    return 0
+
+class _ByteRange:
+    """Tiedosto-olio, joka palauttaa vain tavut kohdasta start kohtaan end (pandasin luettavaksi)."""
+
+    def __init__(self, f, start, end):
+        f.seek(start)
+        self.f = f
+        self.remaining = end - start
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+def iter_new_chunks(file_path, start, end, file_columns, columns, chunksize=CHUNK_ROWS):
+    """Lukee tiedoston tavualueen start..end paloina tekstinä yhteisessä sarakejärjestyksessä."""
+    with open(file_path, 'rb') as f:
+        source = _ByteRange(f, start, end)
+        # Alusta luettaessa ensimmäinen rivi on otsikko, muuten sarakkeet tulevat luettelosta
+        options = {"header": 0} if start == 0 else {"header": None, "names": file_columns}
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False,
+                                 encoding='utf-8', **options):
+            yield chunk.reindex(columns=columns, fill_value="")
+
+def _start_output(output_file, columns):
+    """Kirjoittaa tulostiedostoon pelkän otsikon ja palauttaa tyhjän lähdeluettelon."""
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        pd.DataFrame(columns=columns).to_csv(f, index=False)
+    manifest = {"columns": columns, "output_size": os.path.getsize(output_file), "sources": {}}
+    save_manifest(output_file, manifest)
+    return manifest
+
+def merge_csv_files_incremental(input_folder, output_file, chunksize=CHUNK_ROWS):
+    """
+    Lisää tulostiedoston loppuun vain uusien ja kasvaneiden CSV-tiedostojen uudet
+    rivit. Lähdeluettelo (tulostiedosto + MANIFEST_SUFFIX) muistaa jokaisesta
+    lähteestä koon, muokkausajan, rivimäärän, luetun kohdan ja luetun osan
+    tiivisteen. Rivinvaihdoton viimeinen rivi luetaan vasta, kun tiedosto ei ole
+    muuttunut edellisestä ajosta, tai kun tulos rakennetaan alusta. Jos vanhaa
+    lähdettä on muutettu muuten kuin lisäämällä rivejä tai uusi tiedosto tuo
+    uusia sarakkeita, tulos rakennetaan kerran kokonaan uudelleen.
+    Palauttaa lisättyjen rivien määrän.
+    """
+    csv_paths = list_csv_files(input_folder)
+    if not csv_paths:
+        print("Ei CSV-tiedostoja annetussa kansiossa.")
+        return 0
+
+    manifest = load_manifest(output_file)
+    rebuild_reason = "lähdeluetteloa ei ole" if manifest is None else None
+    # (polku, nimi, luettu kohta, koko, os.stat-tulos, luetaanko rivinvaihdoton viimeinen rivi,
+    #  luetun osan tiiviste)
+    plan = []
+    if manifest is not None:
+        sources = manifest["sources"]
+        for file_path in csv_paths:
+            name = os.path.basename(file_path)
+            stat = os.stat(file_path)
+            source = sources.get(name)
+            if source is None:
+                plan.append((file_path, name, 0, stat.st_size, stat, False, None))
+                continue
+            # Muuttumattoman tiedoston rivinvaihdoton viimeinen rivi on valmis
+            unchanged = stat.st_size == source["size"] and stat.st_mtime_ns == source["mtime_ns"]
+            if unchanged and source["offset"] == stat.st_size:
+                continue
+            if stat.st_size < source["offset"]:
+                rebuild_reason = f"tiedostoa {name} on lyhennetty"
+                break
+            hasher = hash_range(file_path, 0, source["offset"])
+            if hasher.hexdigest() != source.get("prefix_hash"):
+                rebuild_reason = f"tiedostoa {name} on muutettu"
+                break
+            if continues_last_line(file_path, source["offset"]):
+                rebuild_reason = f"tiedoston {name} viimeistä riviä on jatkettu"
+                break
+            plan.append((file_path, name, source["offset"], stat.st_size, stat, unchanged, hasher))
+        new_columns = [column for file_path, name, start, *_ in plan if start == 0
+                       for column in read_header(file_path) if column not in manifest["columns"]]
+        if rebuild_reason is None and new_columns:
+            rebuild_reason = f"uusia sarakkeita: {', '.join(dict.fromkeys(new_columns))}"
+
+    if rebuild_reason is not None:
+        print(f"Rakennetaan tulos kokonaan uudelleen ({rebuild_reason}).")
+        manifest = _start_output(output_file, union_columns(csv_paths))
+        plan = [(file_path, os.path.basename(file_path), 0, stat.st_size, stat, True, None)
+                for file_path, stat in ((file_path, os.stat(file_path)) for file_path in csv_paths)]
+    elif os.path.getsize(output_file) != manifest["output_size"]:
+        # Edellinen ajo keskeytyi kesken lisäyksen: kirjaamattomat rivit poistetaan ja luetaan uudelleen
+        print("Poistetaan edellisen keskeytyneen ajon kirjaamattomat rivit.")
+        with open(output_file, 'r+b') as f:
+            f.truncate(manifest["output_size"])
+
+    columns = manifest["columns"]
+    appended = 0
+    for file_path, name, start, size, stat, final, hasher in plan:
+        end = size if final else max(start, complete_length(file_path, size))
+        source = manifest["sources"].get(name) or {"rows": 0, "columns": read_header(file_path)}
+        rows = 0
+        if end > start:
+            print(f"Luetaan tiedosto: {file_path} (kohdasta {start})")
+            with open(output_file, 'a', encoding='utf-8', newline='') as f:
+                for chunk in iter_new_chunks(file_path, start, end, source["columns"], columns, chunksize):
+                    chunk.to_csv(f, header=False, index=False)
+                    rows += len(chunk)
+        source.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, rows=source["rows"] + rows,
+                      offset=end, prefix_hash=hash_range(file_path, start, end, hasher).hexdigest())
+        manifest["sources"][name] = source
+        manifest["output_size"] = os.path.getsize(output_file)
+        # Luettelo tallennetaan jokaisen tiedoston jälkeen, jotta keskeytys menettää enintään yhden tiedoston
+        save_manifest(output_file, manifest)
+        appended += rows
+
+    missing = set(manifest["sources"]) - {os.path.basename(file_path) for file_path in csv_paths}
+    if missing:
+        print(f"Huom: {len(missing)} aiemmin luettua tiedostoa puuttuu kansiosta; niiden rivit jäävät tulokseen.")
+    print(f"Lisätty {appended} uutta riviä {len(plan)} tiedostosta tiedostoon: {output_file}")
+    return appended
+
+def infer_file_schema(file_path):
+    """
+    Päättelee tiedoston sarakkeiden tyypit ensimmäisestä lohkosta (pyarrow).
+    Palauttaa listan (sarake, tyyppi) tiedoston sarakejärjestyksessä.
+    """
+    import pyarrow.csv as pa_csv
+
+    reader = pa_csv.open_csv(file_path, parse_options=pa_csv.ParseOptions(newlines_in_values=True))
+    return [(field.name, field.type) for field in reader.schema]
+
+def unify_types(first, second):
+    """Yhdistää kaksi saraketyyppiä: kokonais- ja liukuluku -> liukuluku, muut ristiriidat -> teksti."""
+    import pyarrow as pa
+
+    if first == second or pa.types.is_null(second):
+        return first
+    if pa.types.is_null(first):
+        return second
+    if all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (first, second)):
+        return pa.float64()
+    return pa.string()
+
+def unify_schemas(file_schemas):
+    """
+    Laskee tiedostojen yhteisen skeeman: sarakkeiden yhdiste ensiesiintymisen
+    järjestyksessä ja yhdistetyt tyypit. Pelkästään tyhjät sarakkeet ovat tekstiä.
+    """
+    import pyarrow as pa
+
+    types = {}
+    for schema in file_schemas:
+        for name, column_type in schema:
+            types[name] = unify_types(types[name], column_type) if name in types else column_type
+    return pa.schema([(name, pa.string() if pa.types.is_null(t) else t) for name, t in types.items()])
+
+def convert_file(task, schema):
+    """
+    Työprosessi: lukee CSV-tiedoston yhteisellä skeemalla ja kirjoittaa sen
+    tietuelohkot Arrow IPC -välitiedostoon. task on (csv-polku, välitiedosto).
+    Palauttaa ("ok", rivit) tai ("error", sarakkeen indeksi tiedostossa),
+    jos arvoa ei voitu muuntaa päätellyksi tyypiksi.
+    """
+    import re
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    file_path, part_path = task
+    print(f"Luetaan tiedosto: {file_path}")
+    convert_options = pa_csv.ConvertOptions(
+        column_types={field.name: field.type for field in schema},
+        include_columns=schema.names,
+        include_missing_columns=True,
+    )
+    rows = 0
+    try:
+        reader = pa_csv.open_csv(file_path, convert_options=convert_options,
+                                 parse_options=pa_csv.ParseOptions(newlines_in_values=True))
+        with pa.OSFile(part_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+    except pa.ArrowInvalid as e:
+        match = re.search(r"CSV column #(\d+)", str(e))
+        if match is None:
+            raise
+        return "error", int(match.group(1))
+    return "ok", rows
+
+def iter_part_batches(part_paths):
+    """Lukee välitiedostojen tietuelohkot muistiinkartoitettuina järjestyksessä."""
+    import pyarrow as pa
+
+    for part_path in part_paths:
+        with pa.memory_map(part_path) as source:
+            reader = pa.ipc.open_file(source)
+            for index in range(reader.num_record_batches):
+                yield reader.get_batch(index)
+
+def write_parquet(part_paths, schema, output_path, row_group_rows=ROW_GROUP_ROWS):
+    """Kirjoittaa lohkot yhteen Parquet-tiedostoon noin row_group_rows rivin riviryhminä."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with pq.ParquetWriter(output_path, schema, compression=PARQUET_COMPRESSION) as writer:
+        pending = []
+        pending_rows = 0
+        for batch in iter_part_batches(part_paths):
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            if pending_rows >= row_group_rows:
+                writer.write_table(pa.Table.from_batches(pending, schema), row_group_size=row_group_rows)
+                pending, pending_rows = [], 0
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema), row_group_size=row_group_rows)
+
+def write_partitioned_parquet(part_paths, schema, output_dir, partition_by, row_group_rows=ROW_GROUP_ROWS):
+    """Kirjoittaa Hive-tyylisen osioidun Parquet-kansion (sarake=arvo/part-0.parquet)."""
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(part_paths, schema=schema, format="ipc")
+    ds.write_dataset(
+        dataset, output_dir, format="parquet",
+        partitioning=[partition_by], partitioning_flavor="hive",
+        file_options=ds.ParquetFileFormat().make_write_options(compression=PARQUET_COMPRESSION),
+        max_rows_per_group=row_group_rows, min_rows_per_group=min(row_group_rows, 65536),
+        existing_data_behavior="error",
+    )
+
+def write_arrow(part_paths, schema, output_path):
+    """Kirjoittaa lohkot yhteen Arrow IPC -tiedostoon (Feather v2), jonka voi lukea muistiinkartoitettuna."""
+    import pyarrow as pa
+
+    with pa.OSFile(output_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in iter_part_batches(part_paths):
+            writer.write_batch(batch)
+
+def _remove_path(path):
+    """Poistaa tiedoston tai kansion, jos se on olemassa."""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+def merge_csv_files_columnar(input_folder, output_path, output_format="parquet",
+                             partition_by=None, workers=None):
+    """
+    Yhdistää kansion CSV-tiedostot tyypitetyiksi sarakkeiksi Parquet- tai Arrow
+    IPC -muotoon. Tiedostot jäsennetään rinnakkain työprosesseissa, jotka
+    kirjoittavat tietuelohkot suoraan välitiedostoihin; pääprosessi kokoaa ne
+    tulokseen riviryhminä. partition_by (vain parquet) tekee osioidun kansion.
+    Palauttaa kirjoitettujen rivien määrän.
+    """
+    import pyarrow as pa
+
+    csv_paths = list_csv_files(input_folder)
+    if not csv_paths:
+        print("Ei CSV-tiedostoja annetussa kansiossa.")
+        return 0
+
+    file_schemas = run_parallel(infer_file_schema, csv_paths, workers=workers)
+    if any(is_failure(schema) for schema in file_schemas):
+        print("Tiedostojen sarakkeita ei voitu lukea, yhdistäminen keskeytetään.")
+        return 0
+    schema = unify_schemas(file_schemas)
+    if partition_by is not None and partition_by not in schema.names:
+        print(f"Osiointisaraketta '{partition_by}' ei löydy tiedostoista.")
+        return 0
+    print(f"{len(csv_paths)} tiedostoa, yhteensä {len(schema)} saraketta.")
+
+    temporary_path = output_path + ".part"
+    parts_dir = output_path + ".parts"
+    _remove_path(temporary_path)
+    _remove_path(parts_dir)
+    os.makedirs(parts_dir)
+    try:
+        tasks = [(file_path, os.path.join(parts_dir, f"part-{index:05d}.arrow"))
+                 for index, file_path in enumerate(csv_paths)]
+        while True:
+            results = run_parallel(convert_file, tasks, schema, workers=workers)
+            if any(is_failure(result) for result in results):
+                print("Tiedostojen muuntaminen epäonnistui, yhdistäminen keskeytetään.")
+                return 0
+            # Arvo, joka ei sopinut ensimmäisestä lohkosta pääteltyyn tyyppiin: sarake tekstiksi
+            failed = {(csv_paths[index], file_schemas[index][value][0])
+                      for index, (status, value) in enumerate(results) if status == "error"}
+            if not failed:
+                break
+            widened = {name for _, name in failed}
+            # Jo tekstisarakkeen virhe (esim. virheellinen UTF-8) ei korjaannu uudelleenluvulla
+            unfixable = sorted((file_path, name) for file_path, name in failed
+                               if pa.types.is_string(schema.field(name).type))
+            if unfixable:
+                for file_path, name in unfixable:
+                    print(f"Virhe: sarakkeen '{name}' arvoa ei voitu lukea tiedostossa {file_path}.")
+                print("Yhdistäminen keskeytetään.")
+                return 0
+            print(f"Sarakkeet muutetaan tekstiksi ja luetaan uudelleen: {', '.join(sorted(widened))}")
+            schema = pa.schema([(field.name, pa.string()) if field.name in widened else field
+                                for field in schema])
+
+        rows = sum(value for _, value in results)
+        part_paths = [part_path for _, part_path in tasks]
+        if output_format == "arrow":
+            write_arrow(part_paths, schema, temporary_path)
+        elif partition_by is not None:
+            write_partitioned_parquet(part_paths, schema, temporary_path, partition_by)
+        else:
+            write_parquet(part_paths, schema, temporary_path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    _remove_path(output_path)
+    os.replace(temporary_path, output_path)
+    print(f"CSV-tiedostot yhdistetty ({rows} riviä) ja tallennettu: {output_path}")
+    return rows
+
+def ask_output(default_output=DEFAULT_OUTPUT_FILE):
+    """Kysyy tulostusmuodon, tulospolun ja Parquetin osiointisarakkeen."""
+    output_format = input("Tulostusmuoto: csv, parquet vai arrow? (Enter = csv): ").strip().lower() or "csv"
+    if output_format not in OUTPUT_FORMATS:
+        print(f"Tuntematon muoto '{output_format}', käytetään csv-muotoa.")
+        output_format = "csv"
+    default_path = os.path.splitext(default_output)[0] + OUTPUT_FORMATS[output_format]
+    output_path = input(f"Anna tulostiedoston polku (Enter = {default_path}): ").strip() or default_path
+    partition_by = None
+    if output_format == "parquet":
+        partition_by = input("Osiointisarake (Enter = ei osiointia): ").strip() or None
+    return output_format, output_path, partition_by
+
 # Esimerkki käytöstä
 if __name__ == "__main__":
     input_folder = input("Anna polku kansioon, jossa CSV-tiedostot ovat: ")
-    output_file = "/home/antti/MetaGPT/data/cryptocurrency_historical_prices.csv"
-    merge_csv_files(input_folder, output_file)
+    output_format, output_file, partition_by = ask_output()
+    if output_format != "csv":
+        merge_csv_files_columnar(input_folder, output_file, output_format, partition_by)
+    else:
+        mode = input("Yhdistämistapa: 1 = paloittain, 2 = muistissa kerralla, 3 = avaimen mukaan, "
+                     "4 = vain uudet rivit aiempaan tulokseen (Enter = 1): ").strip()
+        if mode == "2":
+            merge_csv_files(input_folder, output_file)
+        elif mode == "3":
+            key_columns, keep = ask_key_columns()
+            if key_columns:
+                merge_csv_files_by_key(input_folder, output_file, key_columns, keep)
+            else:
+                print("Avainsarakkeita ei annettu.")
+        elif mode == "4":
+            merge_csv_files_incremental(input_folder, output_file)
+        else:
+            merge_csv_files_streaming(input_folder, output_file)
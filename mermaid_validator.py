@@ -0,0 +1,380 @@
+"""
+Usage: mermaid_validator.py
+---------------------------
+Helper module with a lightweight, pure-Python syntax checker for Mermaid
+diagrams. The AI fixers (FixMermaidAzureAi.py, fixMermaidWithDeepSeek.py,
+FixMermaidWithOpenAi.py and asyncMermaidFixer.py) use it to send only broken
+blocks to the model. It can also be run directly to check a folder:
+
+    python mermaid_validator.py
+
+Supported diagram types:
+- flowchart / graph: node shapes, quoted labels, link types and |labels|,
+  & chains, subgraph/end, classDef/class/style/linkStyle/click/direction
+- sequenceDiagram: participants/actors, messages, notes, activations and
+  loop/alt/opt/par/critical/break/rect/box blocks with their end markers
+- classDiagram: class bodies, members, relations with cardinalities and
+  labels, annotations, notes
+- stateDiagram / stateDiagram-v2: transitions, [*], composite states,
+  state declarations, notes, concurrency separators
+
+Other diagram types (gantt, pie, erDiagram, ...) are reported as
+"unsupported" and are still sent to the AI like before.
+
+The checker is intentionally stricter than nothing and looser than Mermaid
+itself: it catches the typical errors in generated diagrams (unbalanced
+brackets, unquoted parentheses inside labels, broken arrows, missing end
+markers) without re-implementing the full Mermaid grammar.
+
+precheck_block() validates the block as it is and returns a valid block
+unchanged. Only a block that fails the check gets the deterministic fixes of
+fix_block() (the fixMermaid.py rules that apply inside a block, without the
+"|>" rule for class diagrams, where "--|>" and "..|>" are valid arrows) and is
+validated again.
+"""
+
+import os
+import re
+
+VALID = "valid"
+INVALID = "invalid"
+UNSUPPORTED = "unsupported"
+
+_COMMENT = re.compile(r'^\s*%%')
+_ID = re.compile(r'[^\s\[\]\(\)\{\}<>"&;:|=\-\.,]+(?:[\-\.][^\s\[\]\(\)\{\}<>"&;:|=\-\.,]+)*')
+_CLASS_SUFFIX = re.compile(r':::[\w\-]+')
+
+# Flowchart-solmujen muodot: avaus -> sulku (pisimmät ensin)
+_SHAPES = [
+    ('(((', ')))'), ('((', '))'), ('([', '])'), ('[[', ']]'), ('[(', ')]'),
+    ('[/', '/]'), ('[/', '\\]'), ('[\\', '\\]'), ('[\\', '/]'), ('{{', '}}'),
+    ('(', ')'), ('[', ']'), ('{', '}'), ('>', ']'),
+]
+_FLOW_LINK_WITH_TEXT = re.compile(
+    r'\s*(?:<|o|x)?(?:--|==|-\.)\s*(?P<text>[^\-=.>|][^>]*?)\s*(?:-->|==>|\.->|---|===|\.-|--o|--x)'
+)
+_FLOW_LINK = re.compile(r'\s*(?:<|o|x)?(?:-{2,}|={2,}|-\.+-)(?:>|o|x)?|\s*~~~')
+_FLOW_DIRECTION = re.compile(r'^(?:graph|flowchart)(?:\s+(TB|TD|BT|RL|LR))?\s*$')
+
+_SEQ_ARROW = r'(?:-->>|->>|-->|->|--x|-x|--\)|-\))'
+_SEQ_MESSAGE = re.compile(r'^(?P<from>[^\s:+\-][^:]*?)\s*' + _SEQ_ARROW + r'\s*[+\-]?\s*(?P<to>[^:]+?)\s*:(?P<text>.*)$')
+_SEQ_PARTICIPANT = re.compile(r'^(participant|actor)\s+\S.*$')
+_SEQ_NOTE = re.compile(r'^[Nn]ote\s+(left of|right of|over)\s+[^:]+:.*$')
+_SEQ_SIMPLE = re.compile(r'^(autonumber|title\b.*|(activate|deactivate|create participant|create actor|destroy)\s+\S.*|links?\s+\S.*|accTitle\s*:.*|accDescr\s*:.*)$')
+_SEQ_OPEN = re.compile(r'^(loop|alt|opt|par|critical|break|rect|box)\b.*$')
+_SEQ_MIDDLE = re.compile(r'^(else|and|option)\b.*$')
+
+_CLASS_RELATION = re.compile(
+    r'^(?P<left>\S+?)\s*(?:"[^"]*"\s*)?'
+    r'(?:<\|--|\*--|o--|-->|--\*|--o|--\|>|\.\.>|\.\.\|>|<\|\.\.|<\.\.|<--|--|\.\.)'
+    r'\s*(?:"[^"]*"\s*)?(?P<right>[^\s:]+)\s*(?::.*)?$'
+)
+_CLASS_DECL = re.compile(r'^class\s+[\w`~<>,\-]+(?:\s*\[".*"\])?(?:\s*:::\s*\w+)?\s*(\{)?\s*$')
+_CLASS_MEMBER = re.compile(r'^[\w`~<>\-]+\s*:\s*.+$')
+_CLASS_OTHER = re.compile(r'^(<<.+>>\s*\w*|note\b.*|direction\s+(TB|TD|BT|RL|LR)|classDef\s+.*|cssClass\s+.*|style\s+.*|link\s+.*|click\s+.*|callback\s+.*|namespace\s+\w+\s*\{)$')
+
+_STATE_TRANSITION = re.compile(r'^(\[\*\]|[\w.]+)\s*-->\s*(\[\*\]|[\w.]+)\s*(?::.*)?$')
+_STATE_DECL = re.compile(r'^state\s+(?:"[^"]*"\s+as\s+)?[\w.]+(?:\s*<<(fork|join|choice)>>)?\s*(\{)?\s*$')
+_STATE_DESC = re.compile(r'^[\w.]+\s*:.+$')
+_STATE_OTHER = re.compile(r'^(--|[\w.]+|direction\s+(TB|TD|BT|RL|LR)|classDef\s+.*|class\s+.*|[\w.]+\s*:::\s*\w+|hide empty description|scale\s+\d+.*)$')
+_STATE_NOTE_INLINE = re.compile(r'^note\s+(left|right) of\s+[\w.]+\s*:.*$')
+_STATE_NOTE_OPEN = re.compile(r'^note\s+(left|right) of\s+[\w.]+\s*$')
+
+
+class MermaidSyntaxError(Exception):
+    """Jäsennysvirhe ja sen rivinumero."""
+
+    def __init__(self, line_number, message):
+        super().__init__(f"rivi {line_number}: {message}")
+        self.line_number = line_number
+
+
+def _content_lines(code):
+    """Palauttaa (rivinumero, rivi) -parit ilman kommentteja, direktiivejä ja frontmatteria."""
+    lines = code.replace('\r\n', '\n').split('\n')
+    result = []
+    in_front_matter = False
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if number == 1 and stripped == '---':
+            in_front_matter = True
+            continue
+        if in_front_matter:
+            if stripped == '---':
+                in_front_matter = False
+            continue
+        if not stripped or _COMMENT.match(stripped):
+            continue
+        result.append((number, stripped))
+    return result
+
+
+def _read_label(text, position, closer, line_number):
+    """Lukee solmun tekstin sulkuun asti; lainausmerkeissä sallitaan mitä tahansa."""
+    if text.startswith('"', position):
+        end = text.find('"', position + 1)
+        if end < 0:
+            raise MermaidSyntaxError(line_number, "sulkematon lainausmerkki")
+        position = end + 1
+        if not text.startswith(closer, position):
+            raise MermaidSyntaxError(line_number, f"odotettiin '{closer}' lainatun tekstin jälkeen")
+        return position + len(closer)
+    end = text.find(closer, position)
+    if end < 0:
+        raise MermaidSyntaxError(line_number, f"sulkematon solmun muoto, odotettiin '{closer}'")
+    label = text[position:end]
+    for char in '()[]{}"':
+        if char in label:
+            raise MermaidSyntaxError(
+                line_number, f"merkki '{char}' solmun tekstissä ilman lainausmerkkejä: {label!r}"
+            )
+    return end + len(closer)
+
+
+def _read_flow_node(text, position, line_number):
+    """Lukee solmun (tunniste + valinnainen muoto + :::luokka) ja palauttaa uuden sijainnin."""
+    match = _ID.match(text, position)
+    if not match:
+        raise MermaidSyntaxError(line_number, f"odotettiin solmun tunnistetta kohdassa: {text[position:]!r}")
+    position = match.end()
+    error = None
+    for opener, closer in _SHAPES:
+        if text.startswith(opener, position):
+            # Samalla avauksella voi olla useampi sulku (esim. [/ ... /] ja [/ ... \]),
+            # joten virhe nostetaan vasta kun mikään muoto ei täsmää
+            try:
+                position = _read_label(text, position + len(opener), closer, line_number)
+                error = None
+                break
+            except MermaidSyntaxError as e:
+                error = error or e
+    if error:
+        raise error
+    class_match = _CLASS_SUFFIX.match(text, position)
+    if class_match:
+        position = class_match.end()
+    return position
+
+
+def _check_flow_statement(text, line_number):
+    """Tarkistaa yhden flowchart-lauseen (solmut, linkit ja &-ketjut)."""
+    position = _read_flow_node(text, 0, line_number)
+    while True:
+        while position < len(text) and text[position] == ' ':
+            position += 1
+        if position >= len(text):
+            return
+        if text[position] == '&':
+            position = _read_flow_node(text, _skip_spaces(text, position + 1), line_number)
+            continue
+        link = _FLOW_LINK_WITH_TEXT.match(text, position) or _FLOW_LINK.match(text, position)
+        if not link:
+            raise MermaidSyntaxError(line_number, f"tuntematon linkki tai ylimääräistä tekstiä: {text[position:]!r}")
+        position = _skip_spaces(text, link.end())
+        if text.startswith('|', position):
+            end = text.find('|', position + 1)
+            if end < 0:
+                raise MermaidSyntaxError(line_number, "sulkematon |linkkiteksti|")
+            position = _skip_spaces(text, end + 1)
+        if position >= len(text):
+            raise MermaidSyntaxError(line_number, "linkki ilman kohdesolmua")
+        position = _read_flow_node(text, position, line_number)
+
+
+def _skip_spaces(text, position):
+    while position < len(text) and text[position] == ' ':
+        position += 1
+    return position
+
+
+def _validate_flowchart(lines):
+    header_number, header = lines[0]
+    # Otsikkorivillä voi olla lauseita puolipisteen jälkeen (graph TD; A-->B)
+    header, _, rest = header.partition(';')
+    if not _FLOW_DIRECTION.match(header):
+        raise MermaidSyntaxError(header_number, f"virheellinen flowchart-otsikko: {header!r}")
+    depth = 0
+    for number, line in [(header_number, rest)] + lines[1:]:
+        for statement in (part.strip() for part in line.split(';')):
+            if not statement:
+                continue
+            keyword = statement.split()[0]
+            if keyword == 'subgraph':
+                depth += 1
+            elif statement == 'end':
+                depth -= 1
+                if depth < 0:
+                    raise MermaidSyntaxError(number, "'end' ilman vastaavaa 'subgraph'-riviä")
+            elif keyword in ('classDef', 'class', 'style', 'linkStyle', 'click', 'direction',
+                             'accTitle:', 'accDescr:', 'accTitle', 'accDescr'):
+                if len(statement.split()) < 2:
+                    raise MermaidSyntaxError(number, f"'{keyword}' ilman parametreja")
+            else:
+                _check_flow_statement(statement, number)
+    if depth:
+        raise MermaidSyntaxError(lines[-1][0], f"{depth} subgraph-lohkoa ilman 'end'-riviä")
+
+
+def _validate_sequence(lines):
+    depth = 0
+    for number, line in lines[1:]:
+        if line == 'end':
+            depth -= 1
+            if depth < 0:
+                raise MermaidSyntaxError(number, "'end' ilman avaavaa lohkoa")
+        elif _SEQ_OPEN.match(line):
+            depth += 1
+        elif _SEQ_MIDDLE.match(line):
+            if depth == 0:
+                raise MermaidSyntaxError(number, f"'{line.split()[0]}' lohkon ulkopuolella")
+        elif not (_SEQ_PARTICIPANT.match(line) or _SEQ_NOTE.match(line) or
+                  _SEQ_SIMPLE.match(line) or _SEQ_MESSAGE.match(line)):
+            raise MermaidSyntaxError(number, f"tunnistamaton sequenceDiagram-rivi: {line!r}")
+    if depth:
+        raise MermaidSyntaxError(lines[-1][0], f"{depth} lohkoa ilman 'end'-riviä")
+
+
+def _validate_class(lines):
+    in_body = False
+    depth = 0
+    for number, line in lines[1:]:
+        if in_body:
+            if line == '}':
+                in_body = False
+            elif '{' in line or '}' in line.replace('{}', ''):
+                raise MermaidSyntaxError(number, "sisäkkäinen tai virheellinen aaltosulku luokan rungossa")
+            continue
+        if line == '}':
+            depth -= 1
+            if depth < 0:
+                raise MermaidSyntaxError(number, "ylimääräinen '}'")
+            continue
+        declaration = _CLASS_DECL.match(line)
+        if declaration:
+            in_body = declaration.group(1) is not None
+            continue
+        if _CLASS_OTHER.match(line):
+            if line.startswith('namespace'):
+                depth += 1
+            continue
+        if not (_CLASS_RELATION.match(line) or _CLASS_MEMBER.match(line)):
+            raise MermaidSyntaxError(number, f"tunnistamaton classDiagram-rivi: {line!r}")
+    if in_body:
+        raise MermaidSyntaxError(lines[-1][0], "luokan runko ilman '}'-merkkiä")
+    if depth:
+        raise MermaidSyntaxError(lines[-1][0], "namespace ilman '}'-merkkiä")
+
+
+def _validate_state(lines):
+    depth = 0
+    in_note = False
+    for number, line in lines[1:]:
+        if in_note:
+            if line == 'end note':
+                in_note = False
+            continue
+        if line == '}':
+            depth -= 1
+            if depth < 0:
+                raise MermaidSyntaxError(number, "ylimääräinen '}'")
+            continue
+        declaration = _STATE_DECL.match(line)
+        if declaration:
+            if declaration.group(2):
+                depth += 1
+            continue
+        if _STATE_NOTE_OPEN.match(line):
+            in_note = True
+            continue
+        if not (_STATE_TRANSITION.match(line) or _STATE_NOTE_INLINE.match(line) or
+                _STATE_DESC.match(line) or _STATE_OTHER.match(line)):
+            raise MermaidSyntaxError(number, f"tunnistamaton stateDiagram-rivi: {line!r}")
+    if in_note:
+        raise MermaidSyntaxError(lines[-1][0], "note ilman 'end note'-riviä")
+    if depth:
+        raise MermaidSyntaxError(lines[-1][0], f"{depth} yhdistelmätilaa ilman '}}'-merkkiä")
+
+
+def validate_mermaid(code):
+    """
+    Tarkistaa mermaid-koodin syntaksin.
+    Palauttaa (tila, virheviesti), jossa tila on VALID, INVALID tai UNSUPPORTED.
+    """
+    lines = _content_lines(code)
+    if not lines:
+        return INVALID, "tyhjä kaavio"
+    header = lines[0][1]
+    first_word = header.split()[0]
+    if first_word in ('graph', 'flowchart'):
+        validator = _validate_flowchart
+    elif first_word == 'sequenceDiagram':
+        validator = _validate_sequence
+    elif first_word == 'classDiagram' or first_word == 'classDiagram-v2':
+        validator = _validate_class
+    elif first_word in ('stateDiagram', 'stateDiagram-v2'):
+        validator = _validate_state
+    else:
+        return UNSUPPORTED, f"kaaviotyyppiä '{first_word}' ei tarkisteta"
+    try:
+        validator(lines)
+    except MermaidSyntaxError as e:
+        return INVALID, str(e)
+    return VALID, None
+
+
+def fix_block(code):
+    """
+    Deterministiset korjaukset yhdelle lohkolle (fixMermaid.py:n lohkon sisäiset
+    säännöt). "|>" -> "|" jätetään luokkakaavioista pois, koska niissä
+    "--|>" ja "..|>" ovat kelvollisia periytymisnuolia.
+    """
+    # Korjaa escapetut kaarisulut
+    fixed = re.sub(r"\\([()])", r"\1", code)
+    lines = _content_lines(fixed)
+    diagram_type = lines[0][1].split()[0] if lines else ""
+    if diagram_type not in ('classDiagram', 'classDiagram-v2'):
+        fixed = re.sub(r"\|>", "|", fixed)
+    return fixed
+
+
+def precheck_block(code):
+    """
+    Tarkistaa lohkon ja korjaa sen tarvittaessa deterministisesti.
+    Palauttaa (koodi, tila, virheviesti): kelvollinen lohko palautetaan
+    muuttumattomana, muuten koodi on fix_block()-funktion korjaama versio.
+    Kutsujan tulee säilyttää alkuperäinen lohko, jos tekoälykorjaus epäonnistuu.
+    """
+    status, error = validate_mermaid(code)
+    if status == VALID:
+        return code, status, error
+    fixed = fix_block(code)
+    if fixed == code:
+        return code, status, error
+    return (fixed,) + validate_mermaid(fixed)
+
+
+def check_directory(directory):
+    """Tulostaa kaikkien Markdown-tiedostojen virheelliset mermaid-lohkot."""
+    pattern = re.compile(r"```mermaid\s*\n(.*?)\n```", re.DOTALL)
+    counts = {VALID: 0, INVALID: 0, UNSUPPORTED: 0}
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(".md"):
+                file_path = os.path.join(root, filename)
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                for match in pattern.finditer(content):
+                    status, error = validate_mermaid(match.group(1))
+                    counts[status] += 1
+                    if status == INVALID:
+                        print(f"{file_path}: {error}")
+    print(f"Kelvollisia {counts[VALID]}, virheellisiä {counts[INVALID]}, "
+          f"tarkistamattomia {counts[UNSUPPORTED]}.")
+
+
+if __name__ == "__main__":
+    directory = input("Anna kansion polku, jossa Markdown-tiedostot sijaitsevat: ")
+    if os.path.isdir(directory):
+        check_directory(directory)
+    else:
+        print("Annettu polku ei ole kelvollinen kansio.")
@@ -0,0 +1,379 @@
+"""
+Usage: mockOpenAiServer.py
+--------------------------
+This script runs a local OpenAI-compatible stub server for developing and
+benchmarking the AI scripts (the Mermaid fixers and the assignment generators)
+without network access or spending real tokens.
+
+Features:
+- Answers POST .../chat/completions, so the same server works as an OpenAI or
+  DeepSeek base_url ("http://localhost:8000/v1") and as an Azure OpenAI
+  endpoint ("http://localhost:8000", deployment paths are accepted)
+- Streaming (server-sent events, usage in the last chunk when
+  stream_options.include_usage is set) and non-streaming answers
+- Mermaid requests are echoed back: a single block is returned as such, and a
+  batch with ===BLOCK n=== / ===END n=== markers is returned block by block;
+  other requests get generated text of completion_tokens words
+- Configurable latency: delay before the first byte, random jitter and
+  streaming speed in tokens per second
+- Configurable faults: share of 500 errors, share of random 429 responses,
+  share of streams cut off before the end, and a requests-per-interval bucket
+  that answers 429 with Retry-After when exceeded
+- Reproducible: faults are drawn from a seeded generator keyed by the request
+  body and its attempt number, so the same run gives the same faults
+  regardless of thread scheduling
+- GET /stats returns counters as JSON: requests, status codes, requests in
+  flight at most, token usage and request durations
+
+Can also be used in-process (benchmarkAiScripts.py does this):
+    from mockOpenAiServer import MockOpenAiServer, MockSettings
+
+    server = MockOpenAiServer(MockSettings(latency=0.2, rate_limit_rate=0.1)).start()
+    client = OpenAI(api_key="mock", base_url=server.base_url)
+    ...
+    print(server.format_stats())
+    server.stop()
+
+Requirements:
+- Python standard library only
+
+To use:
+1. Run the script: python mockOpenAiServer.py
+2. When prompted, enter the port, latency and fault settings (Enter = default)
+3. Point the script under test to http://localhost:<port>/v1, e.g. the
+   commented-out DEEPSEEK_BASE_URL in DPAssignmentGeneratoriLOGO.py
+4. Stop the server with Ctrl+C; the statistics are printed on exit
+"""
+
+import hashlib
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8000
+CHARS_PER_TOKEN = 4  # Karkea arvio kehotteen tokeneille ilman tiktokenia
+BATCH_BLOCK_PATTERN = re.compile(r"^===BLOCK (\d+)===\n(.*?)\n===END \1===$", re.DOTALL | re.MULTILINE)
+VALIDATOR_ERROR_PATTERN = re.compile(r"\n\nTarkistimen löytämä virhe: .*\Z", re.DOTALL)
+FILLER_WORDS = ("Tehtävä", "esimerkki", "selitys", "vastaus", "kaavio", "opiskelija",
+                "vaihe", "logiikka", "piiri", "jännite", "virta", "vastus")
+
+
+class MockSettings:
+    """Palvelimen viive- ja virheasetukset."""
+
+    def __init__(self, latency=0.2, jitter=0.0, tokens_per_second=200.0, completion_tokens=300,
+                 error_rate=0.0, rate_limit_rate=0.0, drop_rate=0.0, requests_per_interval=None,
+                 interval=60.0, retry_after=1.0, seed=0):
+        self.latency = latency  # Viive ennen ensimmäistä tavua (s)
+        self.jitter = jitter  # Satunnainen lisäviive 0..jitter (s)
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens  # Generoidun tekstin pituus sanoina
+        self.error_rate = error_rate  # 500-vastausten osuus
+        self.rate_limit_rate = rate_limit_rate  # Satunnaisten 429-vastausten osuus
+        self.drop_rate = drop_rate  # Kesken katkaistujen suoratoistojen osuus
+        # Pyyntöämpäri: enintään requests_per_interval pyyntöä interval-sekunnissa, muuten 429
+        self.requests_per_interval = requests_per_interval
+        self.interval = interval
+        self.retry_after = retry_after
+        self.seed = seed
+
+
+class MockStats:
+    """Palvelimen laskurit; päivitetään lukon sisällä käsittelijäsäikeistä."""
+
+    def __init__(self):
+        self.requests = 0
+        self.status_counts = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.dropped_streams = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.durations = []
+
+    def as_dict(self):
+        durations = sorted(self.durations)
+        return {
+            "requests": self.requests,
+            "status_counts": {str(code): count for code, count in sorted(self.status_counts.items())},
+            "max_in_flight": self.max_in_flight,
+            "dropped_streams": self.dropped_streams,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "p50_seconds": round(statistics.median(durations), 3) if durations else None,
+            "p95_seconds": (round(statistics.quantiles(durations, n=20, method="inclusive")[18], 3)
+                            if len(durations) >= 2 else None),
+        }
+
+
+def estimate_tokens(text):
+    """Arvioi tekstin tokenimäärän merkkimäärästä."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def mock_answer(messages, completion_tokens):
+    """
+    Muodostaa vastauksen tekstin. Mermaid-pyynnöt palautetaan sellaisinaan
+    (eräpyynnössä lohko kerrallaan), muille generoidaan täytetekstiä.
+    """
+    content = messages[-1].get("content", "") if messages else ""
+    blocks = BATCH_BLOCK_PATTERN.findall(content)
+    if blocks:
+        return "\n".join(f"===BLOCK {block_id}===\n{code}\n===END {block_id}===" for block_id, code in blocks)
+    if "mermaid" in content.lower() and "\n\n" in content:
+        # Kehote päättyy tyhjään riviin, jonka jälkeen tulee lohko ja mahdollinen virheviesti
+        return VALIDATOR_ERROR_PATTERN.sub("", content.split("\n\n", 1)[1])
+    words = [FILLER_WORDS[i % len(FILLER_WORDS)] for i in range(completion_tokens)]
+    return " ".join(words) + "."
+
+
+class MockOpenAiServer:
+    """OpenAI-yhteensopiva testipalvelin, jota voi ajaa taustasäikeessä."""
+
+    def __init__(self, settings=None, host="127.0.0.1", port=0):
+        self.settings = settings or MockSettings()
+        self.stats = MockStats()
+        self._lock = threading.Lock()
+        self._attempts = {}
+        self._bucket = None
+        self._bucket_updated = time.monotonic()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def root_url(self):
+        """Azure-tyylinen endpoint ilman /v1-polkua."""
+        return f"http://{self._server.server_address[0]}:{self.port}"
+
+    @property
+    def base_url(self):
+        """OpenAI-yhteensopiva base_url."""
+        return self.root_url + "/v1"
+
+    def start(self):
+        """Käynnistää palvelimen taustasäikeeseen."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset(self, settings=None):
+        """Nollaa laskurit, ämpärin ja yrityslaskurit; valinnaisesti vaihtaa asetukset."""
+        with self._lock:
+            if settings is not None:
+                self.settings = settings
+            self.stats = MockStats()
+            self._attempts = {}
+            self._bucket = None
+            self._bucket_updated = time.monotonic()
+
+    def format_stats(self):
+        """Muotoilee laskurit yhdelle riville."""
+        with self._lock:
+            data = self.stats.as_dict()
+        codes = ", ".join(f"{code}: {count}" for code, count in data["status_counts"].items())
+        latency = (f"mediaani {data['p50_seconds']:.2f} s, p95 {data['p95_seconds']:.2f} s"
+                   if data["p95_seconds"] is not None else "-")
+        return (f"Pyyntöjä {data['requests']} ({codes or '-'}), enintään {data['max_in_flight']} "
+                f"kerrallaan, katkaistuja {data['dropped_streams']}, tokenit "
+                f"{data['prompt_tokens']} + {data['completion_tokens']}, kesto {latency}")
+
+    def _take_request_slot(self):
+        """Pyyntöämpäri (token bucket). Palauttaa True, jos pyyntö mahtuu rajaan."""
+        limit = self.settings.requests_per_interval
+        if not limit:
+            return True
+        now = time.monotonic()
+        if self._bucket is None:
+            self._bucket = float(limit)
+        self._bucket = min(float(limit),
+                           self._bucket + (now - self._bucket_updated) * limit / self.settings.interval)
+        self._bucket_updated = now
+        if self._bucket < 1:
+            return False
+        self._bucket -= 1
+        return True
+
+    def _plan(self, raw_body):
+        """
+        Arpoo pyynnön kohtalon: (tilakoodi, katkaistaanko, viive). Arvonta perustuu
+        siemeneen, pyynnön sisältöön ja sen yritysnumeroon, joten se toistuu samana.
+        """
+        settings = self.settings
+        digest = hashlib.sha256(raw_body).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            allowed = self._take_request_slot()
+        rng = random.Random(f"{settings.seed}:{digest}:{attempt}")
+        delay = settings.latency + rng.uniform(0, settings.jitter)
+        if not allowed or rng.random() < settings.rate_limit_rate:
+            return 429, False, 0.0
+        if rng.random() < settings.error_rate:
+            return 500, False, delay
+        return 200, rng.random() < settings.drop_rate, delay
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, status, data, headers=None):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path.endswith("/stats"):
+                    with server._lock:
+                        self.send_json(200, server.stats.as_dict())
+                elif path.endswith("/models"):
+                    self.send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+                else:
+                    self.send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                raw_body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not self.path.split("?", 1)[0].endswith("/chat/completions"):
+                    self.send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+                started = time.perf_counter()
+                with server._lock:
+                    server.stats.requests += 1
+                    server.stats.in_flight += 1
+                    server.stats.max_in_flight = max(server.stats.max_in_flight, server.stats.in_flight)
+                status = 200
+                try:
+                    status = self.answer(raw_body)
+                finally:
+                    with server._lock:
+                        server.stats.in_flight -= 1
+                        server.stats.status_counts[status] = server.stats.status_counts.get(status, 0) + 1
+                        server.stats.durations.append(time.perf_counter() - started)
+
+            def answer(self, raw_body):
+                """Vastaa yhteen chat/completions-pyyntöön. Palauttaa tilakoodin."""
+                settings = server.settings
+                body = json.loads(raw_body)
+                status, drop, delay = server._plan(raw_body)
+                if status == 429:
+                    self.send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                                   {"Retry-After": f"{settings.retry_after:g}",
+                                    "retry-after-ms": str(int(settings.retry_after * 1000))})
+                    return status
+                time.sleep(delay)
+                if status == 500:
+                    self.send_json(500, {"error": {"message": "Mock server error", "type": "server_error"}})
+                    return status
+
+                messages = body.get("messages", [])
+                answer = mock_answer(messages, settings.completion_tokens)
+                pieces = re.findall(r"\S+\s*|\s+", answer)
+                prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces),
+                         "total_tokens": prompt_tokens + len(pieces)}
+                with server._lock:
+                    server.stats.prompt_tokens += prompt_tokens
+                    server.stats.completion_tokens += len(pieces)
+                model = body.get("model", "mock")
+                if body.get("stream"):
+                    return self.stream(model, pieces, usage, drop, body)
+                time.sleep(len(pieces) / settings.tokens_per_second)
+                self.send_json(200, {
+                    "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                                 "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+                return status
+
+            def stream(self, model, pieces, usage, drop, body):
+                """Lähettää vastauksen SSE-paloina; drop katkaisee yhteyden puolivälissä."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                pause = 1.0 / server.settings.tokens_per_second
+                for index, piece in enumerate(pieces):
+                    if drop and index == len(pieces) // 2:
+                        with server._lock:
+                            server.stats.dropped_streams += 1
+                        return 200
+                    last = index == len(pieces) - 1
+                    self.send_event({
+                        "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece},
+                                     "finish_reason": "stop" if last else None}],
+                    })
+                    time.sleep(pause)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self.send_event({"id": "chatcmpl-mock", "object": "chat.completion.chunk",
+                                     "created": int(time.time()), "model": model, "choices": [],
+                                     "usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                return 200
+
+            def send_event(self, data):
+                self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        return Handler
+
+
+def ask_number(prompt, default, cast=float):
+    """Kysyy luvun; tyhjä tai virheellinen syöte palauttaa oletuksen."""
+    answer = input(f"{prompt} (Enter = {default}): ").strip()
+    try:
+        return cast(answer) if answer else default
+    except ValueError:
+        print(f"Virheellinen arvo, käytetään oletusta {default}.")
+        return default
+
+
+if __name__ == "__main__":
+    port = ask_number("Portti", DEFAULT_PORT, int)
+    settings = MockSettings(
+        latency=ask_number("Viive ennen ensimmäistä tavua sekunteina", 0.2),
+        tokens_per_second=ask_number("Suoratoiston nopeus tokeneina sekunnissa", 200.0),
+        completion_tokens=ask_number("Generoidun vastauksen pituus tokeneina", 300, int),
+        error_rate=ask_number("500-virheiden osuus 0-1", 0.0),
+        rate_limit_rate=ask_number("Satunnaisten 429-vastausten osuus 0-1", 0.0),
+        requests_per_interval=ask_number("Pyyntöjä enintään minuutissa (0 = ei rajaa)", 0, int) or None,
+    )
+    server = MockOpenAiServer(settings, port=port)
+    print(f"Palvelin käynnissä: {server.base_url} (Azure-endpoint {server.root_url}). "
+          f"Lopeta Ctrl+C:llä.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(server.format_stats())
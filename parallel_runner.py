@@ -0,0 +1,99 @@
+"""
+Usage: parallel_runner.py
+-------------------------
+Helper module that runs a per-file function in a process pool. It is imported
+by removeSameSentencesByThreshold.py and removeDuplicateHeaders.py and is not
+run directly.
+
+Features:
+- Fans the files out to a concurrent.futures.ProcessPoolExecutor
+- Configurable number of worker processes (default: os.cpu_count())
+- Tasks are submitted in chunks (executor.map chunksize) to keep IPC overhead low
+- Everything a worker prints is captured and returned to the parent process,
+  which prints it in the original file order so the log stays readable
+- Return values of the function are collected and returned in the same order;
+  a call that raised an exception is returned as a TaskFailure object, so a
+  failure can be told apart from a function that returned None
+
+Example:
+    from parallel_runner import run_parallel
+
+    for path, result in zip(file_paths, run_parallel(process_file, file_paths, threshold, workers=8)):
+        if is_failure(result):
+            print(f"{path} epäonnistui: {result.error}")
+
+The function passed to run_parallel must be defined at module level so that it
+can be pickled into the worker processes.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+
+
+class TaskFailure:
+    """Epäonnistuneen kutsun tulos: alkio ja virheilmoitus. Totuusarvoltaan epätosi."""
+
+    def __init__(self, item, error):
+        self.item = item
+        self.error = error
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"TaskFailure({self.item!r}, {self.error!r})"
+
+
+def is_failure(result):
+    """Kertoo, onko run_parallel-funktion palauttama tulos epäonnistunut kutsu."""
+    return isinstance(result, TaskFailure)
+
+
+def _run_captured(func, args, item):
+    """
+    Suorittaa funktion työprosessissa ja palauttaa (tuloste, onnistui, paluuarvo);
+    epäonnistuessa paluuarvon paikalla on virheilmoitus.
+    """
+    buffer = io.StringIO()
+    ok = True
+    with redirect_stdout(buffer):
+        try:
+            result = func(item, *args)
+        except Exception as e:
+            print(f"Virhe käsiteltäessä {item}: {e}")
+            ok = False
+            result = f"{type(e).__name__}: {e}"
+    return buffer.getvalue(), ok, result
+
+
+def default_chunksize(item_count, workers):
+    """Jakaa tehtävät noin neljään osaan työprosessia kohden."""
+    return max(1, item_count // (workers * 4))
+
+
+def run_parallel(func, items, *args, workers=None, chunksize=None):
+    """
+    Kutsuu func(item, *args) jokaiselle alkiolle prosessipoolissa ja tulostaa
+    kunkin kutsun tulosteen alkuperäisessä järjestyksessä.
+    Palauttaa kutsujen paluuarvot listana samassa järjestyksessä; poikkeuksen
+    nostaneen kutsun paikalla on TaskFailure-olio.
+    """
+    items = list(items)
+    results = []
+    if not items:
+        return results
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = default_chunksize(len(items), workers)
+
+    task = partial(_run_captured, func, args)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # executor.map palauttaa tulokset syöttöjärjestyksessä
+        for item, (output, ok, result) in zip(items, executor.map(task, items, chunksize=chunksize)):
+            if output:
+                print(output, end='')
+            results.append(result if ok else TaskFailure(item, result))
+    return results
@@ -0,0 +1,104 @@
+"""
+Usage: rate_limiter.py
+----------------------
+Helper module with a thread-safe token-bucket rate limiter for API calls.
+It is imported by DPAssignmentGeneratoriLOGO.py and is not run directly.
+
+Features:
+- Two buckets refilled continuously: tokens per minute and requests per minute
+- acquire() reserves the estimated tokens of a request before it is sent and
+  blocks only the calling thread until both buckets allow it
+- reconcile() corrects the reservation with the real usage from
+  response.usage afterwards, so over- and underestimates even out
+- A request estimated larger than the whole token budget is allowed once the
+  bucket is full, instead of waiting forever
+- Statistics: requests, reserved and used tokens, total time spent waiting
+
+Example:
+    from rate_limiter import RateLimiter
+
+    limiter = RateLimiter(tokens_per_minute=60000, requests_per_minute=60)
+    reserved = limiter.acquire(estimated_tokens)
+    response = client.chat.completions.create(...)
+    limiter.reconcile(reserved, response.usage.total_tokens)
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Token- ja pyyntömäärän rajoitin (token bucket), jaettu säikeiden kesken."""
+
+    def __init__(self, tokens_per_minute, requests_per_minute=None, interval=60.0):
+        self.token_capacity = float(tokens_per_minute)
+        self.request_capacity = float(requests_per_minute) if requests_per_minute else None
+        self.interval = interval
+        self._tokens = self.token_capacity
+        self._requests = self.request_capacity
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+        self.requests = 0
+        self.reserved_tokens = 0
+        self.used_tokens = 0
+        self.wait_seconds = 0.0
+
+    def _refill(self):
+        """Täyttää ämpärit kuluneen ajan mukaan (kutsutaan lukon sisällä)."""
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self.token_capacity,
+                           self._tokens + elapsed * self.token_capacity / self.interval)
+        if self.request_capacity is not None:
+            self._requests = min(self.request_capacity,
+                                 self._requests + elapsed * self.request_capacity / self.interval)
+
+    def _delay(self, tokens):
+        """Palauttaa odotusajan sekunteina, ennen kuin pyyntö mahtuu molempiin ämpäreihin."""
+        delay = 0.0
+        if self._tokens < tokens:
+            delay = (tokens - self._tokens) * self.interval / self.token_capacity
+        if self.request_capacity is not None and self._requests < 1:
+            delay = max(delay, (1 - self._requests) * self.interval / self.request_capacity)
+        return delay
+
+    def acquire(self, estimated_tokens):
+        """
+        Varaa arvioidut tokenit ja yhden pyynnön; odottaa tarvittaessa.
+        Palauttaa varatun tokenimäärän, joka annetaan myöhemmin reconcile()-metodille.
+        """
+        # Koko budjettia suurempi pyyntö päästetään läpi, kun ämpäri on täynnä
+        tokens = min(float(estimated_tokens), self.token_capacity)
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                self._refill()
+                delay = self._delay(tokens)
+                if delay <= 0:
+                    break
+                self._condition.wait(delay)
+            self._tokens -= tokens
+            if self.request_capacity is not None:
+                self._requests -= 1
+            self.requests += 1
+            self.reserved_tokens += tokens
+            self.wait_seconds += time.monotonic() - started
+        return tokens
+
+    def reconcile(self, reserved_tokens, actual_tokens):
+        """
+        Korjaa varauksen todellisella kulutuksella. Ylivaraus palautetaan ämpäriin,
+        alivaraus vähennetään siitä (saldo voi mennä hetkeksi negatiiviseksi).
+        """
+        with self._condition:
+            self._refill()
+            self._tokens = min(self.token_capacity,
+                               self._tokens + reserved_tokens - actual_tokens)
+            self.used_tokens += actual_tokens
+            self._condition.notify_all()
+
+    def format_stats(self):
+        """Muotoilee tilastot yhdelle riville."""
+        return (f"Pyyntöjä {self.requests}, tokeneita varattu {self.reserved_tokens:.0f} / "
+                f"käytetty {self.used_tokens}, odotettu yhteensä {self.wait_seconds:.1f} s")
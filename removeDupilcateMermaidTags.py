@@ -10,16 +10,23 @@ Features:
 - Removes consecutive duplicate code fence markers
 - Preserves the content inside code blocks
 - Reports which files were modified
+- Optional manifest (incremental_cache.py) so files unchanged since the last
+  run are skipped
 
 To use:
 1. Run the script: python removeDupilcateMermaidTags.py
 2. When prompted, enter the path to the directory containing Markdown files
-3. The script will process all Markdown files and report any changes
+3. Choose whether to skip files that are unchanged since the previous run
+4. The script will process all Markdown files and report any changes
 """
 
 import os
 import re
 
+from incremental_cache import TransformManifest
+
+TRANSFORM_NAME = "removeDupilcateMermaidTags"
+
 def remove_duplicate_fence_lines(content):
     """
     Poistaa peräkkäin toistuvat koodilohkomerkit (esim. "```" tai "```mermaid")
@@ -42,32 +49,48 @@ def process_file(file_path):
     """
     Lukee Markdown-tiedoston, poistaa duplikaatit koodilohkomerkeistä
     ja tallentaa muutetun sisällön takaisin tiedostoon, jos muutoksia ilmenee.
+    Palauttaa True, jos tiedosto käsiteltiin onnistuneesti.
     """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        original_content = f.read()
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            original_content = f.read()
 
-    new_content = remove_duplicate_fence_lines(original_content)
+        new_content = remove_duplicate_fence_lines(original_content)
 
-    if new_content != original_content:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        print(f"Muokattu: {file_path}")
-    else:
-        print(f"Ei muutoksia: {file_path}")
+        if new_content != original_content:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(new_content)
+            print(f"Muokattu: {file_path}")
+        else:
+            print(f"Ei muutoksia: {file_path}")
+    except (OSError, UnicodeError) as e:
+        print(f"Virhe käsiteltäessä tiedostoa {file_path}: {e}")
+        return False
+    return True
 
-def process_directory(root_dir):
+def process_directory(root_dir, use_manifest=False):
     """
     Käy läpi annetun kansion ja sen alikansiot, ja käsittelee kaikki .md-tiedostot.
+    Jos use_manifest on True, edellisen ajon jälkeen muuttumattomat tiedostot ohitetaan.
     """
+    manifest = TransformManifest(root_dir) if use_manifest else None
     for dirpath, _, files in os.walk(root_dir):
         for filename in files:
             if filename.endswith(".md"):
                 file_path = os.path.join(dirpath, filename)
-                process_file(file_path)
+                if manifest and manifest.is_current(file_path, TRANSFORM_NAME):
+                    continue
+                # Epäonnistunutta tiedostoa ei kirjata, joten se yritetään uudelleen seuraavalla ajolla
+                if process_file(file_path) and manifest:
+                    manifest.record(file_path, TRANSFORM_NAME)
+    if manifest:
+        manifest.save()
+        print(f"Ohitettu {manifest.skipped} muuttumatonta tiedostoa.")
 
 if __name__ == "__main__":
     directory = input("Anna kansion polku: ")  # Esim. C:\polku\kansioon
     if os.path.isdir(directory):
-        process_directory(directory)
+        use_manifest = input("Ohitetaanko edellisen ajon jälkeen muuttumattomat tiedostot? (K/e): ").strip().lower() != 'e'
+        process_directory(directory, use_manifest)
     else:
         print("Annettu polku ei ole kelvollinen kansio.")
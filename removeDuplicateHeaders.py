@@ -10,18 +10,30 @@ Features:
 - Normalizes headers for comparison (case insensitive, ignores special characters)
 - Preserves all non-header content
 - Reports changes made to each file
+- Optional parallel processing of files in a process pool (parallel_runner.py)
+- Cheap length and quick_ratio() upper bounds before the exact similarity check
+- Optional manifest (incremental_cache.py) so files unchanged since the last
+  run with the same threshold are skipped
 
 To use:
 1. Run the script: python removeDuplicateHeaders.py
 2. When prompted, enter the path to the directory containing Markdown files
 3. Enter a similarity threshold (0.0-1.0) or press Enter for the default value (0.85)
-4. The script will process all files and report removed duplicate headers
+4. Enter the number of worker processes or press Enter for the default value (1)
+5. Choose whether to skip files unchanged since the previous run
+6. The script will process all files and report removed duplicate headers
 """
 
+import io
 import os
 import re
+from collections import Counter
 from difflib import SequenceMatcher
 
+from incremental_cache import TransformManifest
+from parallel_runner import is_failure, run_parallel
+from text_similarity import TieredMatcher, format_stats
+
 
 def normalize_header(text):
     """Normalize header text for comparison"""
@@ -31,59 +43,141 @@ def normalize_header(text):
     return ' '.join(text.split())
 
 
-def headers_are_similar(header1, header2, threshold=0.85):
-    """Check if headers are similar using fuzzy matching"""
+def headers_are_similar(header1, header2, threshold=0.85, matcher=None):
+    """
+    Check if headers are similar using fuzzy matching.
+    If a TieredMatcher is given, cheap upper bounds are tried before the exact ratio.
+    """
+    if matcher is not None:
+        return matcher.is_similar(header1, header2)
     return SequenceMatcher(None, header1, header2).ratio() >= threshold
 
 
-def remove_duplicate_headers_in_folder(folder_path, similarity_threshold=0.85):
+def remove_duplicate_headers(content, similarity_threshold=0.85, matcher=None):
     """
-    Removes duplicate headers from all Markdown files in a folder and its subfolders.
+    Removes duplicate headers from Markdown text.
 
     Parameters:
-        folder_path (str): Path to the folder containing Markdown files.
+        content (str): Markdown text.
+        similarity_threshold (float): Headers at least this similar are duplicates.
+        matcher (TieredMatcher): Optional matcher whose counters are updated.
+
+    Returns:
+        str: The text without the duplicate headers.
     """
-    try:
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                if file.endswith('.md'):
-                    input_file = os.path.join(root, file)
+    if matcher is None:
+        matcher = TieredMatcher(similarity_threshold, strict=False)
+    lines = io.StringIO(content).readlines()
+
+    seen_headers = []
+    cleaned_lines = []
+
+    header_pattern = re.compile(r'^(#{1,6})\s*(.+)$')  # Matches Markdown headers
+
+    for line in lines:
+        match = header_pattern.match(line)
+        if match:
+            header_content = match.group(2).strip()
+            normalized = normalize_header(header_content)
+
+            # Check if similar to any seen header
+            is_duplicate = any(
+                headers_are_similar(normalized, seen, similarity_threshold, matcher)
+                for seen in seen_headers
+            )
+
+            if is_duplicate:
+                continue  # Skip similar header
+            seen_headers.append(normalized)
+        cleaned_lines.append(line)
 
-                    with open(input_file, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
+    return ''.join(cleaned_lines)
 
-                    seen_headers = []
-                    cleaned_lines = []
 
-                    header_pattern = re.compile(r'^(#{1,6})\s*(.+)$')  # Matches Markdown headers
+def remove_duplicate_headers_in_file(input_file, similarity_threshold=0.85):
+    """
+    Removes duplicate headers from a single Markdown file.
+
+    Parameters:
+        input_file (str): Path to the Markdown file.
+        similarity_threshold (float): Headers at least this similar are duplicates.
+
+    Returns:
+        Counter: Comparison counters of the TieredMatcher.
+    """
+    matcher = TieredMatcher(similarity_threshold, strict=False)
+
+    with open(input_file, 'r', encoding='utf-8') as f:
+        content = f.read()
 
-                    for line in lines:
-                        match = header_pattern.match(line)
-                        if match:
-                            header_content = match.group(2).strip()
-                            normalized = normalize_header(header_content)
+    with open(input_file, 'w', encoding='utf-8') as f:
+        f.write(remove_duplicate_headers(content, similarity_threshold, matcher))
 
-                            # Check if similar to any seen header
-                            is_duplicate = any(
-                                headers_are_similar(normalized, seen, similarity_threshold)
-                                for seen in seen_headers
-                            )
+    return matcher.stats
 
-                            if is_duplicate:
-                                continue  # Skip similar header
-                            seen_headers.append(normalized)
-                        cleaned_lines.append(line)
 
-                    with open(input_file, 'w', encoding='utf-8') as f:
-                        f.writelines(cleaned_lines)
+def remove_duplicate_headers_in_folder(folder_path, similarity_threshold=0.85, workers=1,
+                                       use_manifest=False):
+    """
+    Removes duplicate headers from all Markdown files in a folder and its subfolders.
 
+    Parameters:
+        folder_path (str): Path to the folder containing Markdown files.
+        similarity_threshold (float): Headers at least this similar are duplicates.
+        workers (int): Number of worker processes; more than 1 processes files in parallel.
+        use_manifest (bool): Skip files that are unchanged since the previous run.
+    """
+    manifest = TransformManifest(folder_path) if use_manifest else None
+    transform = f"removeDuplicateHeaders:{similarity_threshold}"
+    try:
+        md_files = [
+            os.path.join(root, file)
+            for root, _, files in os.walk(folder_path)
+            for file in files
+            if file.endswith('.md')
+        ]
+        if manifest:
+            md_files = [f for f in md_files if not manifest.is_current(f, transform)]
+        stats = Counter()
+        failed = []
+        if workers > 1:
+            results = run_parallel(remove_duplicate_headers_in_file, md_files,
+                                   similarity_threshold, workers=workers)
+            for input_file, file_stats in zip(md_files, results):
+                if is_failure(file_stats):
+                    failed.append(input_file)
+                else:
+                    stats.update(file_stats)
+        else:
+            for input_file in md_files:
+                try:
+                    stats.update(remove_duplicate_headers_in_file(input_file, similarity_threshold))
+                except (OSError, UnicodeError) as e:
+                    print(f"Error processing {input_file}: {e}")
+                    failed.append(input_file)
+        if manifest:
+            # Failed files are not recorded, so they are retried on the next run
+            for input_file in md_files:
+                if input_file not in failed:
+                    manifest.record(input_file, transform)
+            print(f"Skipped {manifest.skipped} unchanged files")
+
+        if failed:
+            print(f"Failed to process {len(failed)} files: {', '.join(failed)}")
         print(f"Duplicate headers removed and files updated in {folder_path}")
+        print(f"Header comparisons: {format_stats(stats)}")
 
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        if manifest:
+            manifest.save()
 
 
 # Example usage
-folder_path = input("Enter the path to the folder containing Markdown files: ").strip()
-threshold = float(input("Enter similarity threshold (0.0 to 1.0, default 0.85): ") or "0.85")
-remove_duplicate_headers_in_folder(folder_path, threshold)
+if __name__ == "__main__":
+    folder_path = input("Enter the path to the folder containing Markdown files: ").strip()
+    threshold = float(input("Enter similarity threshold (0.0 to 1.0, default 0.85): ") or "0.85")
+    workers = int(input("Enter the number of worker processes (default 1): ") or "1")
+    use_manifest = input("Skip files unchanged since the previous run? (Y/n): ").strip().lower() != 'n'
+    remove_duplicate_headers_in_folder(folder_path, threshold, workers, use_manifest)
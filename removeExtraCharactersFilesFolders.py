@@ -10,13 +10,18 @@ Features:
 - Removes all non-ASCII Unicode characters 
 - Limits file/directory names to 100 characters
 - Shortens paths that would exceed the Windows 255 character limit
-- Avoids naming conflicts during renaming
+- Avoids naming conflicts: all new names are planned first (rename_engine.py),
+  a name that is already taken gets a suffix "(2)", and the plan is applied in
+  one batch that is rolled back if a rename fails
+- Optional dry run that only lists the planned renames
 - Reports all changes made
+- Walks the tree with tree_walker.py (one directory listing per folder)
 
 To use:
 1. Run the script: python removeExtraCharactersFilesFolders.py
 2. When prompted, enter the path to the directory you want to process
-3. The script will rename all files and directories according to the rules
+3. Choose whether to only preview the planned renames
+4. The script will rename all files and directories according to the rules
 
 Note: This is particularly useful for fixing compatibility issues with files
 that have been created on non-Windows systems or contain problematic characters.
@@ -25,6 +30,8 @@ that have been created on non-Windows systems or contain problematic characters.
 import os
 import re
 
+from rename_engine import ask_dry_run, ask_rollback, plan_tree
+
 def sanitize_name(name):
     """
     Poistaa kaikki erikoismerkit ja Unicode-merkit tiedosto- ja kansioiden nimistä.
@@ -45,50 +52,31 @@ def shorten_path(path, max_length=255):
     file_name = file_name[:max_length - len(directory) - 1]
     return os.path.join(directory, file_name)
 
-def process_directory(directory):
+def new_name_for(root, entry):
+    """Palauttaa puhdistetun ja tarvittaessa lyhennetyn nimen."""
+    return os.path.basename(shorten_path(os.path.join(root, sanitize_name(entry.name))))
+
+def process_directory(directory, dry_run=False):
     """
     Käy läpi annetun hakemiston ja muokkaa kansioiden ja tiedostojen nimiä.
+    Kaikki uudet nimet lasketaan ensin; dry_run=True vain tulostaa suunnitelman.
     """
-    for root, dirs, files in os.walk(directory, topdown=False):
-        # Käsittele tiedostot
-        for file in files:
-            try:
-                old_path = os.path.join(root, file)
-                new_name = sanitize_name(file)
-                new_path = os.path.join(root, new_name)
-
-                # Lyhennetään tiedostopolku
-                new_path = shorten_path(new_path)
-
-                if old_path != new_path and not os.path.exists(new_path):
-                    os.rename(old_path, new_path)
-                    print(f"Renamed file: {old_path} -> {new_path}")
-            except Exception as e:
-                print(f"Error processing file '{file}': {e}")
-
-        # Käsittele kansiot
-        for dir in dirs:
-            try:
-                old_path = os.path.join(root, dir)
-                new_name = sanitize_name(dir)
-                new_path = os.path.join(root, new_name)
-
-                # Lyhennetään polku
-                new_path = shorten_path(new_path)
-
-                if old_path != new_path and not os.path.exists(new_path):
-                    os.rename(old_path, new_path)
-                    print(f"Renamed directory: {old_path} -> {new_path}")
-            except Exception as e:
-                print(f"Error processing directory '{dir}': {e}")
+    plan = plan_tree(directory, new_name_for)
+    if dry_run:
+        print(plan.format_plan())
+        return plan
+    for operation in plan.apply():
+        kind = "directory" if operation.is_dir else "file"
+        print(f"Renamed {kind}: {operation.old_path} -> {operation.new_path}")
+    return plan
 
 if __name__ == "__main__":
     directory_to_process = input("Anna hakemiston polku: ")
-    if os.path.isdir(directory_to_process):
+    if os.path.isdir(directory_to_process) and ask_rollback(directory_to_process):
         try:
-            process_directory(directory_to_process)
+            process_directory(directory_to_process, ask_dry_run())
             print("Käsittely valmis.")
         except Exception as e:
             print(f"Virhe käsittelyssä: {e}")
-    else:
+    elif not os.path.isdir(directory_to_process):
         print("Annettu polku ei ole kelvollinen hakemisto.")
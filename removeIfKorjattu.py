@@ -9,6 +9,7 @@ Features:
 - Case-insensitive keyword matching
 - Attempts to remove directories (only if empty)
 - Reports all deletions and errors during the process
+- Walks the tree with tree_walker.py (one directory listing per folder)
 - Uses the keyword 'korjattu' by default, but this can be modified in the code
 
 To use:
@@ -22,6 +23,8 @@ will be deleted before running this script.
 
 import os
 
+from tree_walker import walk
+
 def delete_files_and_dirs_with_keyword(base_path, keyword):
     """
     Poistaa kaikki tiedostot ja kansiot annetusta kansiosta ja sen alikansioista,
@@ -30,11 +33,12 @@ def delete_files_and_dirs_with_keyword(base_path, keyword):
     :param base_path: Polku kansioon, josta tiedostoja ja kansioita etsitään.
     :param keyword: Avainsana, jota etsitään tiedostonimistä ja kansioiden nimistä.
     """
-    for root, dirs, files in os.walk(base_path, topdown=False):
+    keyword = keyword.lower()
+    for root, dirs, files in walk(base_path, topdown=False):
         # Poista tiedostot, joiden nimessä on avainsana
-        for file in files:
-            if keyword.lower() in file.lower():
-                file_path = os.path.join(root, file)
+        for entry in files:
+            if keyword in entry.name.lower():
+                file_path = entry.path
                 try:
                     os.remove(file_path)
                     print(f"Poistettu tiedosto: {file_path}")
@@ -42,9 +46,9 @@ def delete_files_and_dirs_with_keyword(base_path, keyword):
                     print(f"Virhe poistettaessa tiedostoa {file_path}: {e}")
 
         # Poista kansiot, joiden nimessä on avainsana
-        for dir in dirs:
-            if keyword.lower() in dir.lower():
-                dir_path = os.path.join(root, dir)
+        for entry in dirs:
+            if keyword in entry.name.lower():
+                dir_path = entry.path
                 try:
                     os.rmdir(dir_path)  # Poistaa vain tyhjät kansiot
                     print(f"Poistettu kansio: {dir_path}")
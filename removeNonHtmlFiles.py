@@ -6,9 +6,14 @@ This script cleans up directories by removing all non-HTML files and duplicate H
 Features:
 - Recursively processes all files in a directory and its subdirectories
 - Deletes any file that doesn't have a .html extension
-- Identifies duplicate HTML files based on their relative path from the root directory
+- Identifies HTML files with identical content while reading as little as
+  possible: files are grouped by size, same-size files are compared by a hash
+  of their first 64 KiB, and only files that still match and are longer than
+  that get the rest hashed; every byte is read at most once (large unbuffered
+  reads, HASH_THREADS files at once)
 - Removes duplicates while keeping the first occurrence of each HTML file
 - Reports all file deletions and any errors that occur during deletion
+- Walks the tree with tree_walker.py (one directory listing per folder)
 
 To use:
 1. Run the script: python removeNonHtmlFiles.py
@@ -18,34 +23,130 @@ To use:
 Warning: This operation is irreversible. Make sure to back up important files before using.
 """
 
+import hashlib
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-def remove_non_html_files_and_duplicates(folder_path):
-    seen_files = set()
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
+from tree_walker import walk
+
+PREFIX_BYTES = 64 * 1024  # Alkuosan tiiviste karsii useimmat samankokoiset tiedostot
+READ_CHUNK = 1024 * 1024
+HASH_THREADS = 4  # Rinnakkaiset tiivistelaskennat; 1 = ilman säiepoolia
+
+def hash_file(file_path, start=0, limit=None):
+    """
+    Laskee tiedoston BLAKE2b-tiivisteen isoina paloina luettuna kohdasta start
+    alkaen. Jos limit on annettu, tiivistetään enintään limit tavua.
+    Palauttaa (tiiviste, luetut tavut).
+    """
+    digest = hashlib.blake2b()
+    buffer = bytearray(min(READ_CHUNK, limit) if limit else READ_CHUNK)
+    view = memoryview(buffer)
+    total = 0
+    with open(file_path, 'rb', buffering=0) as f:
+        f.seek(start)
+        while limit is None or total < limit:
+            count = f.readinto(view if limit is None else view[:limit - total])
+            if not count:
+                break
+            digest.update(view[:count])
+            total += count
+    return digest.hexdigest(), total
+
+def group_by_hash(groups, start, limit, threads):
+    """
+    Jakaa jokaisen ryhmän tiedostot tiivisteen mukaan ja palauttaa vain ryhmät,
+    joissa on vähintään kaksi tiedostoa. Palauttaa (ryhmät, luetut tavut).
+    """
+    paths = [path for group in groups for path in group]
+
+    def safe_hash(path):
+        try:
+            return hash_file(path, start, limit)
+        except OSError as e:
+            print(f"Virhe luettaessa tiedostoa {path}: {e}")
+            return None, 0
+
+    if threads > 1 and len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            hashes = dict(zip(paths, executor.map(safe_hash, paths)))
+    else:
+        hashes = {path: safe_hash(path) for path in paths}
+
+    result = []
+    for group in groups:
+        by_hash = {}
+        for path in group:
+            digest, _ = hashes[path]
+            if digest is not None:
+                by_hash.setdefault(digest, []).append(path)
+        result.extend(same for same in by_hash.values() if len(same) > 1)
+    return result, sum(read for _, read in hashes.values())
+
+def find_duplicate_files(entries, threads=HASH_THREADS):
+    """
+    Etsii sisällöltään identtiset tiedostot lukemalla mahdollisimman vähän:
+    1. ryhmittely koon mukaan (stat-tieto tulee hakemistolistauksesta),
+    2. samankokoisista tiivistetään vain ensimmäiset PREFIX_BYTES tavua,
+    3. alkuosaa pidemmistä tiivistetään vielä loppuosa, joten jokainen tavu
+       luetaan enintään kerran.
+    Palauttaa (ryhmät, luetut tavut, tiedostojen yhteiskoko). Ryhmien
+    järjestys ja ryhmän sisäinen järjestys noudattavat entries-listaa.
+    """
+    by_size = {}
+    total_size = 0
+    for entry in entries:
+        try:
+            size = entry.stat().st_size
+        except OSError as e:
+            print(f"Virhe luettaessa tiedostoa {entry.path}: {e}")
+            continue
+        total_size += size
+        by_size.setdefault(size, []).append(entry.path)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+
+    groups, bytes_read = group_by_hash(candidates, 0, PREFIX_BYTES, threads)
+    # Alkuosaa lyhyemmät tiedostot on jo tiivistetty kokonaan
+    sizes = {path: size for size, group in by_size.items() for path in group}
+    short = [group for group in groups if sizes[group[0]] <= PREFIX_BYTES]
+    long_groups = [group for group in groups if sizes[group[0]] > PREFIX_BYTES]
+    full_groups, full_read = group_by_hash(long_groups, PREFIX_BYTES, None, threads)
+    return short + full_groups, bytes_read + full_read, total_size
+
+def remove_non_html_files_and_duplicates(folder_path, threads=HASH_THREADS):
+    """
+    Poistaa kaikki muut kuin .html-tiedostot ja sisällöltään identtiset
+    HTML-tiedostot. Jokaisesta sisällöstä säilytetään ensimmäinen
+    (läpikäyntijärjestyksessä ylin) tiedosto.
+    """
+    html_entries = []
+    for root, dirs, files in walk(folder_path):
+        for entry in files:
+            file_path = entry.path
             # Tarkista, onko tiedoston pääte .html
-            if file.endswith('.html'):
-                file_path = os.path.join(root, file)
-                # Tarkista, onko tiedosto jo nähty (sisältöperusteisesti)
-                file_hash = os.path.relpath(file_path, folder_path)  # Käytetään suhteellista polkua tunnistamiseen
-                if file_hash in seen_files:
-                    try:
-                        os.remove(file_path)
-                        print(f"Poistettu duplikaatti: {file_path}")
-                    except Exception as e:
-                        print(f"Virhe poistettaessa tiedostoa {file_path}: {e}")
-                else:
-                    seen_files.add(file_hash)
+            if entry.name.endswith('.html'):
+                html_entries.append(entry)
             else:
                 # Poistetaan ei-HTML-tiedostot
-                file_path = os.path.join(root, file)
                 try:
                     os.remove(file_path)
                     print(f"Poistettu: {file_path}")
                 except Exception as e:
                     print(f"Virhe poistettaessa tiedostoa {file_path}: {e}")
 
+    groups, bytes_read, total_size = find_duplicate_files(html_entries, threads)
+    removed = 0
+    for group in groups:
+        for file_path in group[1:]:
+            try:
+                os.remove(file_path)
+                removed += 1
+                print(f"Poistettu duplikaatti: {file_path} (sama kuin {group[0]})")
+            except Exception as e:
+                print(f"Virhe poistettaessa tiedostoa {file_path}: {e}")
+    print(f"{len(html_entries)} HTML-tiedostoa, {removed} duplikaattia {len(groups)} ryhmässä poistettu. "
+          f"Luettu {bytes_read / 1048576:.1f} / {total_size / 1048576:.1f} MiB.")
+
 def main():
     folder_path = input("Anna kansion polku: ")
 
@@ -11,6 +11,18 @@ Features:
 - Ignores Markdown headers, list markers, and formatting
 - Keeps sentences shorter than 15 characters regardless of similarity
 - Reports removed sentences during processing
+- Optional parallel processing of files in a process pool
+- Optional manifest (incremental_cache.py) in per-file mode so files unchanged
+  since the last run with the same threshold are skipped
+- Cheap length and quick_ratio() upper bounds reject most sentence pairs
+  before the exact SequenceMatcher.ratio(); per-tier counters are reported
+- Optional MinHash/LSH candidate index (text_similarity.py) for long files:
+  only sentences sharing an LSH band are confirmed with SequenceMatcher.ratio()
+- Optional corpus mode that removes sentences repeated across files: one
+  shared signature index, files processed in alphabetical order, first
+  occurrence kept. In this mode the threshold is compared against the MinHash
+  similarity estimate (3-character shingle Jaccard), which is stricter than
+  SequenceMatcher.ratio() for the same value
 
 Special cases that are always preserved:
 - Markdown headers (starting with # or *)
@@ -24,14 +36,37 @@ To use:
 2. When prompted, enter the path to the directory containing Markdown files
 3. Enter a similarity threshold (0.0-1.0) - higher values are more strict, 
    only removing sentences that are very similar
+4. Choose corpus mode to deduplicate across all files, or per-file mode
+5. In per-file mode, choose whether to use the MinHash/LSH index (recommended
+   for files with thousands of sentences, where pairwise comparison is slow)
+6. In per-file mode, enter the number of worker processes; with more than one
+   the files are processed in parallel (parallel_runner.py) and the report is
+   printed in file order
+7. In per-file mode, choose whether to skip files unchanged since the previous run
 """
 
 import os
 import re
-import difflib
+from collections import Counter
 
+from incremental_cache import TransformManifest
+from parallel_runner import is_failure, run_parallel
+from text_similarity import MinHashLSHIndex, SignatureIndex, TieredMatcher, format_stats
 
-def remove_duplicate_sentences(text, threshold):
+
+def _is_comparable(stripped):
+    """
+    Palauttaa True, jos hyväksyttyä lausetta voidaan käyttää vertailukohtana
+    (ei ohitusehtoja ja pituus vähintään 50 merkkiä).
+    """
+    return not (stripped.startswith('#') or stripped.startswith('*') or
+                re.match(r'^\d+[\.\)]\s*$', stripped) or
+                (stripped.startswith('-') and ':' in stripped) or
+                ('**' in stripped) or
+                len(stripped) < 50)
+
+
+def remove_duplicate_sentences(text, threshold, use_lsh=False, corpus_index=None, stats=None):
     """
     Jakaa tekstin osiin siten, että koodilohkot (kolmoisbacktickit) ohitetaan.
     Tekstiosuuksissa lauseet jaetaan ja duplicate-tarkistus suoritetaan seuraavin ehdoin:
@@ -44,12 +79,25 @@ def remove_duplicate_sentences(text, threshold):
     Duplicate-tarkistuksessa säilytetään aina ensimmäinen esiintymä,
     ja vastaavat myöhemmät esiintymät poistetaan, paitsi yllä mainituissa ohitustapauksissa.
 
+    Jos use_lsh on True, hyväksytyt lauseet tallennetaan MinHash/LSH-indeksiin ja
+    SequenceMatcher.ratio() lasketaan vain niille lauseille, jotka jakavat
+    uuden lauseen kanssa vähintään yhden LSH-bandin.
+
+    Jos corpus_index (text_similarity.SignatureIndex) annetaan, lauseita verrataan
+    indeksiin, joka on yhteinen kaikille käsiteltäville tiedostoille. Tällöin
+    samankaltaisuus arvioidaan MinHash-allekirjoituksista eikä ratio()-arvosta.
+
+    Lauseparit verrataan text_similarity.TieredMatcher-luokalla: pituus- ja
+    quick_ratio()-ylärajat hylkäävät parit ennen tarkkaa ratio()-laskua.
+    Jos stats (collections.Counter) annetaan, vaiheiden laskurit lisätään siihen.
+
     Palauttaa muunnetun tekstin sekä listan poistetuista lauseista.
     """
     # Jaetaan koodilohkoihin ja muu teksti
     parts = re.split(r'(```[\s\S]*?```)', text)
     processed_parts = []
     removed_sentences = []
+    matcher = TieredMatcher(threshold)
 
     for part in parts:
         # Koodilohkot jätetään muuttumattomiksi
@@ -60,6 +108,8 @@ def remove_duplicate_sentences(text, threshold):
         # Muussa tekstissä jaetaan lauseisiin
         sentences = re.split(r'(?<=[.!?])\s+', part)
         unique_sentences = []
+        index = MinHashLSHIndex() if use_lsh else None
+        matcher.reset()
         for sentence in sentences:
             stripped = sentence.strip()
             if not stripped:
@@ -84,39 +134,57 @@ def remove_duplicate_sentences(text, threshold):
                 unique_sentences.append(sentence)
                 continue
 
+            if corpus_index is not None:
+                signature = corpus_index.signature(stripped)
+                if corpus_index.find_similar(signature, threshold) is not None:
+                    removed_sentences.append(sentence)
+                    continue
+                unique_sentences.append(sentence)
+                if _is_comparable(stripped):
+                    corpus_index.add(signature)
+                continue
+
             duplicate_found = False
-            # Käydään läpi jo hyväksytyt lauseet; ensimmäinen esiintymä pysyy, myöhemmät verrataan siihen
-            for accepted in unique_sentences:
-                acc_stripped = accepted.strip()
+            if index is not None:
+                # LSH-indeksissä on vain vertailukelpoiset hyväksytyt lauseet
+                signature = index.signature(stripped)
+                compared = index.candidates(stripped, signature)
+            else:
                 # Ohitetaan vertailu, jos hyväksytty lause täyttää jokin ohitusehto
-                if (acc_stripped.startswith('#') or acc_stripped.startswith('*') or
-                        re.match(r'^\d+[\.\)]\s*$', acc_stripped) or
-                        (acc_stripped.startswith('-') and ':' in acc_stripped) or
-                        ('**' in acc_stripped) or
-                        len(acc_stripped) < 50):
-                    continue
-                similarity = difflib.SequenceMatcher(None, stripped, acc_stripped).ratio()
-                if similarity > threshold:
+                compared = (accepted.strip() for accepted in unique_sentences
+                            if _is_comparable(accepted.strip()))
+            # Käydään läpi jo hyväksytyt lauseet; ensimmäinen esiintymä pysyy, myöhemmät verrataan siihen
+            for acc_stripped in compared:
+                if matcher.is_similar(stripped, acc_stripped):
                     duplicate_found = True
                     removed_sentences.append(sentence)
                     break
             if not duplicate_found:
                 unique_sentences.append(sentence)
+                if index is not None and _is_comparable(stripped):
+                    index.add(stripped, signature=signature)
         processed_parts.append(" ".join(unique_sentences))
     new_content = "".join(processed_parts)
+    if stats is not None:
+        stats.update(matcher.stats)
     return new_content, removed_sentences
 
 
-def process_file(filepath, threshold):
-    """Lukee, käsittelee ja kirjoittaa Markdown-tiedoston uudelleen."""
+def process_file(filepath, threshold, use_lsh=False, corpus_index=None):
+    """
+    Lukee, käsittelee ja kirjoittaa Markdown-tiedoston uudelleen. Palauttaa
+    (vertailuvaiheiden laskurit, onnistuiko), jotta epäonnistunutta tiedostoa
+    ei kirjata lähdeluetteloon käsitellyksi.
+    """
+    stats = Counter()
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
     except Exception as e:
         print(f"Virhe luettaessa tiedostoa {filepath}: {e}")
-        return
+        return stats, False
 
-    new_content, removed_sentences = remove_duplicate_sentences(content, threshold)
+    new_content, removed_sentences = remove_duplicate_sentences(content, threshold, use_lsh, corpus_index, stats)
     if new_content != content:
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -128,15 +196,73 @@ def process_file(filepath, threshold):
                     print(f"- {sentence.strip()}")
         except Exception as e:
             print(f"Virhe kirjoitettaessa tiedostoon {filepath}: {e}")
+            return stats, False
+    return stats, True
+
+
+def process_directory(directory, threshold, use_lsh=False, workers=1, use_manifest=False):
+    """
+    Käy läpi kaikki alikansiot ja käsittelee Markdown-tiedostot.
+    Jos workers > 1, tiedostot käsitellään rinnakkain prosessipoolissa.
+    Jos use_manifest on True, edellisen ajon jälkeen muuttumattomat tiedostot ohitetaan.
+    """
+    manifest = TransformManifest(directory) if use_manifest else None
+    # Kynnysarvo kuuluu muunnoksen nimeen: eri arvolla ajo käsittelee tiedostot uudelleen
+    transform = f"removeSameSentencesByThreshold:{threshold}"
+    stats = Counter()
+    if workers > 1:
+        filepaths = [filepath for filepath in iter_markdown_files(directory)
+                     if not (manifest and manifest.is_current(filepath, transform))]
+        results = run_parallel(process_file, filepaths, threshold, use_lsh, workers=workers)
+        failed = []
+        for filepath, result in zip(filepaths, results):
+            if is_failure(result) or not result[1]:
+                failed.append(filepath)
+                continue
+            stats.update(result[0])
+            # Epäonnistunutta tiedostoa ei kirjata, joten se yritetään uudelleen seuraavalla ajolla
+            if manifest:
+                manifest.record(filepath, transform)
+        if failed:
+            print(f"{len(failed)} tiedoston käsittely epäonnistui: {', '.join(failed)}")
+    else:
+        for root, dirs, files in os.walk(directory):
+            for file in files:
+                if file.lower().endswith('.md'):
+                    filepath = os.path.join(root, file)
+                    if manifest and manifest.is_current(filepath, transform):
+                        continue
+                    file_stats, ok = process_file(filepath, threshold, use_lsh)
+                    stats.update(file_stats)
+                    if ok and manifest:
+                        manifest.record(filepath, transform)
+    if manifest:
+        manifest.save()
+        print(f"Ohitettu {manifest.skipped} muuttumatonta tiedostoa.")
+    print(f"Lausevertailut: {format_stats(stats)}")
 
 
-def process_directory(directory, threshold):
-    """Käy läpi kaikki alikansiot ja käsittelee Markdown-tiedostot."""
+def iter_markdown_files(directory):
+    """Palauttaa Markdown-tiedostojen polut deterministisessä (aakkos)järjestyksessä."""
     for root, dirs, files in os.walk(directory):
-        for file in files:
+        dirs.sort()
+        for file in sorted(files):
             if file.lower().endswith('.md'):
-                filepath = os.path.join(root, file)
-                process_file(filepath, threshold)
+                yield os.path.join(root, file)
+
+
+def process_corpus(directory, threshold):
+    """
+    Poistaa toistuvat lauseet koko hakemistopuun yli yhdellä läpikäynnillä.
+
+    Tiedostot käsitellään aakkosjärjestyksessä, joten jokaisesta lähes
+    samanlaisesta lauseesta säilyy aina sama (ensimmäinen) esiintymä.
+    Indeksiin tallennetaan vain lauseiden MinHash-allekirjoitukset.
+    """
+    corpus_index = SignatureIndex()
+    for filepath in iter_markdown_files(directory):
+        process_file(filepath, threshold, corpus_index=corpus_index)
+    print(f"Korpuksen indeksissä {len(corpus_index)} lausetta.")
 
 
 if __name__ == '__main__':
@@ -150,4 +276,12 @@ if __name__ == '__main__':
         print(f"Virheellinen threshold-arvo: {e}. Käytetään oletusarvoa 0.8.")
         threshold = 0.8
 
-    process_directory(directory, threshold)
+    corpus_mode = input("Poistetaanko toistot koko kansiopuun yli (korpustila)? (k/E): ").strip().lower() == 'k'
+    if corpus_mode:
+        process_corpus(directory, threshold)
+    else:
+        use_lsh = input("Käytetäänkö MinHash/LSH-indeksiä suurille tiedostoille? (k/E): ").strip().lower() == 'k'
+        workers_input = input("Anna rinnakkaisten prosessien määrä (oletus 1): ").strip()
+        workers = int(workers_input) if workers_input.isdigit() and int(workers_input) > 0 else 1
+        use_manifest = input("Ohitetaanko edellisen ajon jälkeen muuttumattomat tiedostot? (K/e): ").strip().lower() != 'e'
+        process_directory(directory, threshold, use_lsh, workers, use_manifest)
@@ -8,18 +8,25 @@ Features:
 - Recursively processes all files and directories
 - Removes custom text patterns defined in TEXTS_TO_REMOVE list
 - Removes numeric patterns in the format x.x or x.xx (e.g., 2.5, 3.14)
-- Safely handles naming conflicts
+- Safely handles naming conflicts: all new names are planned first
+  (rename_engine.py), a name that is already taken gets a suffix "(2)", and
+  the plan is applied in one batch that is rolled back if a rename fails
+- Optional dry run that only lists the planned renames
+- Walks the tree with tree_walker.py (one directory listing per folder)
 
 To use:
 1. Edit the TEXTS_TO_REMOVE list at the top of the script to include the text patterns you want to remove
 2. Run the script: python removeWantedText.py
 3. When prompted, enter the path to the directory you want to process
-4. The script will rename all files and directories, removing the specified patterns
+4. Choose whether to only preview the planned renames
+5. The script will rename all files and directories, removing the specified patterns
 """
 
 import os
 import re
 
+from rename_engine import ask_dry_run, ask_rollback, plan_tree
+
 # Määritä poistettavat tekstit tähän listaan
 TEXTS_TO_REMOVE = ['unwanted_text', 'another_text']
 
@@ -34,35 +41,22 @@ def remove_texts_from_name(name, remove_texts):
     new_name = re.sub(r'\b\d\.\d{1,2}\b', '', new_name)
     return new_name
 
-def process_directory(input_dir, remove_texts):
+def process_directory(input_dir, remove_texts, dry_run=False):
     """
-    Käy läpi kansion ja sen alikansiot sekä uudelleennimeää tiedostot ja kansiot
-    poistamalla niiden nimistä annetut tekstit ja numeromuotoiset osat.
+    Uudelleennimeää kansion ja sen alikansioiden tiedostot ja kansiot poistamalla
+    niiden nimistä annetut tekstit ja numeromuotoiset osat. Kaikki uudet nimet
+    lasketaan ensin; dry_run=True vain tulostaa suunnitelman.
     """
-    # Käydään hakemistorakenne läpi alhaalta ylöspäin, jotta kansioiden uudelleennimeäminen onnistuu oikein.
-    for root, dirs, files in os.walk(input_dir, topdown=False):
-        # Käsitellään ensin tiedostot
-        for file_name in files:
-            new_file_name = remove_texts_from_name(file_name, remove_texts)
-            if new_file_name != file_name:
-                old_file_path = os.path.join(root, file_name)
-                new_file_path = os.path.join(root, new_file_name)
-                if os.path.exists(new_file_path):
-                    print(f"Varoitus: kohde {new_file_path} jo olemassa, tiedostoa {old_file_path} ei muuteta.")
-                else:
-                    os.rename(old_file_path, new_file_path)
-                    print(f"Uudelleennimetty tiedosto: {old_file_path} -> {new_file_path}")
-        # Käsitellään kansiot
-        for dir_name in dirs:
-            new_dir_name = remove_texts_from_name(dir_name, remove_texts)
-            if new_dir_name != dir_name:
-                old_dir_path = os.path.join(root, dir_name)
-                new_dir_path = os.path.join(root, new_dir_name)
-                if os.path.exists(new_dir_path):
-                    print(f"Varoitus: kohde {new_dir_path} jo olemassa, kansiota {old_dir_path} ei muuteta.")
-                else:
-                    os.rename(old_dir_path, new_dir_path)
-                    print(f"Uudelleennimetty kansio: {old_dir_path} -> {new_dir_path}")
+    plan = plan_tree(input_dir, lambda root, entry: remove_texts_from_name(entry.name, remove_texts))
+    if dry_run:
+        print(plan.format_plan())
+        return plan
+    for operation in plan.apply():
+        kind = "kansio" if operation.is_dir else "tiedosto"
+        if operation.suffixed:
+            print(f"Varoitus: nimi {operation.requested_name} oli jo käytössä, käytetään nimeä {operation.new_name}.")
+        print(f"Uudelleennimetty {kind}: {operation.old_path} -> {operation.new_path}")
+    return plan
 
 def main():
     # Kysytään käyttäjältä käsiteltävän kansion polku
@@ -70,8 +64,10 @@ def main():
     if not os.path.isdir(input_dir):
         print(f"Virhe: {input_dir} ei ole olemassa oleva kansio.")
         return
+    if not ask_rollback(input_dir):
+        return
 
-    process_directory(input_dir, TEXTS_TO_REMOVE)
+    process_directory(input_dir, TEXTS_TO_REMOVE, ask_dry_run())
 
 if __name__ == '__main__':
     main()
@@ -9,6 +9,8 @@ Features:
 - Skips empty directories and directories with no files
 - Avoids naming conflicts by skipping if target name already exists
 - Reports all renaming operations and skipped directories
+- Walks the tree with tree_walker.py: each folder is listed once, and renamed
+  folders are still descended into under their new name
 
 To use:
 1. Run the script: python renameFolderFiles.py
@@ -18,6 +20,8 @@ To use:
 
 import os
 
+from tree_walker import walk
+
 
 def rename_folders_to_file_names(directory):
     """
@@ -26,36 +30,39 @@ def rename_folders_to_file_names(directory):
 
     :param directory: Pääkansio, jonka alikansiot käydään läpi.
     """
-    for root, dirs, _ in os.walk(directory):
-        for dir_name in dirs:
-            folder_path = os.path.join(root, dir_name)
+    # Kansio käsitellään, kun walk listaa sen, joten jokainen kansio luetaan vain kerran
+    for folder_path, subdirs, files in walk(directory):
+        if folder_path == directory:
+            continue
+        root, dir_name = os.path.split(folder_path)
 
-            # Tarkista, että kansio ei ole tyhjä
-            if not os.listdir(folder_path):
-                print(f"Kansio '{dir_name}' on tyhjä. Ohitetaan.")
-                continue
+        # Tarkista, että kansio ei ole tyhjä
+        if not subdirs and not files:
+            print(f"Kansio '{dir_name}' on tyhjä. Ohitetaan.")
+            continue
 
-            # Etsi tiedostoja kansiosta
-            files = [f for f in os.listdir(folder_path) if os.path.isfile(os.path.join(folder_path, f))]
-            if not files:
-                print(f"Kansiosta '{dir_name}' ei löytynyt tiedostoja. Ohitetaan.")
-                continue
+        # Etsi tiedostoja kansiosta
+        if not files:
+            print(f"Kansiosta '{dir_name}' ei löytynyt tiedostoja. Ohitetaan.")
+            continue
 
-            # Käytä ensimmäisen tiedoston nimeä ilman tiedostopäätettä
-            first_file = files[0]
-            file_base_name, _ = os.path.splitext(first_file)
+        # Käytä ensimmäisen tiedoston nimeä ilman tiedostopäätettä
+        first_file = files[0].name
+        file_base_name, _ = os.path.splitext(first_file)
 
-            # Uusi kansion nimi
-            new_folder_path = os.path.join(root, file_base_name)
+        # Uusi kansion nimi
+        new_folder_path = os.path.join(root, file_base_name)
 
-            # Tarkista, ettei samaa nimeä ole jo olemassa
-            if os.path.exists(new_folder_path):
-                print(f"Kansion '{file_base_name}' nimi on jo käytössä. Ohitetaan.")
-                continue
+        # Tarkista, ettei samaa nimeä ole jo olemassa
+        if os.path.exists(new_folder_path):
+            print(f"Kansion '{file_base_name}' nimi on jo käytössä. Ohitetaan.")
+            continue
 
-            # Uudelleennimeä kansio
-            os.rename(folder_path, new_folder_path)
-            print(f"Kansio '{dir_name}' nimettiin uudelleen '{file_base_name}'.")
+        # Uudelleennimeä kansio
+        os.rename(folder_path, new_folder_path)
+        # Jatketaan alikansioihin uuden polun kautta
+        subdirs[:] = [os.path.join(new_folder_path, entry.name) for entry in subdirs]
+        print(f"Kansio '{dir_name}' nimettiin uudelleen '{file_base_name}'.")
 
 
 if __name__ == "__main__":
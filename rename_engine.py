@@ -0,0 +1,286 @@
+"""
+Usage: rename_engine.py
+-----------------------
+Helper module that renames files and directories in two phases: first a full
+rename plan is built in memory, then it is applied in one batch. It is imported
+by add_sequence_number.py, CheckCharacterLengthFilesFolders.py,
+removeExtraCharactersFilesFolders.py and removeWantedText.py and is not run
+directly.
+
+Features:
+- Name index per directory (case-insensitive, as on Windows and SMB shares):
+  a new name that collides with another entry, or with another planned
+  rename, gets a suffix "name (2).ext", "name (3).ext", ... instead of being
+  skipped or overwriting anything
+- Names freed by entries that are renamed away can be reused; chains
+  (a -> b, b -> c) are ordered so that nothing is overwritten, and cycles
+  (a -> b, b -> a) are broken through a temporary name
+- apply() renames bottom-up (deepest directories first), so every planned path
+  is still valid when it is renamed and nothing has to be looked up again
+- Write-ahead journal (.rename_journal.jsonl in the base directory): if a
+  rename fails, the completed renames are rolled back; if the process is
+  killed, rollback_journal() restores the original names on the next run
+- Dry run: format_plan() lists the planned renames without touching anything
+
+Example:
+    from rename_engine import plan_tree
+
+    plan = plan_tree(base_directory, lambda root, entry: entry.name.lower())
+    print(plan.format_plan())
+    for operation in plan.apply():
+        print(f"{operation.old_path} -> {operation.new_path}")
+"""
+
+import json
+import os
+import uuid
+
+from tree_walker import walk
+
+JOURNAL_FILE = ".rename_journal.jsonl"
+
+
+def _key(name):
+    """Nimi-indeksin avain: kirjainkoosta riippumaton kuten Windowsissa."""
+    return name.casefold()
+
+
+def with_suffix(name, number, is_dir=False):
+    """Lisää nimeen järjestysnumeron ennen tiedostopäätettä: 'a.txt' -> 'a (2).txt'."""
+    base, extension = (name, "") if is_dir else os.path.splitext(name)
+    return f"{base} ({number}){extension}"
+
+
+class RenameOperation:
+    """Yksi suunniteltu uudelleennimeäminen (alkuperäinen polku -> uusi nimi)."""
+
+    def __init__(self, old_path, new_name, is_dir, requested_name):
+        self.old_path = old_path
+        self.new_name = new_name
+        self.is_dir = is_dir
+        # Pyydetty nimi ennen mahdollista numerolisää
+        self.requested_name = requested_name
+
+    @property
+    def parent(self):
+        return os.path.dirname(self.old_path)
+
+    @property
+    def old_name(self):
+        return os.path.basename(self.old_path)
+
+    @property
+    def new_path(self):
+        return os.path.join(self.parent, self.new_name)
+
+    @property
+    def suffixed(self):
+        return self.new_name != self.requested_name
+
+
+class RenamePlan:
+    """Koko puun uudelleennimeämissuunnitelma, joka toteutetaan yhdellä kertaa."""
+
+    def __init__(self, base_directory, journal_path=None):
+        self.base_directory = base_directory
+        self.journal_path = journal_path or os.path.join(base_directory, JOURNAL_FILE)
+        self.operations = []
+        self.skipped = []  # (polku, syy)
+        self.cycles = 0
+        # Kansio kansiolta lasketut vaiheet: {kansio: [(vanha polku, uusi polku)]}
+        self._steps = {}
+        self._final_paths = {}
+
+    def final_path(self, path):
+        """
+        Palauttaa kansion polun suunnitelman jälkeen. Toimii, kun kansiot
+        suunnitellaan ylhäältä alas (vanhempi ennen lapsiaan).
+        """
+        return self._final_paths.get(path, path)
+
+    def plan_directory(self, root, entries, new_name):
+        """
+        Suunnittelee yhden kansion uudelleennimeämiset. entries on kansion koko
+        listaus (DirEntry-oliot), jotta nimi-indeksi kattaa myös muuttumattomat
+        nimet. new_name(entry) palauttaa halutun nimen, tai None, jos nimi säilyy.
+        """
+        requests = []
+        for entry in entries:
+            desired = new_name(entry) if entry.name != JOURNAL_FILE else None
+            if desired is not None and not desired.strip(". "):
+                self.skipped.append((entry.path, "uusi nimi olisi tyhjä"))
+                desired = None
+            if desired is not None and desired != entry.name:
+                requests.append((entry, desired))
+
+        # Aakkosjärjestyksessä ensimmäinen saa pyydetyn nimen, muut numerolisän
+        requests.sort(key=lambda request: request[0].name)
+        moving = {entry.name for entry, _ in requests}
+        taken = {_key(entry.name) for entry in entries if entry.name not in moving}
+        operations = []
+        for entry, desired in requests:
+            is_dir = entry.is_dir()
+            candidate = desired
+            number = 2
+            while _key(candidate) in taken:
+                candidate = with_suffix(desired, number, is_dir)
+                number += 1
+            taken.add(_key(candidate))
+            if candidate != entry.name:
+                operations.append(RenameOperation(entry.path, candidate, is_dir, desired))
+
+        root_final = self.final_path(root)
+        renamed = {operation.old_path: operation.new_name for operation in operations}
+        for entry in entries:
+            if entry.is_dir():
+                self._final_paths[entry.path] = os.path.join(root_final, renamed.get(entry.path, entry.name))
+        if operations:
+            self.operations.extend(operations)
+            self._steps[root] = self._order(operations)
+        return operations
+
+    def _order(self, operations):
+        """
+        Järjestää saman kansion uudelleennimeämiset niin, ettei mikään korvaa
+        vielä siirtämätöntä nimeä. Syklit puretaan väliaikaisen nimen kautta.
+        """
+        current = {id(operation): operation.old_path for operation in operations}
+        owner = {_key(operation.old_name): operation for operation in operations}
+        steps = []
+        pending = list(operations)
+        while pending:
+            waiting = []
+            for operation in pending:
+                blocker = owner.get(_key(operation.new_name))
+                if blocker is None or blocker is operation:
+                    old_path = current[id(operation)]
+                    steps.append((old_path, operation.new_path))
+                    owner.pop(_key(os.path.basename(old_path)), None)
+                else:
+                    waiting.append(operation)
+            if waiting and len(waiting) == len(pending):
+                # Kaikki odottavat toisiaan: sykli, siirretään yksi väliaikaiseen nimeen
+                operation = waiting[0]
+                old_path = current[id(operation)]
+                temporary_path = os.path.join(operation.parent,
+                                              f".{operation.old_name}.{uuid.uuid4().hex[:8]}.tmp")
+                steps.append((old_path, temporary_path))
+                owner.pop(_key(os.path.basename(old_path)), None)
+                current[id(operation)] = temporary_path
+                owner[_key(os.path.basename(temporary_path))] = operation
+                self.cycles += 1
+            pending = waiting
+        return steps
+
+    def steps(self):
+        """Palauttaa kaikki vaiheet toteutusjärjestyksessä: syvimmät kansiot ensin."""
+        ordered = sorted(self._steps.items(),
+                         key=lambda item: os.path.normpath(item[0]).count(os.sep), reverse=True)
+        return [step for _, steps in ordered for step in steps]
+
+    def format_plan(self):
+        """Muotoilee suunnitelman esikatselua varten."""
+        lines = []
+        for operation in sorted(self.operations, key=lambda operation: operation.old_path):
+            relative = os.path.relpath(operation.old_path, self.base_directory)
+            note = " (nimi oli varattu)" if operation.suffixed else ""
+            lines.append(f"{relative} -> {operation.new_name}{note}")
+        for path, reason in self.skipped:
+            lines.append(f"Ohitetaan {os.path.relpath(path, self.base_directory)}: {reason}")
+        lines.append(self.format_summary())
+        return "\n".join(lines)
+
+    def format_summary(self):
+        suffixed = sum(operation.suffixed for operation in self.operations)
+        return (f"Suunniteltu {len(self.operations)} uudelleennimeämistä, joista {suffixed} "
+                f"sai numerolisän; syklejä {self.cycles}, ohitettuja {len(self.skipped)}.")
+
+    def apply(self):
+        """
+        Toteuttaa suunnitelman. Jokainen vaihe kirjataan päiväkirjaan ennen
+        toteutusta; virheen sattuessa tehdyt vaiheet perutaan ja virhe nostetaan.
+        Palauttaa toteutetut RenameOperation-oliot.
+        """
+        steps = self.steps()
+        if not steps:
+            return []
+        completed = []
+        try:
+            with open(self.journal_path, 'w', encoding='utf-8') as journal:
+                for old_path, new_path in steps:
+                    journal.write(json.dumps({"old": old_path, "new": new_path}, ensure_ascii=False) + "\n")
+                    journal.flush()
+                    os.rename(old_path, new_path)
+                    completed.append((old_path, new_path))
+        except OSError:
+            print(f"Virhe uudelleennimeämisessä, perutaan {len(completed)} tehtyä muutosta.")
+            _undo(completed)
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            raise
+        os.remove(self.journal_path)
+        return list(self.operations)
+
+
+def plan_tree(base_directory, new_name, threads=None):
+    """
+    Suunnittelee koko puun uudelleennimeämiset. new_name(root, entry) palauttaa
+    uuden nimen tai None. Sopii skripteille, joissa uusi nimi ei riipu kansion
+    uudesta nimestä.
+    """
+    plan = RenamePlan(base_directory)
+    for root, dirs, files in walk(base_directory, topdown=False, threads=threads):
+        plan.plan_directory(root, dirs + files, lambda entry: new_name(root, entry))
+    return plan
+
+
+def _undo(completed_steps):
+    """Palauttaa tehdyt vaiheet käänteisessä järjestyksessä."""
+    restored = 0
+    for old_path, new_path in reversed(completed_steps):
+        # Vaihe, jota ei ehditty tehdä, ohitetaan
+        if os.path.lexists(new_path) and not os.path.lexists(old_path):
+            os.rename(new_path, old_path)
+            restored += 1
+    return restored
+
+
+def has_journal(base_directory):
+    """Kertoo, jäikö kansioon keskeytyneen ajon päiväkirja."""
+    return os.path.exists(os.path.join(base_directory, JOURNAL_FILE))
+
+
+def rollback_journal(base_directory):
+    """Peruu keskeytyneen ajon muutokset päiväkirjan perusteella. Palauttaa palautettujen määrän."""
+    journal_path = os.path.join(base_directory, JOURNAL_FILE)
+    steps = []
+    with open(journal_path, 'r', encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                step = json.loads(line)
+            except ValueError:
+                break  # Viimeinen rivi voi olla kesken
+            steps.append((step["old"], step["new"]))
+    restored = _undo(steps)
+    os.remove(journal_path)
+    return restored
+
+
+def ask_rollback(base_directory):
+    """
+    Jos edellinen ajo keskeytyi, kysyy käyttäjältä, palautetaanko alkuperäiset nimet.
+    Palauttaa False, jos käyttäjä haluaa lopettaa koskematta kansioon.
+    """
+    if not has_journal(base_directory):
+        return True
+    answer = input("Edellinen uudelleennimeäminen keskeytyi. Palautetaanko alkuperäiset nimet? (K/e): ")
+    if answer.strip().lower() == 'e':
+        print(f"Päiväkirja {JOURNAL_FILE} jätetään paikalleen; poista se, jos muutokset ovat kunnossa.")
+        return False
+    print(f"Palautettu {rollback_journal(base_directory)} nimeä.")
+    return True
+
+
+def ask_dry_run():
+    """Kysyy, näytetäänkö suunnitelma ilman muutoksia."""
+    return input("Näytetäänkö vain suunnitelma tekemättä muutoksia? (k/E): ").strip().lower() == 'k'
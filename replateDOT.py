@@ -10,50 +10,78 @@ Features:
 - Case-insensitive matching to catch variations like ```DOT or ```Dot
 - Reports each file processed and whether changes were made
 - Preserves all other content in the files
+- Optional manifest (incremental_cache.py) so files unchanged since the last
+  run are skipped
 
 To use:
 1. Run the script: python replateDOT.py
 2. When prompted, enter the path to the directory containing Markdown files
-3. The script will process all files and report the changes made
+3. Choose whether to skip files that are unchanged since the previous run
+4. The script will process all files and report the changes made
 """
 
 import os
 import re
 
-def replace_dot_with_graphviz(folder_path):
+from incremental_cache import TransformManifest
+
+TRANSFORM_NAME = "replateDOT"
+
+def replace_dot_in_content(content):
+    """Replaces ```dot with ```graphviz (case-insensitive) in Markdown text."""
+    return re.sub(r'```dot', '```graphviz', content, flags=re.IGNORECASE)
+
+def replace_dot_with_graphviz(folder_path, use_manifest=False):
     """
     Replaces ```dot with ```graphviz in all Markdown files in a folder and its subfolders.
     Prints the name of each processed file.
 
     Parameters:
         folder_path (str): Path to the folder containing Markdown files.
+        use_manifest (bool): Skip files that are unchanged since the previous run.
     """
+    manifest = TransformManifest(folder_path) if use_manifest else None
     try:
         for root, _, files in os.walk(folder_path):
             for file in files:
                 if file.endswith('.md'):
                     input_file = os.path.join(root, file)
+                    if manifest and manifest.is_current(input_file, TRANSFORM_NAME):
+                        continue
                     print(f"Processing file: {input_file}")
 
-                    with open(input_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
+                    try:
+                        with open(input_file, 'r', encoding='utf-8') as f:
+                            content = f.read()
 
-                    # Replace ```dot with ```graphviz
-                    updated_content = re.sub(r'```dot', '```graphviz', content, flags=re.IGNORECASE)
+                        # Replace ```dot with ```graphviz
+                        updated_content = replace_dot_in_content(content)
 
-                    if content != updated_content:
-                        with open(input_file, 'w', encoding='utf-8') as f:
-                            f.write(updated_content)
-                        print(f"  Updated: {input_file}")
-                    else:
-                        print(f"  No changes needed: {input_file}")
+                        if content != updated_content:
+                            with open(input_file, 'w', encoding='utf-8') as f:
+                                f.write(updated_content)
+                            print(f"  Updated: {input_file}")
+                        else:
+                            print(f"  No changes needed: {input_file}")
+                    except (OSError, UnicodeError) as e:
+                        # A file that failed is not recorded, so it is retried on the next run
+                        print(f"  Error processing {input_file}: {e}")
+                        continue
+                    if manifest:
+                        manifest.record(input_file, TRANSFORM_NAME)
 
         print(f"\nFinished processing all Markdown files in {folder_path}")
+        if manifest:
+            print(f"Skipped {manifest.skipped} unchanged files")
 
     except Exception as e:
         print(f"An error occurred: {e}")
+    finally:
+        if manifest:
+            manifest.save()
 
 # Example usage
 if __name__ == "__main__":
     folder_path = input("Enter the path to the folder containing Markdown files: ").strip()
-    replace_dot_with_graphviz(folder_path)
\ No newline at end of file
+    use_manifest = input("Skip files unchanged since the previous run? (Y/n): ").strip().lower() != 'n'
+    replace_dot_with_graphviz(folder_path, use_manifest)
\ No newline at end of file
@@ -0,0 +1,133 @@
+"""
+Usage: streaming_output.py
+--------------------------
+Helper module that streams a chat completion straight into a Markdown file.
+It is imported by DPAssignmentGeneratori.py and DPAssignmentGeneratoriLOGO.py
+and is not run directly.
+
+Features:
+- Requests the completion with stream=True and appends every piece to
+  "<file>.md.part" as it arrives, so nothing is buffered in memory
+- The finished file is fsynced and atomically renamed to its final name;
+  a reader never sees a half-written .md file
+- The answer counts as complete only when the server sends a finish_reason;
+  if the connection drops, the .part file is kept. The next call for the
+  same file sends the partial answer back as an assistant message and asks
+  the model to continue from where it stopped
+- Reports time to first byte, total time and token usage (when the server
+  sends usage in the last chunk)
+
+Example:
+    from streaming_output import stream_completion_to_file
+
+    result = stream_completion_to_file(client, "out/topic.md", "# Aihe: topic\\n\\n",
+                                       model="deepseek-chat", messages=messages,
+                                       max_tokens=8000)
+    print(result.format_stats())
+"""
+
+import os
+import time
+
+PART_SUFFIX = ".part"
+CONTINUE_PROMPT = (
+    "Vastauksesi katkesi. Jatka täsmälleen siitä kohdasta, johon se jäi, "
+    "äläkä toista jo kirjoitettua tekstiä."
+)
+
+
+class StreamResult:
+    """Suoratoiston tulos: kirjoitettu tiedosto, tokenit ja ajoitukset."""
+
+    def __init__(self, file_path, characters, usage, first_byte_seconds,
+                 total_seconds, resumed):
+        self.file_path = file_path
+        self.characters = characters
+        # usage on palvelimen viimeisen palan usage-olio tai None
+        self.prompt_tokens = usage.prompt_tokens if usage else None
+        self.completion_tokens = usage.completion_tokens if usage else None
+        self.total_tokens = usage.total_tokens if usage else None
+        self.first_byte_seconds = first_byte_seconds
+        self.total_seconds = total_seconds
+        self.resumed = resumed
+
+    def format_stats(self):
+        """Muotoilee ajoitukset ja kulutuksen yhdelle riville."""
+        first_byte = (f"{self.first_byte_seconds:.1f} s" if self.first_byte_seconds is not None
+                      else "-")
+        tokens = self.total_tokens if self.total_tokens is not None else "?"
+        resumed = ", jatkettu keskeytyneestä" if self.resumed else ""
+        return (f"Ensimmäinen tavu {first_byte}, valmis {self.total_seconds:.1f} s, "
+                f"{self.characters} merkkiä, {tokens} tokenia{resumed}")
+
+
+def _read_partial(part_path, header):
+    """Palauttaa keskeytyneen vastauksen tekstin ilman otsikkoa, tai tyhjän merkkijonon."""
+    if not os.path.exists(part_path):
+        return ""
+    with open(part_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return content[len(header):] if content.startswith(header) else ""
+
+
+def stream_completion_to_file(client, file_path, header, model, messages, resume=True,
+                              **create_kwargs):
+    """
+    Suoratoistaa vastauksen tiedostoon file_path + ".part" ja nimeää sen
+    valmistuttua atomisesti file_path-nimiseksi. Keskeytyksessä poikkeus
+    nostetaan ja .part-tiedosto jää seuraavaa yritystä varten.
+    """
+    part_path = file_path + PART_SUFFIX
+    partial = _read_partial(part_path, header) if resume else ""
+    if partial.strip():
+        # Jatketaan keskeytynyttä vastausta
+        messages = list(messages) + [
+            {"role": "assistant", "content": partial},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+        mode = 'a'
+    else:
+        partial = ""
+        mode = 'w'
+
+    started = time.perf_counter()
+    first_byte_seconds = None
+    final_usage = None
+    finish_reason = None
+    characters = len(partial)
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **create_kwargs
+    )
+    with open(part_path, mode, encoding='utf-8') as f:
+        if mode == 'w':
+            f.write(header)
+        for chunk in stream:
+            usage = getattr(chunk, "usage", None)
+            if usage:
+                final_usage = usage
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            text = chunk.choices[0].delta.content
+            if not text:
+                continue
+            if first_byte_seconds is None:
+                first_byte_seconds = time.perf_counter() - started
+            f.write(text)
+            f.flush()
+            characters += len(text)
+        # Katkennut yhteys voi päättää virran ilman virhettä; valmis vastaus tunnistetaan finish_reasonista
+        if finish_reason is None:
+            raise ConnectionError("Suoratoisto päättyi ennen vastauksen loppua.")
+        if characters == 0:
+            raise ValueError("Suoratoistettu vastaus on tyhjä.")
+        f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(part_path, file_path)
+    return StreamResult(file_path, characters, final_usage, first_byte_seconds,
+                        time.perf_counter() - started, bool(partial))
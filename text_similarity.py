@@ -0,0 +1,268 @@
+"""
+Usage: text_similarity.py
+-------------------------
+Helper module for the Markdown deduplication scripts. It is not run directly,
+but imported by removeSameSentencesByThreshold.py and other scripts that need
+fast near-duplicate detection.
+
+Features:
+- Character shingling of sentences (default 3-character shingles)
+- MinHash signatures computed with a fixed set of hash permutations
+- LSH band index that returns only the candidates sharing at least one band
+- Exact confirmation stays with difflib.SequenceMatcher.ratio(), so the
+  threshold semantics of the calling script do not change
+- SignatureIndex for corpus-wide deduplication: stores only packed MinHash
+  signatures (no sentence strings) and estimates similarity from them
+- TieredMatcher: length bound and quick_ratio() prefilters in front of the
+  exact ratio(), with counters showing how many pairs each tier rejected
+
+The default parameters (64 permutations, 32 bands of 2 rows) favour recall:
+pairs whose shingle Jaccard similarity is 0.4 or higher become candidates with
+a probability above 99.5 %, which covers the ratio thresholds (0.7 - 0.95)
+used with removeSameSentencesByThreshold.py.
+
+Example:
+    from text_similarity import MinHashLSHIndex
+
+    index = MinHashLSHIndex()
+    index.add("Ensimmäinen pitkä lause, joka toistuu myöhemmin tekstissä.")
+    for candidate in index.candidates("Ensimmäinen pitkä lause, joka toistuu tekstissä."):
+        ...
+"""
+
+import difflib
+import random
+import zlib
+from array import array
+from collections import Counter
+
+# Mersenne-alkuluku universaaleille hash-permutaatioille
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text, size=3):
+    """Palauttaa tekstin merkkishinglet joukkona (lyhyt teksti = yksi shingle)."""
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """Laskee MinHash-allekirjoitukset kiinteillä, toistettavilla permutaatioilla."""
+
+    def __init__(self, num_perm=64, shingle_size=3, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text):
+        """Palauttaa tekstin MinHash-allekirjoituksen tuple-muodossa."""
+        # crc32 on deterministinen prosessien välillä, toisin kuin hash()
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles(text, self.shingle_size)]
+        prime = _MERSENNE_PRIME
+        return tuple(
+            min([(a * h + b) % prime for h in hashes]) & _MAX_HASH
+            for a, b in self._permutations
+        )
+
+
+class MinHashLSHIndex:
+    """
+    LSH-indeksi MinHash-allekirjoituksille.
+
+    Jokainen lisätty alkio saa juoksevan tunnisteen (lisäysjärjestys), ja
+    candidates() palauttaa tunnisteet nousevassa järjestyksessä, jotta kutsuja
+    voi käydä ehdokkaat läpi samassa järjestyksessä kuin lineaarinen haku.
+    """
+
+    def __init__(self, num_perm=64, bands=32, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm täytyy olla jaollinen bands-arvolla")
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = [{} for _ in range(bands)]
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash(signature[i * rows:(i + 1) * rows]) for i in range(self.bands)]
+
+    def signature(self, text):
+        """Laskee tekstin allekirjoituksen; voidaan antaa add()- ja candidate_ids()-metodeille."""
+        return self.hasher.signature(text)
+
+    def add(self, text, value=None, signature=None):
+        """
+        Lisää tekstin indeksiin ja palauttaa sen tunnisteen.
+        value tallennetaan tunnisteen rinnalle (oletuksena teksti itse).
+        """
+        if signature is None:
+            signature = self.hasher.signature(text)
+        item_id = len(self._items)
+        self._items.append(text if value is None else value)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(key, []).append(item_id)
+        return item_id
+
+    def candidate_ids(self, text, signature=None):
+        """Palauttaa niiden alkioiden tunnisteet, jotka jakavat tekstin kanssa vähintään yhden bandin."""
+        if signature is None:
+            signature = self.hasher.signature(text)
+        found = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            ids = bucket.get(key)
+            if ids:
+                found.update(ids)
+        return sorted(found)
+
+    def candidates(self, text, signature=None):
+        """Palauttaa ehdokasalkioiden arvot lisäysjärjestyksessä."""
+        return [self._items[i] for i in self.candidate_ids(text, signature)]
+
+
+class SignatureIndex:
+    """
+    Muistia säästävä LSH-indeksi koko korpuksen kattavaan deduplikointiin.
+
+    Tekstejä ei tallenneta lainkaan: jokaisesta hyväksytystä lauseesta säilytetään
+    vain MinHash-allekirjoitus yhdessä tiiviissä array('I')-taulukossa sekä
+    band-avaimet yhteisessä sanakirjassa. Muistinkulutus on siten vakio lausetta
+    kohden lauseen pituudesta riippumatta.
+
+    Samankaltaisuus arvioidaan allekirjoituksista (yhtä suurten MinHash-arvojen
+    osuus), joka estimoi merkkishinglejen Jaccard-samankaltaisuutta.
+    """
+
+    def __init__(self, num_perm=32, bands=8, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm täytyy olla jaollinen bands-arvolla")
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._signatures = array('I')
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self._signatures) // self.num_perm
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash((i, signature[i * rows:(i + 1) * rows])) for i in range(self.bands)]
+
+    def signature(self, text):
+        """Laskee tekstin MinHash-allekirjoituksen."""
+        return self.hasher.signature(text)
+
+    def similarity(self, item_id, signature):
+        """Arvioi tallennetun alkion ja allekirjoituksen samankaltaisuuden (0.0 - 1.0)."""
+        start = item_id * self.num_perm
+        stored = self._signatures[start:start + self.num_perm]
+        return sum(1 for a, b in zip(stored, signature) if a == b) / self.num_perm
+
+    def find_similar(self, signature, threshold):
+        """
+        Palauttaa ensimmäisen (pienimmän tunnisteen) alkion, jonka arvioitu
+        samankaltaisuus ylittää kynnysarvon, tai None.
+        """
+        found = set()
+        for key in self._band_keys(signature):
+            ids = self._buckets.get(key)
+            if ids is None:
+                continue
+            if isinstance(ids, int):
+                found.add(ids)
+            else:
+                found.update(ids)
+        for item_id in sorted(found):
+            if self.similarity(item_id, signature) > threshold:
+                return item_id
+        return None
+
+    def add(self, signature):
+        """Lisää allekirjoituksen indeksiin ja palauttaa sen tunnisteen."""
+        item_id = len(self)
+        self._signatures.extend(signature)
+        for key in self._band_keys(signature):
+            ids = self._buckets.get(key)
+            # Yksittäinen tunniste tallennetaan int-arvona, listaksi vasta törmäyksessä
+            if ids is None:
+                self._buckets[key] = item_id
+            elif isinstance(ids, int):
+                self._buckets[key] = [ids, item_id]
+            else:
+                ids.append(item_id)
+        return item_id
+
+
+class TieredMatcher:
+    """
+    Porrastettu SequenceMatcher.ratio()-vertailu.
+
+    Vertailu etenee halvimmasta kalleimpaan ja hylkää parin heti, kun jokin
+    yläraja jää kynnysarvon alle:
+      1. pituussuhde 2 * min(len) / (len(a) + len(b)) (sama arvo kuin
+         real_quick_ratio(), mutta ilman SequenceMatcher-olion luontia)
+      2. quick_ratio() (merkkien multijoukon leikkaus)
+      3. ratio() (tarkka tulos)
+
+    Vertailtavan lauseen b SequenceMatcher-olio tallennetaan välimuistiin, joten
+    sen b2j-indeksi rakennetaan vain kerran, vaikka b:tä verrataan moneen lauseeseen.
+    Tulos on aina sama kuin SequenceMatcher(None, a, b).ratio() > threshold
+    (tai >= threshold, jos strict=False).
+
+    stats-laskurit kertovat, montako paria kukin vaihe hylkäsi.
+    """
+
+    def __init__(self, threshold, strict=True):
+        self.threshold = threshold
+        self.strict = strict
+        self.stats = Counter()
+        self._matchers = {}
+
+    def _passes(self, value):
+        return value > self.threshold if self.strict else value >= self.threshold
+
+    def reset(self):
+        """Tyhjentää SequenceMatcher-välimuistin (laskurit säilyvät)."""
+        self._matchers.clear()
+
+    def is_similar(self, a, b):
+        """Palauttaa True, jos a ja b ovat kynnysarvon mukaan samankaltaiset."""
+        self.stats['pairs'] += 1
+        total = len(a) + len(b)
+        if total and not self._passes(2.0 * min(len(a), len(b)) / total):
+            self.stats['rejected_length'] += 1
+            return False
+
+        matcher = self._matchers.get(b)
+        if matcher is None:
+            matcher = self._matchers[b] = difflib.SequenceMatcher(None, '', b)
+        matcher.set_seq1(a)
+
+        if not self._passes(matcher.quick_ratio()):
+            self.stats['rejected_quick_ratio'] += 1
+            return False
+
+        self.stats['exact_ratio'] += 1
+        if not self._passes(matcher.ratio()):
+            self.stats['rejected_ratio'] += 1
+            return False
+        self.stats['matched'] += 1
+        return True
+
+
+def format_stats(stats):
+    """Muotoilee TieredMatcher-laskurit yhdelle riville."""
+    return (f"pairs={stats['pairs']} rejected_length={stats['rejected_length']} "
+            f"rejected_quick_ratio={stats['rejected_quick_ratio']} "
+            f"exact_ratio={stats['exact_ratio']} matched={stats['matched']}")
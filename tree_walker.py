@@ -0,0 +1,136 @@
+"""
+Usage: tree_walker.py
+---------------------
+Helper module with a directory tree walker built on os.scandir. It is imported
+by the filesystem scripts (add_sequence_number.py, AddFileExtensionPDF.py,
+CheckCharacterLengthFilesFolders.py, removeExtraCharactersFilesFolders.py,
+removeIfKorjattu.py, removeNonHtmlFiles.py, removeWantedText.py and
+renameFolderFiles.py) and is not run directly.
+
+os.walk returns plain names, so the scripts used to call os.path.getctime,
+os.path.isfile or os.listdir for every entry, each one another round trip on
+an SMB share. This walker:
+- Yields os.DirEntry objects instead of names: is_dir()/is_file() come from
+  the directory listing itself and entry.stat() is cached (on Windows it costs
+  no extra call at all), so a directory costs one listing
+- Works like os.walk: walk() yields (root, dirs, files); with topdown=True the
+  caller can remove items from dirs to prune them, or replace an item with the
+  new name or path of a directory it just renamed
+- Extension filter for files and a prune callback for directories
+- Optional threaded fan-out: with threads > 1 the directories of one level are
+  listed concurrently, which hides the network latency of a share. The default
+  comes from the TREE_WALK_THREADS environment variable (1 if not set)
+
+Directories are yielded level by level: with topdown=True a directory always
+comes before its subdirectories, with topdown=False always after them.
+
+Example:
+    from tree_walker import walk
+
+    for root, dirs, files in walk(path, extensions=[".md"], threads=8):
+        for entry in files:
+            print(entry.path, entry.stat().st_size)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_THREADS = int(os.environ.get("TREE_WALK_THREADS", "1") or 1)
+
+
+def _normalize_extensions(extensions):
+    """Palauttaa päätteet pienillä kirjaimilla ja pisteen kanssa, tai None."""
+    if not extensions:
+        return None
+    return tuple(ext.lower() if ext.startswith(".") else "." + ext.lower() for ext in extensions)
+
+
+def _scan(path, extensions, follow_symlinks):
+    """Listaa kansion; nostaa OSError-poikkeuksen, jos listaus epäonnistuu."""
+    dirs = []
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirs.append(entry)
+            elif extensions is None or entry.name.lower().endswith(extensions):
+                files.append(entry)
+    return dirs, files
+
+
+def list_directory(path, extensions=None, follow_symlinks=False, onerror=None):
+    """
+    Listaa yhden kansion yhdellä scandir-kutsulla. Palauttaa (dirs, files)
+    DirEntry-listoina; files suodatetaan päätteiden mukaan, jos ne on annettu.
+    Virheessä kutsutaan onerror(virhe) ja palautetaan tyhjät listat.
+    """
+    try:
+        return _scan(path, _normalize_extensions(extensions), follow_symlinks)
+    except OSError as e:
+        if onerror is not None:
+            onerror(e)
+        return [], []
+
+
+def _child_path(root, item):
+    """Palauttaa alikansion polun: DirEntry, polku tai pelkkä (uusi) nimi."""
+    if isinstance(item, os.DirEntry):
+        return item.path
+    return os.path.join(root, item)
+
+
+def walk(top, topdown=True, extensions=None, prune=None, threads=None,
+         follow_symlinks=False, onerror=None):
+    """
+    Käy kansiopuun läpi kuten os.walk, mutta dirs ja files ovat DirEntry-olioita.
+
+    :param extensions: Vain näillä päätteillä olevat tiedostot (esim. [".html"]).
+    :param prune: Funktio prune(entry), joka palauttaa True kansioille, joihin ei mennä.
+    :param threads: Samanaikaisten kansiolistausten määrä (oletus DEFAULT_THREADS).
+    :param onerror: Funktio, jota kutsutaan listausvirheellä; oletuksena virhe ohitetaan.
+    """
+    threads = threads or DEFAULT_THREADS
+    extensions = _normalize_extensions(extensions)
+
+    def scan(path):
+        # Kansio, jota ei voi listata, jätetään pois kuten os.walk tekee
+        try:
+            dirs, files = _scan(path, extensions, follow_symlinks)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            return None
+        if prune is not None:
+            dirs = [entry for entry in dirs if not prune(entry)]
+        return path, dirs, files
+
+    executor = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+    try:
+        level = [item for item in [scan(top)] if item is not None]
+        bottom_up_levels = []
+        while level:
+            if topdown:
+                for root, dirs, files in level:
+                    yield root, dirs, files
+            else:
+                bottom_up_levels.append(level)
+            # Seuraava taso luetaan vasta nyt, jotta kutsujan muutokset dirs-listaan huomioidaan
+            paths = [_child_path(root, item) for root, dirs, _ in level for item in dirs]
+            scanned = executor.map(scan, paths) if executor else map(scan, paths)
+            level = [item for item in scanned if item is not None]
+        for level in reversed(bottom_up_levels):
+            for root, dirs, files in reversed(level):
+                yield root, dirs, files
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def iter_files(top, extensions=None, prune=None, threads=None):
+    """Palauttaa kaikkien puun tiedostojen DirEntry-oliot (ylhäältä alas)."""
+    for _, _, files in walk(top, extensions=extensions, prune=prune, threads=threads):
+        yield from files